@@ -28,7 +28,7 @@
     :licence GPLv3, see LICENCE for more details
 """
 
-from brianmodel import BrianModel
+from brianmodel import BrianModel, __version__
 import utilities
 
 __all__ = ['brianmodel']
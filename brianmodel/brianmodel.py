@@ -29,10 +29,56 @@
 
 
 from neuron import neuron as nn
+from utilities import currentlibrary
+from utilities import includecache
+from utilities import linearity
+from utilities import equations
+from utilities import optimiser
 
+import collections
+import hashlib
+import os
 import yaml
 
 
+# Library version
+__version__ = '1.2'
+
+# Format of the cached model equations, part of their key, bumped whenever the same parameter file generates different
+# equations
+CACHE_FORMAT = 2
+
+
+## ***************************************************************************************************************** ##
+def _getTablesDigest(tables):
+    """
+    Return a hash of the values of the voltage lookup tables of a neuron type, see :meth:`Neuron.getVoltageTables`.
+    """
+    digest = hashlib.sha1()
+    for name in sorted(tables):
+        digest.update(name.encode('utf-8'))
+        digest.update(tables[name].voltages.tostring())
+        digest.update(tables[name].values.tostring())
+
+    return digest.hexdigest()
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _updateFileDigest(digest, path):
+    """
+    Feed a file to a hash, preceded by its resolved path and the length of its contents, so that the boundaries between
+    the files of a model are part of the hash.
+    """
+    with open(path, 'rb') as f:
+        contents = f.read()
+
+    digest.update((os.path.realpath(path) + '\0' + str(len(contents)) + '\0').encode('utf-8'))
+    digest.update(contents)
+## ***************************************************************************************************************** ##
+
+
+
 ## ***************************************************************************************************************** ##
 class BrianModel(object):
     """
@@ -46,17 +92,34 @@ class BrianModel(object):
 
     ## ************************************************************ ##
     ## Default constructor.
-    def __init__(self, fileName):
+    def __init__(self, fileName, includeCache=None, modelCache=None, library=None):
         """
         Default constructor.
 
         :param fileName: the name of the file containing the model parameters
         :type area: string
+        :param includeCache: the cache of parsed include files, which may be shared with other models
+        :type includeCache: :class:`IncludeCache`
+        :param modelCache: the optional on-disk cache of generated model equations
+        :type modelCache: :class:`DiskCache`
+        :param library: the library of current definitions referenced by the neurons, which may be shared with other
+            models. Defaults to the library of the directory of the parameter file, built when a neuron first references it
+        :type library: :class:`CurrentLibrary`
         """
         # Initialise class attributes
         self.fileName = fileName
         self.parameters = {}
         self.neurons = []
+        self.modelCache = modelCache
+        self._cacheKey = None
+        self._cachedModelString = None
+
+        # Included files are parsed once per model, and resolved against the parameter file directory
+        if includeCache is None:
+            includeCache = includecache.IncludeCache()
+        self.includeCache = includeCache
+        self.baseDir = os.path.dirname(os.path.abspath(fileName))
+        self.library = library
     ## ************************************************************ ##
 
     ## ************************************************************ ##
@@ -64,6 +127,8 @@ class BrianModel(object):
     def readParameterFile(self):
         """
         Read and parse the file containing the model parameters.
+        When the model has an on-disk cache holding its equations, no neuron is built and the cached equations are returned by :meth:`getModelString`,
+        until the neurons are built. Otherwise the equations of the neurons built from the file are stored in the cache.
 
         :returns: return code
         :rtype: int
@@ -72,15 +137,66 @@ class BrianModel(object):
         with open(self.fileName) as f:
             self.parameters = yaml.safe_load(f)
 
-        # Build list of neurons
-        for neuron, params in self.parameters['neurons'].iteritems():
-            tmpNeuron = nn.Neuron({neuron : params})
+        # Look the model equations up in the on-disk cache, unless lookup tables or parameter distributions must be built along with them
+        tabulated = any(params.get('voltageTables') or params.get('heterogeneous') for params in self.parameters['neurons'].itervalues())
+        if self.modelCache is not None and not tabulated:
+            self._cacheKey = self.getCacheKey()
+            self._cachedModelString = self.modelCache.get(self._cacheKey)
+            if self._cachedModelString is not None:
+                return 0
+
+        res = self.setParameters(self.parameters)
+
+        # Store the equations for the next run, before the neurons can be modified
+        if self._cacheKey is not None:
+            self.modelCache.put(self._cacheKey, self.getModelString())
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def setParameters(self, parameters):
+        """
+        Build the neurons of the model from parameters which have already been parsed, such as those of a parameter file
+        modified by a sweep. Included files are resolved against the directory of the parameter file of the model.
+        The on-disk cache of the model is not used, and the equations read from it are discarded.
+
+        :param parameters: the model parameters, with the structure of a parameter file
+        :type parameters: dict
+
+        :returns: return code
+        :rtype: int
+        """
+        self.parameters = parameters
+        self.neurons = []
+        self._cachedModelString = None
+
+        # Build list of neurons, in name order so that the model is rendered in the same order on every machine
+        for neuron, params in sorted(self.parameters['neurons'].iteritems()):
+            library = self.getLibrary() if (params.get('currents') or {}).get('library') else self.library
+            tmpNeuron = nn.Neuron({neuron : params}, self.includeCache, self.baseDir, library)
             self.neurons.append(tmpNeuron)
 
         return 0
     ## ************************************************************ ##
 
 
+    ## ************************************************************ ##
+    def getLibrary(self):
+        """
+        Return the library of current definitions referenced by the neurons of the model, see :class:`CurrentLibrary`.
+        Unless one was given, the library of the directory of the parameter file is built on first use.
+
+        :rtype: :class:`CurrentLibrary`
+        """
+        if self.library is None:
+            self.library = currentlibrary.CurrentLibrary(self.baseDir, self.includeCache)
+
+        return self.library
+    ## ************************************************************ ##
+
+
     ## ************************************************************ ##
     ## Generate the Brian-compatible string representation of the model
     def getModelString(self):
@@ -88,14 +204,317 @@ class BrianModel(object):
         Generate the string representation of the model equations for each
         neuron type in the model.
 
-        :returns: the string representation of the model equations for each neuron type in the model
+        :returns: the string representation of the model equations for each neuron type in the model, in name order
+        :rtype: :class:`collections.OrderedDict` of strings
+        """
+        if self._cachedModelString is not None:
+            return collections.OrderedDict((str(name), str(eqs)) for name, eqs in sorted(self._cachedModelString.iteritems()))
+
+        res = collections.OrderedDict()
+
+        # Identical neuron types share the string of the type representing them, which comes first in name order
+        aliases = self.getTypeAliases()
+        for neuron in self.neurons:
+            res[neuron.name] = res[aliases[neuron.name]] if neuron.name in aliases else neuron.getNeuronString()
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getEquations(self):
+        """
+        Return the equations of each neuron type in the model, see :meth:`Neuron.getEquations`.
+        Neuron types which are identical to another type, see :meth:`getTypeAliases`, share the equations object of that type.
+
+        :returns: the equations of each neuron type, in name order
+        :rtype: :class:`collections.OrderedDict` of :class:`Equations`
+        """
+        if self._cachedModelString is not None:
+            res = collections.OrderedDict()
+            parsed = {}
+            for name, string in self.getModelString().iteritems():
+                if string not in parsed:
+                    parsed[string] = equations.parseEquations(string)
+                res[name] = parsed[string]
+            return res
+
+        aliases = self.getTypeAliases()
+        res = collections.OrderedDict()
+        for neuron in self.neurons:
+            res[neuron.name] = res[aliases[neuron.name]] if neuron.name in aliases else neuron.getEquations()
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getTypeAliases(self):
+        """
+        Return the neuron types of the model which are structurally identical to another type, mapped to the type which
+        represents them, e.g. ``{'pyramidal2': 'pyramidal'}``. Such types can be simulated as a single group of neurons,
+        whose equations are compiled once.
+        Neuron types are identical when their equations have the same fingerprint, see :meth:`Neuron.fingerprint`, and
+        their lookup tables the same values, whatever their names and the order of their currents. The representing type is
+        the first of its identical types in name order.
+
+        :returns: the aliases of the neuron types
         :rtype: dict of strings
         """
+        fingerprints = self._getFingerprints()
+        tables = self.getVoltageTables()
+
         res = {}
+        representatives = {}
+        for name in sorted(fingerprints):
+            key = (fingerprints[name], _getTablesDigest(tables.get(name, {})))
+            representative = representatives.setdefault(key, name)
+            if representative != name:
+                res[name] = representative
 
-        for neuron in self.neurons:
-            res[neuron.name] = neuron.getNeuronString()
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    ## Return the voltage lookup tables called by the model equations
+    def getVoltageTables(self):
+        """
+        Return the voltage lookup tables called by the equations of each neuron type in the model.
+        The tables of a neuron type must be added to the namespace of its group of neurons.
+
+        :returns: the tables of each neuron type, by function name
+        :rtype: dict of dicts
+        """
+        return dict((neuron.name, neuron.getVoltageTables()) for neuron in self.neurons)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def sampleParameters(self, n, seed=None):
+        """
+        Draw the values of the heterogeneous parameters of the neurons of each type in the model, to initialise the
+        per-neuron parameters of their groups, see :meth:`Neuron.sampleParameters`.
+
+        :param n: the number of neurons of each type
+        :type n: int, or dict of int by neuron type
+        :param seed: the seed of the random number generator, for reproducible values
+        :type seed: int
+
+        :returns: the values of each parameter of each neuron type, as arrays in SI units
+        :rtype: dict of dicts of arrays
+        """
+        return dict((neuron.name, neuron.sampleParameters(n[neuron.name] if isinstance(n, dict) else n, seed)) for neuron in self.neurons)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getAliases(self):
+        """
+        Return the names of the merged currents and state variables of each neuron type, mapped to the names replacing them.
+        Synapses must be connected to the replacing names. When the equations were read from the on-disk cache, the neurons
+        are built to find the aliases, as the cached equations already use the replacing names.
+
+        :returns: the aliases of each neuron type
+        :rtype: dict of dicts
+        """
+        return dict((neuron.name, neuron.getAliases()) for neuron in self._getNeurons())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getIntegrationMethods(self):
+        """
+        Return the cheapest Brian integration method which is exact or stable for the equations of each neuron type in the model,
+        to be passed as the ``method`` of its group of neurons, see :meth:`Neuron.getIntegrationMethod`.
+        The equations are classified as returned by :meth:`getEquations`, so that models read from the on-disk cache are
+        classified without building their neurons.
+
+        :returns: the integration method of each neuron type
+        :rtype: dict of strings
+        """
+        tables = self.getVoltageTables()
+
+        res = {}
+        for name, eqs in self.getEquations().iteritems():
+            functionDerivatives = dict((table, table + 'Derivative') for table in tables.get(name, {}))
+            res[name] = linearity.getIntegrationMethod(eqs, functionDerivatives)
 
         return res
     ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getJacobians(self):
+        """
+        Return the Jacobian of the equations of each neuron type in the model, derived symbolically, as Brian subexpressions,
+        see :meth:`Neuron.getJacobian`.
+
+        :returns: the Jacobian of each neuron type
+        :rtype: dict of :class:`Equations`
+        """
+        return dict((neuron.name, neuron.getJacobian()) for neuron in self._getNeurons())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getRestingStates(self, n=1, namespace=None, parameters=None):
+        """
+        Compute the resting state of each neuron type in the model: its resting membrane potential, and the steady state of
+        its gating variables and calcium concentration, see :func:`steadystate.setRestingState`.
+        The neurons of a type are solved at once, and may differ by their parameters or by arrays in the namespace.
+        Every state variable of the neurons without a resting potential between -100 mV and 50 mV, such as tonically firing
+        neurons, is NaN.
+        When the equations were read from the on-disk cache, the neurons are built from the parameter file first.
+
+        :param n: the number of neurons of each type
+        :type n: int, or dict of int by neuron type
+        :param namespace: the values of the external names referenced by the equations, in SI units
+        :type namespace: dict
+        :param parameters: the values of the parameters of each neuron type, such as I_stim, in SI units
+        :type parameters: dict of dicts of floats or arrays
+
+        :returns: the state variables of each neuron type, as arrays of length n in SI units
+        :rtype: dict of dicts of arrays
+        """
+        # The computation requires NumPy, which is only imported when it is used
+        from engine import steadystate
+        from engine import Population
+        import numpy
+
+        res = {}
+        for neuron in self._getNeurons():
+            size = n[neuron.name] if isinstance(n, dict) else n
+            population = Population(neuron, size, 'euler', namespace)
+            for name, value in (parameters or {}).get(neuron.name, {}).iteritems():
+                population.state[name][:] = value
+            # Neurons without a resting potential are left undefined
+            if 'v' in population.stateVariables:
+                population.state['v'][:] = numpy.nan
+            res[neuron.name] = steadystate.setRestingState(population)
+            if 'v' in res[neuron.name]:
+                unresolved = numpy.isnan(res[neuron.name]['v'])
+                for values in res[neuron.name].itervalues():
+                    values[unresolved] = numpy.nan
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def analyzeStiffness(self, namespace=None, vMin=-100e-3, vMax=50e-3, resolution=0.5e-3, growthRate=0.):
+        """
+        Analyse the timescales of each neuron type in the model over a range of membrane potentials, and recommend the
+        largest stable time step of each integration method of the reference engine, see :func:`stiffness.analyzeStiffness`.
+
+        :param namespace: the values of the external names referenced by the equations, in SI units
+        :type namespace: dict
+        :param vMin: the lower end of the range of potentials, in volt
+        :type vMin: float
+        :param vMax: the upper end of the range of potentials, in volt
+        :type vMax: float
+        :param resolution: the spacing of the potentials, in volt
+        :type resolution: float
+        :param growthRate: the growth rate of the numerical solution which is tolerated, in Hz
+        :type growthRate: float
+
+        :returns: the report of each neuron type
+        :rtype: dict of dicts
+        """
+        # The analysis requires NumPy, which is only imported when it is used
+        from engine import stiffness
+
+        return dict((neuron.name, stiffness.analyzeStiffness(neuron, namespace, vMin, vMax, resolution, growthRate)) for neuron in self._getNeurons())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getReductionErrors(self, namespace=None, **kwargs):
+        """
+        Compare the responses of each neuron type with adiabatic reduction to those of the full neuron type, to a standard
+        stimulus of current steps, see :meth:`Neuron.getReductionError`. Neuron types without reduction are left out.
+
+        :param namespace: the values of the external names referenced by the equations, in SI units
+        :type namespace: dict
+
+        :returns: the report of each reduced neuron type
+        :rtype: dict of dicts
+        """
+        return dict((neuron.name, neuron.getReductionError(namespace, **kwargs)) for neuron in self._getNeurons() if neuron.getAdiabaticVariables())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def fingerprint(self):
+        """
+        Return a stable hash of the canonical form of the equations of every neuron type in the model, see
+        :meth:`Neuron.fingerprint`, to key the caches of code generated from the model. Unlike :meth:`getCacheKey`, the
+        hash does not depend on the way the parameter file is written, such as the order of its neurons and currents, nor on
+        the format of the cache.
+
+        :returns: the hexadecimal digest of the model
+        :rtype: string
+        """
+        fingerprints = self._getFingerprints()
+
+        digest = hashlib.sha1()
+        for name in sorted(fingerprints):
+            digest.update((name + ' ' + fingerprints[name] + '\n').encode('utf-8'))
+
+        return digest.hexdigest()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _getNeurons(self):
+        """
+        Return the neurons of the model. When the equations were read from the on-disk cache, no neuron was built by
+        :meth:`readParameterFile`, and the neurons are built from the parameter file on first use, after which the
+        equations of the model are those of the neurons.
+        """
+        if self._cachedModelString is not None:
+            self.setParameters(self.parameters)
+
+        return self.neurons
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _getFingerprints(self):
+        """
+        Return the fingerprint of each neuron type in the model, see :meth:`Neuron.fingerprint`.
+        """
+        # Equations read from the on-disk cache are normalised like those of the neurons
+        if self._cachedModelString is not None:
+            return dict((str(name), hashlib.sha1(optimiser.normaliseEquations(equations.parseEquations(string)).render().encode('utf-8')).hexdigest())
+                        for name, string in self._cachedModelString.iteritems())
+
+        return dict((neuron.name, neuron.fingerprint()) for neuron in self.neurons)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    ## Compute the key of the model in the on-disk equation cache
+    def getCacheKey(self):
+        """
+        Compute the key identifying the model in the on-disk equation cache.
+        The key is a hash of the format of the cache, see :data:`CACHE_FORMAT`, the parameter file, and every file it includes or references through the
+        library of currents, each preceded by its resolved path and its length.
+
+        :returns: the hexadecimal digest of the model
+        :rtype: string
+        """
+        digest = hashlib.sha1(('brianmodel-equations-' + str(CACHE_FORMAT)).encode('utf-8'))
+
+        _updateFileDigest(digest, self.fileName)
+
+        for neuron in sorted(self.parameters['neurons']):
+            currents = self.parameters['neurons'][neuron].get('currents') or {}
+            paths = [includecache.IncludeCache.resolvePath(fileName, self.baseDir) for fileName in currents.get('included', [])]
+            paths.extend(self.getLibrary().getPath(reference) for reference in currents.get('library') or [])
+            for path in paths:
+                _updateFileDigest(digest, path)
+
+        return digest.hexdigest()
+    ## ************************************************************ ##
 ## ***************************************************************************************************************** ##
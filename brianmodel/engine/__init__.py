@@ -0,0 +1,34 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    engine
+    ~~~~~~~~~~~~~
+    This package contains a vectorised NumPy reference engine, which integrates the equations generated by the brianmodel package without the Brian simulator.
+    It requires NumPy.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from engine import Engine
+from population import Population
+from resultstore import ResultStore
@@ -0,0 +1,119 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    comparison
+    ~~~~~~~~~~~~~
+    This module contains the comparison of the responses of two neuron models to a standard stimulus, such as a model and
+    its adiabatic reduction.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from engine import Engine
+
+import numpy
+
+
+
+# Amplitudes of the standard stimulus, in amp: a current step applied from rest, one per neuron
+CURRENTS = (0., 0.01e-9, 0.02e-9, 0.05e-9, 0.1e-9, 0.2e-9, 0.5e-9, 1e-9)
+
+
+
+## ***************************************************************************************************************** ##
+def compareModels(model, reference, namespace=None, currents=CURRENTS, duration=0.2, dt=20e-6, method='exponential_euler',
+                  threshold=-20e-3, variable='v', stimulus='I_stim', vInit=-70e-3):
+    """
+    Compare the responses of a model to those of a reference model, such as the full model it is a reduction of.
+    Each model is simulated as a population with one neuron per stimulus amplitude: the neurons start at rest without
+    stimulus, see :func:`steadystate.setRestingState`, and receive a step of stimulus current at the start of the
+    simulation. Neurons without a resting state start at the initial potential. The parameters of the reference model
+    which the model also has, such as heterogeneous parameters at their nominal value, take the values of the model.
+
+    The report contains arrays with one value per amplitude:
+
+        ``vError``
+        The root mean square difference between the membrane potentials of the models, in volt
+
+        ``spikeCounts``
+        The number of spikes of the model and of the reference model (tuple of arrays)
+
+        ``spikeCountError``
+        The number of spikes of the model minus that of the reference model
+
+        ``spikeTimeError``
+        The mean absolute difference between the times of the spikes of the models, in second, paired in order over the
+        spikes of the sparser model, or NaN if either model does not fire
+
+    :param model: the neuron model (:class:`Neuron`, equation string or :class:`Equations`)
+    :param reference: the reference neuron model (:class:`Neuron`, equation string or :class:`Equations`)
+    :param namespace: the values of the external names referenced by the models, in SI units
+    :type namespace: dict
+    :param currents: the amplitudes of the stimulus, in amp
+    :type currents: iterable of floats
+    :param duration: the simulated duration, in seconds
+    :type duration: float
+    :param dt: the integration time step, in seconds
+    :type dt: float
+    :param method: the integration method of the reference engine
+    :type method: string
+    :param threshold: the membrane potential above which a spike is recorded, in volt
+    :type threshold: float
+    :param variable: the name of the membrane potential
+    :type variable: string
+    :param stimulus: the name of the parameter receiving the stimulus current
+    :type stimulus: string
+    :param vInit: the initial membrane potential of neurons without a resting state, in volt
+    :type vInit: float
+
+    :returns: the report, with all quantities in SI units
+    :rtype: dict
+    """
+    currents = numpy.asarray(currents, dtype=float)
+    engine = Engine({'model': model, 'reference': reference}, len(currents), method, namespace, threshold)
+    for name in engine['reference'].parameters:
+        if name in engine['model'].state:
+            engine['reference'].state[name][:] = engine['model'].state[name]
+    for population in engine.populations.itervalues():
+        population.state[variable][:] = vInit
+    engine.setRestingState()
+    for population in engine.populations.itervalues():
+        population.state[stimulus][:] = currents
+    res = engine.run(duration, dt, record=(variable, ))
+
+    difference = res['model'][variable] - res['reference'][variable]
+    report = {
+        'vError': numpy.sqrt(numpy.mean(difference ** 2, axis=0)),
+        'spikeCounts': tuple(numpy.bincount(res[name]['spikes'][0], minlength=len(currents)) for name in ('model', 'reference')),
+    }
+    report['spikeCountError'] = report['spikeCounts'][0] - report['spikeCounts'][1]
+
+    report['spikeTimeError'] = numpy.full(len(currents), numpy.nan)
+    for index in xrange(len(currents)):
+        times = [spikes[1][spikes[0] == index] for spikes in (res['model']['spikes'], res['reference']['spikes'])]
+        count = min(len(values) for values in times)
+        if count:
+            report['spikeTimeError'][index] = numpy.mean(numpy.abs(times[0][:count] - times[1][:count]))
+
+    return report
+## ***************************************************************************************************************** ##
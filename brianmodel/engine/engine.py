@@ -0,0 +1,207 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    engine
+    ~~~~~~~~~~~~~
+    This module contains the reference engine, which simulates populations of every neuron type of a :class:`BrianModel` with NumPy.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from population import Population
+import resultstore
+import steadystate
+
+import collections
+
+import numpy
+
+
+
+## ***************************************************************************************************************** ##
+class Engine(object):
+    """
+    The :class:`Engine` simulates N neurons of each type of a model, without the Brian simulator.
+    All quantities are expressed in SI units (volt, second, siemens...).
+
+    Initialised as:
+
+        Engine(model, n, method, namespace, threshold)
+
+    with arguments:
+
+        ``model``
+        The model, whose parameter file has been read (:class:`BrianModel`), or a dict of equation strings by neuron type
+
+        ``n``
+        The number of neurons of each type (int, or dict of int by neuron type)
+
+        ``method``
+        The integration method, 'euler', 'exponential_euler', 'auto' or 'rosenbrock' (string)
+
+        ``namespace``
+        The values of the external names referenced by the equations, in SI units (dict)
+
+        ``threshold``
+        The membrane potential above which a spike is recorded, in volt (float)
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, model, n, method='euler', namespace=None, threshold=-20e-3):
+        """
+        Default constructor.
+        """
+        # Neurons provide their lookup tables along with their equations
+        if getattr(model, 'neurons', None):
+            model = dict((neuron.name, neuron) for neuron in model.neurons)
+        elif hasattr(model, 'getModelString'):
+            model = model.getModelString()
+
+        self.method = method
+        self.threshold = threshold
+        self.t = 0.
+        self.populations = collections.OrderedDict()
+        for name in sorted(model):
+            size = n[name] if isinstance(n, dict) else n
+            self.populations[name] = Population(model[name], size, method, namespace, name)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __getitem__(self, name):
+        return self.populations[name]
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def setRestingState(self, vMin=-100e-3, vMax=50e-3, resolution=1e-3):
+        """
+        Set every population to its resting state, for the current value of its parameters, see :func:`steadystate.setRestingState`.
+
+        :param vMin: the lower end of the range of potentials searched for the resting potential, in volt
+        :type vMin: float
+        :param vMax: the upper end of the range of potentials searched for the resting potential, in volt
+        :type vMax: float
+        :param resolution: the spacing of the potentials scanned for the resting potential, in volt
+        :type resolution: float
+
+        :returns: the resulting state variables of each population, in SI units
+        :rtype: dict of dicts of arrays
+        """
+        return dict((name, steadystate.setRestingState(population, vMin, vMax, resolution)) for name, population in self.populations.iteritems())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def run(self, duration, dt, record=('v', ), recordEvery=1, inputs=None, store=None, protocol=None):
+        """
+        Simulate all the populations for the given duration.
+        When a store is given, the run is looked up in it before it starts, see :func:`resultstore.getFingerprint`: a stored
+        run returns its results and sets the engine to its final state without simulating, and the results of a new run are
+        stored. Runs with inputs are only stored along with the description of their protocol, as the inputs function
+        cannot be fingerprinted.
+
+        :param duration: the simulated duration, in seconds
+        :type duration: float
+        :param dt: the integration time step, in seconds
+        :type dt: float
+        :param record: the state variables or parameters to record
+        :type record: iterable of strings
+        :param recordEvery: record the state every this number of steps
+        :type recordEvery: int
+        :param inputs: a function called with the engine and the time before every step, which may deliver synaptic events
+            with :meth:`Population.receive`
+        :type inputs: callable
+        :param store: the store of the results of previous runs
+        :type store: :class:`ResultStore`
+        :param protocol: the description of the inputs, such as their rates, weights and the seed of their random number
+            generator, which is part of the key of the run in the store
+        :type protocol: JSON-serialisable value
+
+        :returns: for each population, the recording times 't', an array of shape (samples, N) for each recorded variable,
+            and the 'spikes' as a tuple of neuron indices and spike times
+        :rtype: dict of dicts
+
+        :raises: ValueError if a run with inputs is stored without a protocol
+        """
+        # Look the run up before simulating it
+        key = None
+        if store is not None:
+            if inputs is not None and protocol is None:
+                raise ValueError('Cannot store a run with inputs without the description of their protocol')
+            key = resultstore.getFingerprint(self, duration, dt, record, recordEvery, protocol)
+            stored = store.get(key)
+            if stored is not None:
+                for name, state in stored['state'].iteritems():
+                    for var, values in state.iteritems():
+                        self.populations[name].state[var][:] = values
+                self.t = stored['t']
+                return stored['results']
+
+        steps = int(round(duration / dt))
+
+        res = {}
+        for name, population in self.populations.iteritems():
+            recorded = [var for var in record if var in population.state]
+            res[name] = {'t': [], 'spikes': ([], [])}
+            for var in recorded:
+                res[name][var] = []
+
+        for i in xrange(steps):
+            if inputs is not None:
+                inputs(self, self.t)
+
+            for name, population in self.populations.iteritems():
+                if i % recordEvery == 0:
+                    res[name]['t'].append(self.t)
+                    for var in record:
+                        if var in res[name]:
+                            res[name][var].append(population.state[var].copy())
+
+                v = population.state.get('v')
+                vBefore = v.copy() if v is not None else None
+
+                population.step(self.t, dt)
+
+                # Record upward threshold crossings
+                if v is not None:
+                    spiking = numpy.flatnonzero((vBefore < self.threshold) & (population.state['v'] >= self.threshold))
+                    res[name]['spikes'][0].extend(spiking)
+                    res[name]['spikes'][1].extend([self.t + dt] * len(spiking))
+
+            self.t += dt
+
+        for name in res:
+            for var, values in res[name].items():
+                if var == 'spikes':
+                    res[name][var] = (numpy.array(values[0], dtype=int), numpy.array(values[1]))
+                else:
+                    res[name][var] = numpy.array(values)
+
+        if key is not None:
+            state = dict((name, population.state) for name, population in self.populations.iteritems())
+            store.put(key, {'results': res, 'state': state, 't': self.t})
+
+        return res
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
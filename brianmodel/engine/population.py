@@ -0,0 +1,308 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    population
+    ~~~~~~~~~~~~~
+    This module contains a population of neurons of the same type, whose state is stored in structure-of-arrays layout.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from utilities import equations as eqs
+from utilities import expressions
+from utilities import numeric
+import steppers
+
+import collections
+import re
+
+import numpy
+
+
+
+# Pattern of the statements of synaptic code, such as ``ge += w``
+_statementPattern = re.compile(r'^(?P<name>[A-Za-z_]\w*)\s*(?P<op>[-+*/]?)=(?P<expression>.+)$')
+
+
+
+## ***************************************************************************************************************** ##
+def getEquations(model):
+    """
+    Return the equations of a neuron model.
+
+    :param model: the model, as a :class:`Neuron`, an equation string, or :class:`Equations`
+    :type model: :class:`Neuron`, string or :class:`Equations`
+
+    :rtype: :class:`Equations`
+    """
+    if isinstance(model, eqs.Equations):
+        return model
+    if hasattr(model, 'getEquations'):
+        return model.getEquations()
+
+    return eqs.parseEquations(model)
+## ***************************************************************************************************************** ##
+
+
+
+## ***************************************************************************************************************** ##
+class Population(object):
+    """
+    The :class:`Population` represents N neurons of the same type, integrated with NumPy.
+    Each state variable and parameter of the model is stored in its own array of length N, in SI units.
+
+    Initialised as:
+
+        Population(model, n, method, namespace, name)
+
+    with arguments:
+
+        ``model``
+        The neuron model (:class:`Neuron`, equation string or :class:`Equations`)
+
+        ``n``
+        The number of neurons (int)
+
+        ``method``
+        The integration method, one of the names in :data:`steppers.STEPPERS` (string)
+
+        ``namespace``
+        The values of the external names referenced by the model, in SI units, and the functions it calls besides the
+        standard ones (dict of float, arrays or callables)
+
+        ``name``
+        The name of the population (string)
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, model, n, method='euler', namespace=None, name=None):
+        """
+        Default constructor.
+
+        :raises: KeyError if the namespace lacks a name referenced by the model
+        """
+        self.name = name if name is not None else getattr(model, 'name', None)
+        self.equations = getEquations(model)
+        self.n = n
+
+        # Variables integrated over time, and per-neuron constants
+        self.stateVariables = self.equations.getNames(eqs.DIFFERENTIAL)
+        self.parameters = self.equations.getNames(eqs.PARAMETER)
+
+        # Structure-of-arrays state
+        self.state = collections.OrderedDict()
+        for name in self.stateVariables + self.parameters:
+            self.state[name] = numpy.zeros(n)
+
+        # Parameters which differ between neurons start at their nominal value
+        for name, distribution in getattr(model, 'getHeterogeneousParameters', dict)().iteritems():
+            self.state[name][:] = distribution.nominal
+
+        # Values of external names, and functions such as lookup tables
+        self.namespace = dict(namespace or {})
+        if hasattr(model, 'getVoltageTables'):
+            self.namespace.update(model.getVoltageTables())
+        functions = self.equations.getFunctionNames().difference(numeric.FUNCTIONS)
+        missing = sorted(name for name in self.equations.getExternalNames() | functions if name not in self.namespace)
+        if missing:
+            raise KeyError('Population ' + str(self.name) + ' references undefined names: ' + ', '.join(missing))
+
+        # Derivatives of the functions of the namespace, needed by some steppers
+        self.functionDerivatives = {}
+        for name in functions:
+            derivative = getattr(self.namespace[name], 'derivative', None)
+            if derivative is not None:
+                self.functionDerivatives[name] = name + 'Derivative'
+                self.namespace[name + 'Derivative'] = derivative
+
+        # Code applying synaptic events, by target variable
+        self._getSynapseCode = getattr(model, 'getSynapseCode', lambda target: target + ' += w')
+        self._receivers = {}
+
+        self.stepper = steppers.getStepper(method)(self)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def compileKernel(self, outputs, auxiliaries=()):
+        """
+        Compile a function computing the given expressions from the state of the population.
+        The function takes the time as its only argument and returns a tuple of arrays.
+
+        :param outputs: the expressions to compute
+        :type outputs: list of :class:`Expression`
+        :param auxiliaries: additional subexpressions, in evaluation order, which the outputs may reference
+        :type auxiliaries: list of :class:`Equation`
+
+        :rtype: callable
+        """
+        auxiliaries = list(auxiliaries)
+        auxiliaryNames = set(eq.name for eq in auxiliaries)
+
+        # Collect the subexpressions needed by the outputs and auxiliaries
+        needed = set()
+        for node in outputs + [eq.expression for eq in auxiliaries]:
+            needed.update(name for name in expressions.getNames(node) if name not in auxiliaryNames)
+        subexpressions = self.equations.getSortedSubexpressions(sorted(needed))
+
+        lines = ['def kernel(_state, t):']
+        for name in self.state:
+            lines.append('    ' + name + ' = _state[' + repr(name) + ']')
+        for eq in subexpressions + auxiliaries:
+            lines.append('    ' + eq.name + ' = ' + expressions.render(numeric.toSI(eq.expression)))
+        lines.append('    return (' + ''.join(expressions.render(numeric.toSI(node)) + ', ' for node in outputs) + ')')
+
+        scope = dict(numeric.FUNCTIONS)
+        scope.update(self.namespace)
+        code = compile('\n'.join(lines) + '\n', '<brianmodel.engine ' + str(self.name) + '>', 'exec', numeric.COMPILER_FLAGS)
+        exec(code, scope)
+
+        kernel = scope['kernel']
+        state = self.state
+
+        def run(t):
+            with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                return kernel(state, t)
+
+        return run
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def compileJacobian(self):
+        """
+        Compile a function computing the Jacobian of the state derivatives, J[i, j] = df_i/dx_j, derived symbolically.
+        The function takes the time as its only argument and returns an array of shape (N, k, k), for the k state
+        variables of the population in order.
+
+        :rtype: callable
+        """
+        size = len(self.stateVariables)
+        entries, auxiliaries = self.equations.getJacobian(self.stateVariables, self.functionDerivatives)
+        indices = [(self.stateVariables.index(name), self.stateVariables.index(variable)) for name, variable in entries]
+        kernel = self.compileKernel(entries.values(), auxiliaries.values())
+
+        def run(t):
+            res = numpy.zeros((self.n, size, size))
+            for (i, j), value in zip(indices, kernel(t)):
+                res[:, i, j] = value
+            return res
+
+        return run
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def compileReceiver(self, code):
+        """
+        Compile a function applying synaptic code, such as ``ge += w``, to some neurons of the population.
+        Statements are executed in order, as in Brian. The function takes the indices of the neurons, the weights of their
+        events and the time as arguments.
+
+        :param code: the statements, one per line
+        :type code: string
+
+        :rtype: callable
+
+        :raises: ValueError if a statement cannot be parsed, or assigns a name which is not a variable of the population
+        """
+        statements = []
+        for line in code.split('\n'):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            match = _statementPattern.match(line)
+            if match is None or match.group('name') not in self.state:
+                raise ValueError('Cannot apply synaptic statement to population ' + str(self.name) + ': ' + line)
+            expression = expressions.parse(match.group('expression'))
+            if match.group('op'):
+                expression = expressions.BinOp(match.group('op'), expressions.Name(match.group('name')), expression)
+            statements.append((match.group('name'), expression))
+
+        names = set()
+        for name, expression in statements:
+            names.add(name)
+            names.update(expressions.getNames(expression))
+
+        lines = ['def receiver(_state, _index, w, t):']
+        for name in self.state:
+            if name in names:
+                lines.append('    ' + name + ' = _state[' + repr(name) + '][_index]')
+        for name, expression in statements:
+            lines.append('    ' + name + ' = ' + expressions.render(numeric.toSI(expression)))
+        for name in sorted(set(name for name, expression in statements)):
+            lines.append('    _state[' + repr(name) + '][_index] = ' + name)
+
+        scope = dict(numeric.FUNCTIONS)
+        scope.update(self.namespace)
+        exec(compile('\n'.join(lines) + '\n', '<brianmodel.engine ' + str(self.name) + ' synapses>', 'exec', numeric.COMPILER_FLAGS), scope)
+
+        receiver = scope['receiver']
+        state = self.state
+
+        def run(index, weights, t):
+            receiver(state, index, weights, t)
+
+        return run
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def receive(self, target, indices, weights, t):
+        """
+        Apply synaptic events to neurons of the population, with the code given by the model for the target variable.
+        The weights of the events received by the same neuron are summed, as synaptic code is linear in the weight.
+
+        :param target: the variable receiving the events, such as the conductance ge
+        :type target: string
+        :param indices: the indices of the neurons receiving an event
+        :type indices: array of int
+        :param weights: the weights of the events, in SI units
+        :type weights: float or array
+        :param t: the time of the events, in seconds
+        :type t: float
+        """
+        receiver = self._receivers.get(target)
+        if receiver is None:
+            receiver = self._receivers[target] = self.compileReceiver(self._getSynapseCode(target))
+
+        indices = numpy.asarray(indices, dtype=int)
+        weights = numpy.bincount(indices, numpy.ones(len(indices)) * weights, minlength=self.n)
+        index = numpy.flatnonzero(weights)
+        receiver(index, weights[index], t)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def step(self, t, dt):
+        """
+        Advance the state of the population by one time step.
+
+        :param t: the current time, in seconds
+        :type t: float
+        :param dt: the time step, in seconds
+        :type dt: float
+        """
+        self.stepper.step(t, dt)
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
@@ -0,0 +1,211 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    resultstore
+    ~~~~~~~~~~~~~
+    This module contains the on-disk store of the results of the reference engine, keyed by a fingerprint of everything
+    which determines a run: the generated equations of each population, the values of its state variables and parameters
+    when the run starts, its namespace and lookup tables, the integration method, the time step, the duration, the
+    recorded variables, and the description of the inputs.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from utilities import diskcache
+
+import collections
+import hashlib
+import json
+import numbers
+import os
+import zipfile
+
+import numpy
+
+
+
+# Format of the stored runs, part of their key, bumped whenever the engine computes or stores the same run differently
+FORMAT = 1
+
+
+## ***************************************************************************************************************** ##
+def getFingerprint(engine, duration, dt, record=('v', ), recordEvery=1, protocol=None):
+    """
+    Compute the key of a run of an engine in a :class:`ResultStore`, see :meth:`Engine.run`.
+    The key is a hash of a canonical description of the run, in which arrays are represented by the hash of their values.
+
+    :param engine: the engine, in the state from which the run starts
+    :type engine: :class:`Engine`
+    :param protocol: the description of the inputs of the run, such as their rates, weights and the seed of their random
+        number generator
+    :type protocol: JSON-serialisable value
+
+    :returns: the hexadecimal digest of the run
+    :rtype: string
+
+    :raises: ValueError if the namespace of a population holds a function which is not a lookup table
+    """
+    populations = []
+    for name, population in engine.populations.iteritems():
+        referenced = population.equations.getExternalNames() | population.equations.getFunctionNames()
+        namespace = dict((key, _describe(population.namespace[key], key, name)) for key in referenced if key in population.namespace)
+        state = dict((key, _describe(values, key, name)) for key, values in population.state.iteritems())
+        populations.append([name, population.n, population.equations.render(), namespace, state])
+
+    description = {
+        'format': FORMAT,
+        'populations': populations,
+        'method': engine.method,
+        'threshold': engine.threshold,
+        't': engine.t,
+        'duration': duration,
+        'dt': dt,
+        'record': sorted(set(record)),
+        'recordEvery': recordEvery,
+        'protocol': protocol,
+    }
+
+    return hashlib.sha1(json.dumps(description, sort_keys=True).encode('utf-8')).hexdigest()
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _describe(value, key, population):
+    """
+    Return a JSON-serialisable description of a value of the namespace or of the state of a population.
+    """
+    if isinstance(value, numbers.Number):
+        return float(value)
+    if isinstance(value, numpy.ndarray):
+        return _digestArray(value)
+    # Lookup tables are defined by their samples
+    if hasattr(value, 'voltages') and hasattr(value, 'values'):
+        return [_digestArray(value.voltages), _digestArray(value.values)]
+
+    raise ValueError('Cannot fingerprint ' + key + ' in the namespace of population ' + str(population) + ': ' + repr(value))
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _digestArray(array):
+    """
+    Return the description of an array, as its type, its shape and the hash of its values.
+    """
+    array = numpy.ascontiguousarray(array)
+
+    return [array.dtype.str, list(array.shape), hashlib.sha1(array.view(numpy.uint8)).hexdigest()]
+## ***************************************************************************************************************** ##
+
+
+
+## ***************************************************************************************************************** ##
+class ResultStore(diskcache.DiskCache):
+    """
+    The :class:`ResultStore` stores the results of runs of the reference engine, along with the state of the engine at the
+    end of each run, so that a stored run can replace the simulation. Each entry is a compressed NumPy archive, and the
+    least recently used entries are evicted whenever the total size of the store exceeds its cap.
+
+    Initialised as:
+
+        ResultStore(directory, maxSize)
+
+    with arguments:
+
+        ``directory``
+        The directory holding the stored results (string). Defaults to ~/.cache/brianmodel/results
+
+        ``maxSize``
+        The maximum total size of the store, in bytes (int)
+    """
+
+    # Suffix of the entry files
+    suffix = '.npz'
+
+
+    ## ************************************************************ ##
+    def __init__(self, directory=None, maxSize=512 * 1024 ** 2):
+        """
+        Default constructor.
+
+        :param directory: the directory holding the stored results
+        :type directory: string
+        :param maxSize: the maximum total size of the store in bytes
+        :type maxSize: int
+        """
+        if directory is None:
+            directory = os.path.join(diskcache.getDefaultCacheDir(), 'results')
+        super(ResultStore, self).__init__(directory, maxSize)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def serialise(self, value, f):
+        """
+        Write a stored run to an open file, as a compressed archive of flat arrays named after the population and the
+        variable, such as 'results/PY/v' or 'state/PY/m'.
+        """
+        arrays = {'t': numpy.array(value['t'])}
+        for name, results in value['results'].iteritems():
+            for var, values in results.iteritems():
+                if var == 'spikes':
+                    arrays['results/' + name + '/spikes/indices'] = values[0]
+                    arrays['results/' + name + '/spikes/times'] = values[1]
+                else:
+                    arrays['results/' + name + '/' + var] = values
+        for name, state in value['state'].iteritems():
+            for var, values in state.iteritems():
+                arrays['state/' + name + '/' + var] = values
+
+        numpy.savez_compressed(f, **arrays)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def deserialise(self, f):
+        """
+        Read a stored run from an open file.
+        """
+        try:
+            archive = numpy.load(f)
+            value = {'t': float(archive['t']), 'results': {}, 'state': collections.defaultdict(dict)}
+            for key in archive.files:
+                if key == 't':
+                    continue
+                part, name, var = key.split('/', 2)
+                if part == 'state':
+                    value['state'][name][var] = archive[key]
+                else:
+                    value['results'].setdefault(name, {'spikes': [None, None]})
+                    if var.startswith('spikes/'):
+                        value['results'][name]['spikes'][var == 'spikes/times'] = archive[key]
+                    else:
+                        value['results'][name][var] = archive[key]
+        except (KeyError, IOError, OSError, zipfile.BadZipfile) as e:
+            raise ValueError('Invalid stored result: ' + str(e))
+
+        for results in value['results'].itervalues():
+            results['spikes'] = tuple(results['spikes'])
+
+        return value
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
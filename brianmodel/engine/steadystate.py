@@ -0,0 +1,175 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    steadystate
+    ~~~~~~~~~~~~~
+    This module contains the computation of the steady state of the state variables of a population, and of its resting
+    state, so that simulations can start at rest instead of settling during a warm-up period.
+    All the neurons of the population are solved at once, each with its own parameters.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from utilities import linearity
+
+import collections
+
+import numpy
+
+
+
+## ***************************************************************************************************************** ##
+def compileSteadyState(population, fixed=('v', )):
+    """
+    Compile a function setting the state variables of a population to their steady state for the current value of the
+    fixed variables, x = -B / A for equations written dx/dt = A * x + B.
+    The steady states are computed iteratively, as the steady state of a variable, such as the calcium concentration,
+    may depend on the others. Variables with a nonlinear or unstable equation are left unchanged.
+
+    :param population: the population
+    :type population: :class:`Population`
+    :param fixed: the state variables which keep their value, such as the membrane potential
+    :type fixed: iterable of strings
+
+    :returns: a function without arguments
+    :rtype: callable
+    """
+    equations = population.equations
+    names = []
+    outputs = []
+    for name in population.stateVariables:
+        form = linearity.getLinearForm(equations, name, population.functionDerivatives) if name not in fixed else None
+        if form is not None:
+            names.append(name)
+            outputs.extend(form)
+    kernel = population.compileKernel(outputs) if names else None
+    state = population.state
+
+    def run():
+        if kernel is None:
+            return
+        for iteration in xrange(len(names) + 1):
+            res = kernel(0.)
+            changed = False
+            for index, name in enumerate(names):
+                a, b = numpy.broadcast_arrays(res[2 * index], res[2 * index + 1], state[name])[:2]
+                value = numpy.where(a < 0, b / numpy.where(a < 0, -a, 1.), state[name])
+                changed = changed or not numpy.allclose(value, state[name], equal_nan=True)
+                state[name][:] = value
+            if not changed:
+                break
+
+    return run
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def setRestingState(population, vMin=-100e-3, vMax=50e-3, resolution=1e-3, variable='v'):
+    """
+    Set a population to its resting state: the membrane potential at which dv/dt vanishes with every other state
+    variable at its steady state, and these steady states.
+
+    The resting potential of each neuron is the lowest root of dv/dt in the range at which the model is stable, i.e. at
+    which dv/dt changes from positive to negative and the eigenvalues of the Jacobian of the model have negative real
+    parts. Roots are bracketed by scanning the range, and refined by bisection. Parameters such as
+    ``I_stim`` keep their current value, and may differ between neurons. Neurons without a resting potential in the
+    range, such as tonically firing neurons, keep their membrane potential, and only the other variables are set to
+    their steady state. When the membrane potential is not a state variable, as with a voltage clamp, only the other
+    variables are set.
+
+    :param population: the population
+    :type population: :class:`Population`
+    :param vMin: the lower end of the range of potentials, in volt
+    :type vMin: float
+    :param vMax: the upper end of the range of potentials, in volt
+    :type vMax: float
+    :param resolution: the spacing of the potentials scanned for roots, in volt
+    :type resolution: float
+    :param variable: the name of the membrane potential
+    :type variable: string
+
+    :returns: a copy of the resulting state variables, in SI units
+    :rtype: :class:`collections.OrderedDict` of arrays
+    """
+    with numpy.errstate(invalid='ignore'):
+        return _setRestingState(population, vMin, vMax, resolution, variable)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _setRestingState(population, vMin, vMax, resolution, variable):
+    """
+    Set a population to its resting state, comparisons with undefined values being silent.
+    """
+    state = population.state
+    steady = compileSteadyState(population, (variable, ))
+
+    if variable in population.stateVariables:
+        derivative = population.compileKernel([population.equations[variable].expression])
+        jacobian = population.compileJacobian()
+
+        def evaluate(v):
+            state[variable][:] = v
+            steady()
+            return numpy.broadcast_to(derivative(0.)[0], v.shape)
+
+        # Bracket the roots of each neuron where dv/dt changes from positive to negative, and rank them from the lowest
+        resting = state[variable].copy()
+        potentials = numpy.arange(vMin, vMax + resolution / 2., resolution)
+        previous = evaluate(numpy.full(population.n, potentials[0]))
+        brackets = []
+        for v in potentials[1:]:
+            current = evaluate(numpy.full(population.n, v))
+            brackets.append((previous > 0) & (current <= 0))
+            previous = current
+        brackets = numpy.array(brackets)
+        ranks = numpy.cumsum(brackets, axis=0) * brackets
+
+        # Refine the roots of each rank by bisection, and keep the first one at which the whole model is stable
+        found = numpy.zeros(population.n, dtype=bool)
+        for rank in xrange(1, ranks.max() + 1 if ranks.size else 1):
+            candidates = (ranks == rank).any(axis=0) & ~found
+            if not candidates.any():
+                continue
+            low = potentials[(ranks == rank).argmax(axis=0)]
+            high = low + resolution
+            for iteration in xrange(50):
+                middle = numpy.where(candidates, (low + high) / 2., resting)
+                positive = evaluate(middle) > 0
+                low = numpy.where(candidates & positive, middle, low)
+                high = numpy.where(candidates & ~positive, middle, high)
+
+            roots = numpy.where(candidates, (low + high) / 2., resting)
+            evaluate(roots)
+            eigenvalues = numpy.linalg.eigvals(jacobian(0.)[candidates])
+            stable = candidates.copy()
+            stable[candidates] = (eigenvalues.real < 0).all(axis=1)
+            resting[stable] = roots[stable]
+            found |= stable
+
+        state[variable][:] = resting
+
+    steady()
+
+    return collections.OrderedDict((name, state[name].copy()) for name in population.stateVariables)
+## ***************************************************************************************************************** ##
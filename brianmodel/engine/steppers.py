@@ -0,0 +1,350 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    steppers
+    ~~~~~~~~~~~~~
+    This module contains the integration methods of the reference engine.
+    Each stepper advances all the state variables of a :class:`Population` by one time step.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from utilities import expressions
+from utilities import linearity
+from utilities import numeric
+from utilities import units
+
+import collections
+
+import numpy
+
+
+
+## ***************************************************************************************************************** ##
+class Stepper(object):
+    """
+    The :class:`Stepper` is the base class of integration methods.
+
+    Initialised as:
+
+        Stepper(population)
+
+    with arguments:
+
+        ``population``
+        The population to integrate (:class:`Population`)
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, population):
+        """
+        Default constructor.
+        """
+        self.population = population
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def step(self, t, dt):
+        """
+        Advance the state of the population by one time step.
+        """
+        raise NotImplementedError()
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class ForwardEuler(Stepper):
+    """
+    The :class:`ForwardEuler` integrates every state variable with the explicit Euler method: x(t + dt) = x(t) + dt * f(x(t)).
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, population):
+        """
+        Default constructor.
+        """
+        Stepper.__init__(self, population)
+
+        equations = population.equations
+        self._kernel = population.compileKernel([equations[name].expression for name in population.stateVariables])
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def step(self, t, dt):
+        """
+        Advance the state of the population by one time step.
+        """
+        state = self.population.state
+        derivatives = self._kernel(t)
+
+        for name, f in zip(self.population.stateVariables, derivatives):
+            state[name] += dt * f
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class ExponentialEuler(Stepper):
+    """
+    The :class:`ExponentialEuler` integrates each state variable x exactly over one time step, under the linear approximation
+    dx/dt = f(x(t)) + B * (x - x(t)), where B = df/dx is derived symbolically and the other variables are frozen.
+    The update is x(t + dt) = x(t) + dt * f * (exp(B * dt) - 1) / (B * dt).
+
+    This is exact for conditionally linear equations, such as the gating variables of Hodgkin-Huxley currents,
+    and stays stable at much larger time steps than the forward Euler method.
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, population):
+        """
+        Default constructor.
+        """
+        Stepper.__init__(self, population)
+
+        equations = population.equations
+        auxiliaries = collections.OrderedDict()
+        outputs = []
+        for name in population.stateVariables:
+            expression = equations[name].expression
+            outputs.append(expression)
+            outputs.append(equations.differentiate(expression, name, auxiliaries, population.functionDerivatives))
+
+        self._kernel = population.compileKernel(outputs, auxiliaries.values())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def step(self, t, dt):
+        """
+        Advance the state of the population by one time step.
+        """
+        state = self.population.state
+        res = self._kernel(t)
+
+        for i, name in enumerate(self.population.stateVariables):
+            state[name] += _getExponentialIncrement(res[2 * i], res[2 * i + 1], dt)
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class PerVariable(Stepper):
+    """
+    The :class:`PerVariable` integrates each state variable with the cheapest update rule suited to its equation, given by
+    :func:`linearity.getUpdateRules`:
+
+        - linear equations with numerical coefficients, dx/dt = A * x + B, are solved exactly as
+          x(t + dt) = x(t) * exp(A * dt) + B / A * (exp(A * dt) - 1), with factors computed once per time step size,
+          so that the variable is not evaluated by the kernel at all;
+        - other linear and conditionally linear equations are integrated with the exponential Euler update, which is exact for them;
+        - nonlinear equations are integrated with the forward Euler method.
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, population):
+        """
+        Default constructor.
+        """
+        Stepper.__init__(self, population)
+
+        equations = population.equations
+        rules = linearity.getUpdateRules(equations, population.functionDerivatives)
+
+        # Linear equations with numerical coefficients, as (name, A, B)
+        self._exact = []
+        # Outputs of the kernel, and the update applied to each state variable from them, as (name, index, exponential)
+        auxiliaries = collections.OrderedDict()
+        outputs = []
+        self._updates = []
+        for name, rule in rules.iteritems():
+            if rule == 'exact':
+                a, b = linearity.getLinearForm(equations, name, population.functionDerivatives)
+                if all(units.isUnit(n) for n in expressions.getNames(a) | expressions.getNames(b)):
+                    self._exact.append((name, float(numeric.evaluate(a)), float(numeric.evaluate(b))))
+                    continue
+
+            expression = equations[name].expression
+            self._updates.append((name, len(outputs), rule != 'euler'))
+            outputs.append(expression)
+            if rule != 'euler':
+                outputs.append(equations.differentiate(expression, name, auxiliaries, population.functionDerivatives))
+
+        self._kernel = population.compileKernel(outputs, auxiliaries.values()) if outputs else None
+        self._dt = None
+        self._factors = []
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def step(self, t, dt):
+        """
+        Advance the state of the population by one time step.
+        """
+        state = self.population.state
+        res = self._kernel(t) if self._kernel is not None else ()
+
+        if dt != self._dt:
+            self._dt = dt
+            self._factors = [(name, numpy.exp(a * dt), b * dt if a == 0 else b / a * numpy.expm1(a * dt)) for name, a, b in self._exact]
+
+        for name, i, exponential in self._updates:
+            if exponential:
+                state[name] += _getExponentialIncrement(res[i], res[i + 1], dt)
+            else:
+                state[name] += dt * res[i]
+
+        for name, decay, offset in self._factors:
+            x = state[name]
+            x *= decay
+            x += offset
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class Rosenbrock(Stepper):
+    """
+    The :class:`Rosenbrock` integrates the state variables with the second order, L-stable Rosenbrock method ROS2, using
+    the Jacobian J of the model derived symbolically:
+
+        (I - gamma * dt * J) * k1 = f(x(t))
+        (I - gamma * dt * J) * k2 = f(x(t) + dt * k1) - 2 * k1
+        x(t + dt) = x(t) + dt * (3 * k1 + k2) / 2
+
+    with gamma = 1 + 1 / sqrt(2). The method is linearly implicit: each step solves linear systems instead of nonlinear
+    equations, and costs two evaluations of the model and one of its Jacobian. It stays stable for stiff equations,
+    such as the fast sodium activation of the Wang-Buzsaki interneuron, at time steps where explicit methods diverge.
+
+    References:
+        - Verwer, J. G., Spee, E. J., Blom, J. G., & Hundsdorfer, W. (1999). A second-order Rosenbrock method applied to photochemical dispersion problems. SIAM Journal on Scientific Computing, 20(4), 1456-1480.
+    """
+
+    GAMMA = 1 + 1 / numpy.sqrt(2)
+
+    ## ************************************************************ ##
+    def __init__(self, population):
+        """
+        Default constructor.
+        """
+        Stepper.__init__(self, population)
+
+        equations = population.equations
+        names = population.stateVariables
+        derivatives = [equations[name].expression for name in names]
+        entries, auxiliaries = equations.getJacobian(names, population.functionDerivatives)
+        self._indices = [(names.index(name), names.index(variable)) for name, variable in entries]
+
+        self._kernel = population.compileKernel(derivatives + entries.values(), auxiliaries.values())
+        self._derivatives = population.compileKernel(derivatives)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def step(self, t, dt):
+        """
+        Advance the state of the population by one time step.
+        """
+        population = self.population
+        state = population.state
+        names = population.stateVariables
+        size = len(names)
+
+        res = self._kernel(t)
+        jacobian = numpy.zeros((population.n, size, size))
+        for (i, j), value in zip(self._indices, res[size:]):
+            jacobian[:, i, j] = value
+        with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            inverse = numpy.linalg.inv(numpy.eye(size) - self.GAMMA * dt * jacobian)
+
+        k1 = numpy.einsum('nij,nj->ni', inverse, self._stack(res[:size]))
+
+        # Second stage, evaluated with the state advanced by dt * k1
+        current = [state[name] for name in names]
+        try:
+            for index, name in enumerate(names):
+                state[name] = current[index] + dt * k1[:, index]
+            f = self._stack(self._derivatives(t + dt))
+        finally:
+            for index, name in enumerate(names):
+                state[name] = current[index]
+        k2 = numpy.einsum('nij,nj->ni', inverse, f - 2 * k1)
+
+        for index, name in enumerate(names):
+            state[name] += dt * (1.5 * k1[:, index] + 0.5 * k2[:, index])
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _stack(self, values):
+        """
+        Stack the values of the state derivatives into an array of shape (N, k).
+        """
+        res = numpy.empty((self.population.n, len(values)))
+        for index, value in enumerate(values):
+            res[:, index] = value
+
+        return res
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getExponentialIncrement(f, derivative, dt):
+    """
+    Return the exponential Euler increment of a variable over a time step, dt * f * (exp(B * dt) - 1) / (B * dt), where
+    B is the derivative of f with respect to the variable.
+    """
+    z = derivative * dt
+    with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        return dt * numpy.where(numpy.abs(z) > 1e-12, numpy.expm1(z) / z, 1.) * f
+## ***************************************************************************************************************** ##
+
+
+
+# Integration methods, by name
+STEPPERS = {
+    'euler': ForwardEuler,
+    'exponential_euler': ExponentialEuler,
+    'auto': PerVariable,
+    'rosenbrock': Rosenbrock,
+}
+
+
+## ***************************************************************************************************************** ##
+def getStepper(method):
+    """
+    Return the stepper class implementing the given integration method.
+
+    :param method: the name of the integration method
+    :type method: string
+
+    :raises: ValueError if the method is unknown
+    """
+    try:
+        return STEPPERS[method]
+    except KeyError:
+        raise ValueError('Unknown integration method ' + str(method) + ', expected one of: ' + ', '.join(sorted(STEPPERS)))
+## ***************************************************************************************************************** ##
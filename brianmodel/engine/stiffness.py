@@ -0,0 +1,286 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    stiffness
+    ~~~~~~~~~~~~~
+    This module contains the analysis of the timescales of a neuron model over a range of membrane potentials, and of the
+    largest time step at which each integration method of the reference engine is stable.
+
+    The model is linearised at each membrane potential v of the range, with every other state variable at its steady
+    state for v, e.g. n = n_inf(v). The time constants of the state variables are read from the diagonal of the Jacobian
+    of the model, J[x, x] = -1 / tau_x, and the timescales of the coupled system from its eigenvalues.
+    A method is stable at a time step dt if, at every potential at which the linearised model is stable, the spectral
+    radius of its amplification matrix is at most 1, or at most exp(r * dt) for a tolerated growth rate r. Potentials at which the model itself is unstable, such as during
+    the upstroke of a spike, are left out, as the growth of the numerical solution cannot be told from that of the model.
+    The Rosenbrock method is stable at any time step, and its time step is limited by accuracy instead, to a fraction of the
+    timescale of the fastest growing mode of the model, which drives the upstroke of a spike. Decaying modes, however fast,
+    are damped by the method and do not limit it, and neither is it limited below the stable time step of forward Euler.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from utilities import linearity
+from population import Population
+import steadystate
+import steppers
+
+import collections
+
+import numpy
+
+
+
+# Integration methods of the reference engine, which the analysis reports on
+METHODS = ('euler', 'exponential_euler', 'auto', 'rosenbrock')
+
+# Range of the time steps searched for the largest stable one, in second
+DT_MIN = 1e-7
+DT_MAX = 1e-1
+
+# Fraction of the timescale of the fastest growing mode of the model which limits the time step of the Rosenbrock method
+ACCURACY = 0.1
+
+
+
+## ***************************************************************************************************************** ##
+def analyzeStiffness(model, namespace=None, vMin=-100e-3, vMax=50e-3, resolution=0.5e-3, growthRate=0., variable='v'):
+    """
+    Analyse the timescales of a neuron model over a range of membrane potentials, and recommend the largest stable time
+    step of each integration method of the reference engine.
+
+    The report contains:
+
+        ``timescales``
+        The fastest time constant of each state variable and the potential at which it is reached, by variable name
+        (:class:`collections.OrderedDict` of (float, float) tuples)
+
+        ``fastest``
+        The fastest timescale of the coupled system, 1 / |lambda| over its decaying modes, and the potential at which it
+        is reached (tuple of floats)
+
+        ``stiffnessRatio``
+        The largest ratio of the slowest to the fastest decay rate of the system over the range (float)
+
+        ``maxDt``
+        The largest stable time step of each method, by method name, or None if the method is stable up to
+        :data:`DT_MAX`. The time step of the Rosenbrock method is limited by accuracy instead, to :data:`ACCURACY` times
+        1 / Re(lambda) over the growing modes of the system, and at least the time step of forward Euler (dict of floats)
+
+    :param model: the neuron model (:class:`Neuron`, equation string or :class:`Equations`)
+    :param namespace: the values of the external names referenced by the model, in SI units
+    :type namespace: dict
+    :param vMin: the lower end of the range of potentials, in volt
+    :type vMin: float
+    :param vMax: the upper end of the range of potentials, in volt
+    :type vMax: float
+    :param resolution: the spacing of the potentials, in volt
+    :type resolution: float
+    :param growthRate: the growth rate of the numerical solution which is tolerated, in Hz, as weakly damped oscillations
+        near the firing threshold otherwise set the limit of the exponential Euler method
+    :type growthRate: float
+    :param variable: the name of the membrane potential
+    :type variable: string
+
+    :returns: the report, with all quantities in SI units
+    :rtype: dict
+    """
+    population, potentials, jacobian = _linearise(model, namespace, vMin, vMax, resolution, variable)
+
+    res = {}
+
+    # Time constants of the state variables
+    diagonal = jacobian.diagonal(axis1=1, axis2=2)
+    res['timescales'] = collections.OrderedDict()
+    for index, name in enumerate(population.stateVariables):
+        rates = numpy.where(diagonal[:, index] < 0, -diagonal[:, index], 0.)
+        if rates.any():
+            fastest = rates.argmax()
+            res['timescales'][name] = (1. / rates[fastest], potentials[fastest])
+
+    # Timescales of the coupled system
+    eigenvalues = numpy.linalg.eigvals(jacobian)
+    decaying = eigenvalues.real < 0
+    rates = numpy.where(decaying, numpy.abs(eigenvalues), 0.).max(axis=1)
+    fastest = rates.argmax()
+    res['fastest'] = (1. / rates[fastest], potentials[fastest]) if rates[fastest] > 0 else None
+    decays = numpy.where(decaying, -eigenvalues.real, numpy.nan)
+    with numpy.errstate(invalid='ignore'):
+        ratios = numpy.nanmax(decays, axis=1) / numpy.nanmin(decays, axis=1)
+    res['stiffnessRatio'] = float(numpy.nanmax(ratios)) if numpy.isfinite(ratios).any() else None
+
+    # Largest stable time step of each method, at the potentials where the model is stable
+    stable = decaying.all(axis=1)
+    rules = linearity.getUpdateRules(population.equations, population.functionDerivatives)
+    exponential = {
+        'euler': numpy.zeros(len(rules), dtype=bool),
+        'exponential_euler': numpy.ones(len(rules), dtype=bool),
+        'auto': numpy.array([rule != 'euler' for rule in rules.values()], dtype=bool),
+        'rosenbrock': None,
+    }
+    res['maxDt'] = dict((method, _getMaxStableDt(jacobian[stable], exponential[method], growthRate)) for method in METHODS)
+
+    # Limit of the Rosenbrock method set by accuracy, as the spikes are lost when it steps over their upstroke
+    growth = float(eigenvalues.real.max()) if len(eigenvalues) else 0.
+    if growth > 0:
+        res['maxDt']['rosenbrock'] = min(res['maxDt']['rosenbrock'] or DT_MAX, max(ACCURACY / growth, res['maxDt']['euler'] or DT_MAX))
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getTimeConstants(model, namespace=None, vMin=-100e-3, vMax=50e-3, resolution=0.5e-3, variable='v'):
+    """
+    Return the time constant of each state variable of a neuron model over a range of membrane potentials,
+    tau_x = -1 / J[x, x], with every other state variable at its steady state, as in :func:`analyzeStiffness`.
+
+    :param model: the neuron model (:class:`Neuron`, equation string or :class:`Equations`)
+    :param namespace: the values of the external names referenced by the model, in SI units
+    :type namespace: dict
+    :param vMin: the lower end of the range of potentials, in volt
+    :type vMin: float
+    :param vMax: the upper end of the range of potentials, in volt
+    :type vMax: float
+    :param resolution: the spacing of the potentials, in volt
+    :type resolution: float
+    :param variable: the name of the membrane potential
+    :type variable: string
+
+    :returns: the potentials, and the time constants of each state variable at these potentials by variable name, which
+        are infinite where the variable does not decay
+    :rtype: tuple of an array and a :class:`collections.OrderedDict` of arrays
+    """
+    population, potentials, jacobian = _linearise(model, namespace, vMin, vMax, resolution, variable)
+
+    diagonal = jacobian.diagonal(axis1=1, axis2=2)
+    res = collections.OrderedDict()
+    for index, name in enumerate(population.stateVariables):
+        decaying = diagonal[:, index] < 0
+        res[name] = numpy.where(decaying, -1. / numpy.where(decaying, diagonal[:, index], -1.), numpy.inf)
+
+    return potentials, res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _linearise(model, namespace, vMin, vMax, resolution, variable):
+    """
+    Return a population of a neuron model sampling a range of membrane potentials, with every other state variable at its
+    steady state, the potentials, and the Jacobian of the model at each of them. Potentials at which the Jacobian is not
+    finite are left out.
+    """
+    # Potentials are sampled in the middle of each interval of the range, away from the removable singularities of rate
+    # functions such as (v - vT - 13 * mV) / (exp(...) - 1) at v = vT + 13 mV, which are usually round values
+    potentials = numpy.arange(vMin + resolution / 2., vMax, resolution)
+    population = Population(model, len(potentials), 'euler', namespace)
+    population.state[variable][:] = potentials
+    steadystate.compileSteadyState(population, (variable, ))()
+
+    jacobian = population.compileJacobian()(0.)
+
+    # Potentials at which rate functions are singular
+    finite = numpy.isfinite(jacobian).all(axis=(1, 2))
+
+    return population, potentials[finite], jacobian[finite]
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _isStable(jacobian, exponential, growthRate, dt):
+    """
+    Return whether the linearised update of a method does not grow faster than the tolerated rate at any potential.
+    The update is x(t + dt) = x(t) + dt * Phi * J * x(t), where Phi is the identity for the forward Euler method, and
+    (exp(J[x, x] * dt) - 1) / (J[x, x] * dt) for the variables integrated with the exponential Euler method, as given
+    by the ``exponential`` mask. When the mask is None, the update is that of the Rosenbrock method.
+    """
+    if exponential is None:
+        amplification = _getRosenbrockAmplification(jacobian, dt)
+    else:
+        amplification = _getExponentialAmplification(jacobian, exponential, dt)
+    if not numpy.isfinite(amplification).all():
+        return False
+    radius = numpy.abs(numpy.linalg.eigvals(amplification)).max(axis=1)
+
+    return bool((radius <= numpy.exp(growthRate * dt) * (1 + 1e-9)).all())
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getExponentialAmplification(jacobian, exponential, dt):
+    """
+    Return the amplification matrix of the forward and exponential Euler updates.
+    """
+    z = jacobian.diagonal(axis1=1, axis2=2) * dt
+    with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        phi = numpy.where(numpy.abs(z) > 1e-12, numpy.expm1(z) / z, 1.)
+    phi = numpy.where(exponential, phi, 1.)
+
+    return numpy.eye(jacobian.shape[1]) + dt * phi[:, :, numpy.newaxis] * jacobian
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getRosenbrockAmplification(jacobian, dt):
+    """
+    Return the amplification matrix of the Rosenbrock update, see :class:`steppers.Rosenbrock`: with Z = dt * J and
+    M = (I - gamma * Z) ** -1, the stages are dt * k1 = M * Z * x and dt * k2 = M * (Z * (x + dt * k1) - 2 * dt * k1).
+    """
+    identity = numpy.eye(jacobian.shape[1])
+    z = dt * jacobian
+    with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        inverse = numpy.linalg.inv(identity - steppers.Rosenbrock.GAMMA * z)
+        first = numpy.matmul(inverse, z)
+        second = numpy.matmul(inverse, numpy.matmul(z, identity + first) - 2 * first)
+
+    return identity + 1.5 * first + 0.5 * second
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getMaxStableDt(jacobian, exponential, growthRate):
+    """
+    Return the largest time step at which a method is stable, or None if it is stable up to :data:`DT_MAX`.
+    Time steps are scanned geometrically from :data:`DT_MIN` up to the first unstable one, and the limit is then refined
+    by bisection.
+    """
+    stable = DT_MIN
+    unstable = None
+    dt = DT_MIN
+    while dt <= DT_MAX:
+        if not _isStable(jacobian, exponential, growthRate, dt):
+            unstable = dt
+            break
+        stable = dt
+        dt *= 2 ** 0.25
+    if unstable is None:
+        return None
+
+    for iteration in xrange(20):
+        dt = (stable * unstable) ** 0.5
+        if _isStable(jacobian, exponential, growthRate, dt):
+            stable = dt
+        else:
+            unstable = dt
+
+    return stable
+## ***************************************************************************************************************** ##
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    calciumpool
+    ~~~~~~~~~~~~~
+    This module contains the intracellular calcium pool of a neuron, which is filled by its calcium currents and emptied by a pump.
+
+    References:
+        - Destexhe, A., Babloyantz, A., & Sejnowski, T. J. (1993). Ionic mechanisms for intrinsic slow oscillations in thalamic relay neurons. Biophysical Journal, 65(4), 1538-52.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+
+from utilities import utilities as utilities
+from utilities import equations
+from utilities import expressions
+
+
+# Parameters of the pool
+PARAMETERS = ('tau', 'caInf', 'kUnit', 'kFaraday', 'depth')
+
+# Equations of the pool, in which the total calcium current is written _current
+_template = equations.parseEquations('''
+    dCa_i/dt = driveChannel + (_caInf - Ca_i) /  _tau : mole * meter**-3
+    driveChannel = (-_kUnit * _current / (cm ** 2)) / (2 * _kFaraday * _depth) : mole * meter ** -3 * Hz
+''')
+
+
+## ***************************************************************************************************************** ##
+class CalciumPool(object):
+    """
+    The :class:`CalciumPool` represents the calcium concentration ``Ca_i`` in a thin shell below the membrane of a neuron.
+    The concentration is driven by the sum of the calcium currents of the neuron, and decays to its resting value ``caInf``
+    with the time constant ``tau`` of the pump. Currents such as the CAN current read the concentration from the pool.
+
+    Every parameter attribute ``x`` is mirrored by its safe string representation ``_x``, and assigning a parameter
+    invalidates the cached equations of the :class:`Neuron` the pool belongs to.
+
+    Initialised as:
+
+        CalciumPool(parameters)
+
+    with arguments:
+
+        ``parameters``
+        The parameters of the pool: tau, caInf, kUnit, kFaraday and depth (dict of strings)
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, parameters):
+        """
+        Default constructor.
+
+        :raises: KeyError if a parameter is missing
+        """
+        self._owner = None
+
+        for name in PARAMETERS:
+            setattr(self, name, parameters[name])
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __setattr__(self, name, value):
+        """
+        Set an attribute, keeping the safe string representation of parameters in sync.
+        """
+        object.__setattr__(self, name, value)
+
+        if name in PARAMETERS:
+            object.__setattr__(self, '_' + name, utilities.getSafeStringParam(value))
+            if self._owner is not None:
+                self._owner.invalidate()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getParameterExpressions(self):
+        """
+        Return the parsed parameters of the pool, by placeholder name.
+
+        :rtype: dict of :class:`Expression`
+        """
+        return dict(('_' + name, expressions.parse(getattr(self, '_' + name))) for name in PARAMETERS)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getEquations(self, currents):
+        """
+        Generate the equations of the pool, driven by the given calcium currents.
+
+        :param currents: the names of the calcium currents
+        :type currents: list of strings
+
+        :rtype: :class:`Equations`
+        """
+        current = None
+        for name in currents:
+            current = expressions.Name(name) if current is None else expressions.BinOp('+', current, expressions.Name(name))
+        bindings = self.getParameterExpressions()
+        bindings['_current'] = current
+
+        return equations.Equations(eq.copy(expressions.substitute(eq.expression, bindings)) for eq in _template)
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def fromCurrents(currents):
+    """
+    Build the calcium pool of a neuron from the pump parameters of its calcium currents, for neurons which do not define
+    their pool with the ``calcium`` keyword.
+
+    :param currents: the calcium currents
+    :type currents: list of :class:`IonicCurrent`
+
+    :returns: the pool, or None if no current defines pump parameters
+    :rtype: :class:`CalciumPool`
+
+    :raises: ValueError if the currents define different pump parameters
+    """
+    res = None
+    first = None
+    for curr in currents:
+        if getattr(curr, 'tau', None) is None:
+            continue
+        pool = CalciumPool(dict((name, getattr(curr, name)) for name in PARAMETERS))
+        if res is None:
+            res, first = pool, curr
+        elif pool.getParameterExpressions() != res.getParameterExpressions():
+            raise ValueError('Calcium currents ' + first.name + ' and ' + curr.name + ' define different calcium pumps, define the pool of the neuron with the calcium keyword')
+
+    return res
+## ***************************************************************************************************************** ##
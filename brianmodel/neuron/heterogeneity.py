@@ -0,0 +1,199 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+
+"""
+    heterogeneity
+    ~~~~~~~~~~~~~
+    This module contains the distributions of the parameters which differ between the neurons of a neuron type, so that a
+    single group of neurons can hold cells with different conductances, reversal potentials or areas.
+    It requires NumPy.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from utilities import expressions
+from utilities import units
+
+import os
+
+import numpy
+
+
+
+# Distributions of parameter values, by name, with their settings
+DISTRIBUTIONS = {
+    'normal': ('mean', 'std'),
+    'lognormal': ('mean', 'std'),
+    'uniform': ('low', 'high'),
+}
+
+
+## ***************************************************************************************************************** ##
+def getParameterName(path):
+    """
+    Return the name of the per-neuron parameter replacing a parameter of the neuron, given by its path in the parameter
+    file: ``area`` and ``conductance`` for the parameters of the neuron itself, and ``g_I_Na`` for the parameter ``g`` of
+    the current ``I_Na``, given as ``I_Na.g``.
+
+    :param path: the path of the parameter
+    :type path: string
+
+    :rtype: string
+    """
+    if '.' not in path:
+        return path
+    owner, name = path.split('.', 1)
+
+    return name + '_' + owner
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getQuantity(value):
+    """
+    Return the value of a setting given as a number or as a string with units, such as ``35 * msiemens * cm ** -2``.
+
+    :raises: ValueError if the value cannot be evaluated
+    """
+    if isinstance(value, (int, float)):
+        return units.Quantity(float(value))
+
+    return units.evaluateConstant(expressions.parse(str(value)))
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class ParameterDistribution(object):
+    """
+    The :class:`ParameterDistribution` gives the values of a parameter across the neurons of a neuron type, in SI units.
+
+    Initialised as:
+
+        ParameterDistribution(name, settings, nominal, baseDir)
+
+    with arguments:
+
+        ``name``
+        The name of the per-neuron parameter (string)
+
+        ``settings``
+        The settings given in the parameter file: either a ``distribution`` among :data:`DISTRIBUTIONS` with its
+        settings, or a ``file`` holding the values, as a NumPy array (.npy) or as text, with their ``unit`` (dict)
+
+        ``nominal``
+        The value of the parameter in the equations, with units, such as ``35e-3 * siemens * cm ** -2`` (string)
+
+        ``baseDir``
+        The directory against which a relative file path is resolved (string)
+
+    The ``mean`` of normal and lognormal distributions defaults to the nominal value, and values in a file are in SI units
+    unless their ``unit`` is given.
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, name, settings, nominal, baseDir=None):
+        """
+        Default constructor.
+
+        :raises: ValueError if the settings are incomplete, or their units differ from those of the nominal value
+        """
+        self.name = name
+        self.settings = dict(settings)
+
+        quantity = _getQuantity(nominal)
+        self.nominal = quantity.value
+        self.dimensions = quantity.dims
+        self.unit = units.getUnitString(quantity.dims)
+
+        if 'file' in self.settings:
+            fileName = os.path.expanduser(str(self.settings['file']))
+            if baseDir is not None and not os.path.isabs(fileName):
+                fileName = os.path.join(baseDir, fileName)
+            self.fileName = fileName
+            self.scale = self._getValue(self.settings.get('unit', 1))
+        else:
+            self.fileName = None
+            distribution = self.settings.get('distribution')
+            if distribution not in DISTRIBUTIONS:
+                raise ValueError('Unknown distribution ' + str(distribution) + ' of parameter ' + name + ', expected one of: ' + ', '.join(sorted(DISTRIBUTIONS)) + ', or a file')
+            if distribution in ('normal', 'lognormal'):
+                self.settings.setdefault('mean', nominal)
+            missing = [key for key in DISTRIBUTIONS[distribution] if key not in self.settings]
+            if missing:
+                raise ValueError('Distribution of parameter ' + name + ' lacks settings: ' + ', '.join(missing))
+            self.distribution = distribution
+            self.arguments = tuple(self._getValue(self.settings[key]) for key in DISTRIBUTIONS[distribution])
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _getValue(self, value):
+        """
+        Return the value in SI units of a setting of the distribution, which must have the units of the parameter.
+        Settings given as plain numbers are in SI units.
+        """
+        quantity = _getQuantity(value)
+        if quantity.dims != self.dimensions and quantity.dims != units.DIMENSIONLESS:
+            raise ValueError('Setting ' + str(value) + ' of parameter ' + self.name + ' must be in ' + self.unit)
+
+        return quantity.value
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def sample(self, n, random=None):
+        """
+        Return the values of the parameter for n neurons, in SI units.
+
+        :param n: the number of neurons
+        :type n: int
+        :param random: the random number generator, defaults to that of NumPy
+        :type random: :class:`numpy.random.RandomState`
+
+        :rtype: array
+
+        :raises: ValueError if a file does not hold n values
+        """
+        if self.fileName is not None:
+            if self.fileName.endswith('.npy'):
+                values = numpy.load(self.fileName)
+            else:
+                values = numpy.loadtxt(self.fileName)
+            values = numpy.ravel(values) * self.scale
+            if len(values) != n:
+                raise ValueError('File ' + self.fileName + ' holds ' + str(len(values)) + ' values of parameter ' + self.name + ' for ' + str(n) + ' neurons')
+            return values
+
+        random = random if random is not None else numpy.random
+        if self.distribution == 'normal':
+            mean, std = self.arguments
+            return random.normal(mean, std, n)
+        if self.distribution == 'lognormal':
+            # Parameters of the underlying normal distribution, for the given mean and standard deviation of the values
+            mean, std = self.arguments
+            sigma = numpy.sqrt(numpy.log1p((std / mean) ** 2))
+            return numpy.sign(mean) * random.lognormal(numpy.log(abs(mean)) - sigma ** 2 / 2., sigma, n)
+        low, high = self.arguments
+        return random.uniform(low, high, n)
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
@@ -30,20 +30,80 @@
 
 
 from utilities import utilities as utilities
+from utilities import equations as eqs
+from utilities import expressions
 
-from abc import ABCMeta, abstractmethod
+from abc import ABCMeta
+import collections
+
+
+# Forms of the kinetics of gating variables: opening and closing rates, or steady state and time constant
+GATING_RATES = 'rates'
+GATING_INFTAU = 'inftau'
+GATING_FORMS = (GATING_RATES, GATING_INFTAU)
+
+# Parsed equation templates, and parsed parameter values, shared by all currents, the least recently used of which are
+# evicted beyond their size, as sweeps generate new parameter values
+_templates = collections.OrderedDict()
+_parameters = collections.OrderedDict()
+TEMPLATE_CACHE_SIZE = 256
+PARAMETER_CACHE_SIZE = 4096
+
+
+## ***************************************************************************************************************** ##
+def _parseTemplate(template):
+    """
+    Parse an equation template, once per distinct template among the recently used ones.
+    """
+    return _getCached(_templates, TEMPLATE_CACHE_SIZE, template, eqs.parseEquations)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _parseParameter(value):
+    """
+    Parse the value of a parameter, once per distinct value among the recently used ones.
+    """
+    return _getCached(_parameters, PARAMETER_CACHE_SIZE, value, expressions.parse)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getCached(cache, size, key, parse):
+    """
+    Return the parsed form of a string from a cache, parsing it on a miss, and evicting the least recently used entries
+    beyond the size of the cache.
+    """
+    res = cache.pop(key, None)
+    if res is None:
+        res = parse(key)
+        while len(cache) >= size:
+            cache.popitem(last=False)
+    cache[key] = res
+
+    return res
+## ***************************************************************************************************************** ##
 
 
 ## ***************************************************************************************************************** ##
 class IonicCurrent(object):
     """
     The :class:`IonicCurrent` represents the ionic currents flowing through the cell membrane, and their Brian-compatible string representation.
-    This is the base class for various types of currents.
+    This is the base class for various types of currents, which describe their equations with :meth:`getEquationsTemplate`.
+
+    Every public parameter attribute ``x`` is mirrored by its safe string representation ``_x``, which is kept up to date when the attribute is assigned.
+    Assigning a parameter also invalidates the cached string representation of the current, and that of the :class:`Neuron` it belongs to.
     """
 
     # Define this as an abstract class
     __metaclass__ = ABCMeta
 
+    # Attributes which are not model parameters, and have no safe string representation
+    _plainAttributes = ('name', 'gating')
+
+    # Whether the current carries calcium into the calcium pool of its neuron
+    calcium = False
+
 
     ## ************************************************************ ##
     def __init__(self, parameters, area):
@@ -56,24 +116,213 @@ class IonicCurrent(object):
         :type area: string
         """
 
+        # Initialise cache of generated strings, and owning neuron
+        self._cache = {}
+        self._owner = None
+
         # Initialise attributes
+        self.gating = GATING_RATES
+        self.area = area
         self.name = parameters['name']
         self.g = parameters['g']
         self.E = parameters['E']
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __setattr__(self, name, value):
+        """
+        Set an attribute, keeping the safe string representation of parameters in sync.
+        """
+        object.__setattr__(self, name, value)
+
+        if name.startswith('_'):
+            return
 
         # Store safe string representation of parameters
-        self._g = utilities.getSafeStringParam(utilities.getSafeStringParam(self.g) + ' * '  + utilities.getSafeStringParam(area))
-        self._E = utilities.getSafeStringParam(self.E)
+        if name in ('g', 'area'):
+            # The conductance is scaled by the cell area
+            if hasattr(self, 'g') and hasattr(self, 'area'):
+                object.__setattr__(self, '_g', utilities.getSafeStringParam(utilities.getSafeStringParam(self.g) + ' * '  + utilities.getSafeStringParam(self.area)))
+        elif name not in self._plainAttributes:
+            object.__setattr__(self, '_' + name, utilities.getSafeStringParam(value))
+
+        self.invalidate()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def invalidate(self):
+        """
+        Drop the cached string representation of the current, and of its owning neuron.
+        """
+        self._cache.clear()
+
+        if self._owner is not None:
+            self._owner.invalidate()
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
-    @abstractmethod
+    def getGatingString(self, gate, alpha, beta):
+        """
+        Generate the string representation of the kinetics of a gating variable, given its opening and closing rates.
+        The kinetics are written as ``dx/dt = alpha * (1 - x) - beta * x``, or in the equivalent conditionally linear form
+        ``dx/dt = (xInf - x) / xTau`` when the gating form is GATING_INFTAU, which suits exponential Euler integration.
+
+        :param gate: the name of the gating variable
+        :type gate: string
+        :param alpha: the name of the opening rate, in Hz
+        :type alpha: string
+        :param beta: the name of the closing rate, in Hz
+        :type beta: string
+
+        :returns: the gating equations, one per line
+        :rtype: string
+
+        :raises: ValueError if the gating form is unknown
+        """
+        if self.gating == GATING_RATES:
+            lines = ['d' + gate + '/dt = ' + alpha + ' * (1 - ' + gate + ') - ' + beta + ' * ' + gate + ' : 1']
+        elif self.gating == GATING_INFTAU:
+            lines = [
+                'd' + gate + '/dt = (' + gate + 'Inf - ' + gate + ') / ' + gate + 'Tau : 1',
+                gate + 'Inf = ' + alpha + ' / (' + alpha + ' + ' + beta + ') : 1',
+                gate + 'Tau = 1. / (' + alpha + ' + ' + beta + ') : ms',
+            ]
+        else:
+            raise ValueError('Unknown gating form ' + str(self.gating) + ', expected one of: ' + ', '.join(GATING_FORMS))
+
+        return '\n            '.join(lines)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getEquationsTemplate(self):
+        """
+        Return the equations of the current as a template, in which the name of the current is written ``_name`` and its
+        parameters are referenced by the names of their safe string representations, such as ``_g`` or ``_E``.
+        The template is parsed once for all the currents which share it, and bound to the parameters of each current by
+        :meth:`getEquations`. Currents which only implement :meth:`getIonicCurrentString` return None.
+
+        :rtype: string
+        """
+        return None
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getSynapseCode(self, target, weight='w'):
+        """
+        Return the code applying a synaptic event to a variable of the current, as Brian statements, one per line.
+
+        :param target: the name of the variable receiving the event
+        :type target: string
+        :param weight: the expression of the weight of the event
+        :type weight: string
+
+        :returns: the code, or None if the current has no such variable, as for currents which receive no events
+        :rtype: string
+        """
+        return None
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getTemplateBinding(self, placeholder):
+        """
+        Return the expression which replaces a placeholder of the equations template.
+
+        :param placeholder: the name of the placeholder, starting with an underscore
+        :type placeholder: string
+
+        :rtype: :class:`Expression`
+
+        :raises: AttributeError if the current has no such parameter
+        """
+        if placeholder == '_name':
+            return expressions.Name(self.name)
+
+        return _parseParameter(getattr(self, placeholder))
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getMergeKey(self):
+        """
+        Return the key under which the current can be merged with the other currents of its neuron.
+        Currents sharing a key have equations which are linear in their state variables, with the same coefficients, so
+        that they can be replaced by the first of them, whose state holds the sum of theirs. Currents which cannot be
+        merged return None.
+
+        :rtype: hashable
+        """
+        return None
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getMergeAliases(self, target):
+        """
+        Return the names of the current and of its state variables, mapped to those of the current it is merged into.
+
+        :param target: the current replacing this one
+        :type target: :class:`IonicCurrent`
+
+        :rtype: dict of strings
+        """
+        return {self.name: target.name}
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def getEquations(self):
+        """
+        Generate the equations of the ionic current, by binding its template to the parameters of the current.
+        Equations defining a placeholder, such as ``_name = ... : amp``, are renamed after the name the placeholder is bound to.
+
+        :rtype: :class:`Equations`
+
+        :raises: ValueError if an equation defines a placeholder bound to an expression other than a name
+        """
+        template = self.getEquationsTemplate()
+        if template is None:
+            return eqs.parseEquations(self.getIonicCurrentString())
+        template = _parseTemplate(template)
+
+        bindings = {}
+        for eq in template:
+            for name in eq.getNames() | set([eq.name]):
+                if name.startswith('_') and name not in bindings:
+                    bindings[name] = self.getTemplateBinding(name)
+
+        res = eqs.Equations()
+        for eq in template:
+            expression = None if eq.expression is None else expressions.substitute(eq.expression, bindings)
+            name = eq.name
+            if name in bindings:
+                if not isinstance(bindings[name], expressions.Name):
+                    raise ValueError('Placeholder ' + name + ' of current ' + self.name + ' must be bound to a name')
+                name = bindings[name].name
+            res.append(eqs.Equation(eq.kind, name, expression, eq.unit))
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
     def getIonicCurrentString(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the string representation of the ionic current, by rendering its equations.
+        Currents which do not define an equations template implement this method instead.
+
+        :raises: NotImplementedError if the current defines neither
         """
+        if self.getEquationsTemplate() is None:
+            raise NotImplementedError(type(self).__name__ + ' defines neither getEquationsTemplate nor getIonicCurrentString')
 
-        pass
+        return self.getEquations().render()
     ## ************************************************************ ##
 ## ***************************************************************************************************************** ##
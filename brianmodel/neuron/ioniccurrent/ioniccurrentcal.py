@@ -32,10 +32,11 @@
 """
 
 
-from utilities import utilities as utilities
 from ioniccurrent import IonicCurrent
+from ioniccurrentfactory import registerIonicCurrent
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentCaLReuveni(IonicCurrent):
     """
     The :class:`IonicCurrentCaLReuveni`` represents the L-type Calcium current, as defined in (Reuveni et al.), and its string representation.
@@ -57,6 +58,9 @@ class IonicCurrentCaLReuveni(IonicCurrent):
         - Reuveni I; Friedman A; Amitai Y; Gutnick MJ. Stepwise repolarization from Ca2+ plateaus in neocortical pyramidal cells: evidence for nonhomogeneous distribution of HVA Ca2+ channels in dendrites. Journal of Neuroscience, 1993 Nov, 13(11):4609-21.
     """
 
+    # The current fills the calcium pool of the neuron
+    calcium = True
+
     ## ************************************************************ ##
     def __init__(self, params, area):
         """
@@ -71,32 +75,26 @@ class IonicCurrentCaLReuveni(IonicCurrent):
         # Initialise attributes
         IonicCurrent.__init__(self, params, area)
         # self.tempK = "(" + params['temp'] + " + 273.15) * kelvin"
-        self.tau = params['tau']
-        self.caInf = params['caInf']
-        self.kUnit = params['kUnit']
-        self.kFaraday = params['kFaraday']
-        self.depth = params['depth']
-
-        # Store safe string representation of parameters
-        # self._tempK = utilities.getSafeStringParam(self.tempK)
-        self._tau = utilities.getSafeStringParam(self.tau)
-        self._caInf = utilities.getSafeStringParam(self.caInf)
-        self._kUnit = utilities.getSafeStringParam(self.kUnit)
-        self._kFaraday = utilities.getSafeStringParam(self.kFaraday)
-        self._depth = utilities.getSafeStringParam(self.depth)
+
+        # Pump of the calcium pool, unless the neuron defines its own pool
+        self.tau = params.get('tau')
+        self.caInf = params.get('caInf')
+        self.kUnit = params.get('kUnit')
+        self.kFaraday = params.get('kFaraday')
+        self.depth = params.get('depth')
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         """
 
-        calciumL = \
-            self.name + ''' = ''' + self._g + ''' * (mCaL ** 2) * hCaL * (v - ''' + self._E  + ''') : amp
-            dmCaL/dt = (alphamCaL * (1 - mCaL)) - (betamCaL * mCaL) : 1
-            dhCaL/dt = (alphahCaL * (1 - hCaL)) - (betahCaL * hCaL) : 1
+        calciumL = '''
+            _name = _g * (mCaL ** 2) * hCaL * (v - _E) : amp
+            ''' + self.getGatingString('mCaL', 'alphamCaL', 'betamCaL') + '''
+            ''' + self.getGatingString('hCaL', 'alphahCaL', 'betahCaL') + '''
             alphamCaL = (0.055 * mV ** -1) * ((-27 * mV) - v) / (exp(((-27 * mV) - v) / (3.8 * mV)) - 1.) / ms : Hz
             betamCaL = 0.94 * exp(((-75 * mV) - v) / (17 * mV)) / ms : Hz
             alphahCaL = 0.000457 * exp(((-13 * mV) - v) / (50 * mV)) / ms : Hz
@@ -104,24 +102,10 @@ class IonicCurrentCaLReuveni(IonicCurrent):
             #ECa : volt
         '''
 
-        calciumL += self.__calciumDecay()
-
         return calciumL
     ## ************************************************************ ##
 
 
-    ## ************************************************************ ##
-    def __calciumDecay(self):
-        res = '''
-            dCa_i/dt = driveChannel + (''' + self._caInf + ''' - Ca_i) /  ''' + self._tau  + ''' : mole * meter**-3
-            #Ca_i : mole * meter**-3
-            driveChannel = (-''' + self._kUnit + ''' * ''' + self.name + ''' / (cm ** 2)) / (2 * ''' + self._kFaraday + ''' * ''' + self._depth + ''') : mole * meter ** -3 * Hz
-        '''
-
-        return res
-    ## ************************************************************ ##
-
-
     ## ************************************************************ ##
     def driveChannel(self, I_Ca):
         res = (-self.kUnit * I_Ca / ExcP['area']) / (2 * self.kFaraday * depthCa)
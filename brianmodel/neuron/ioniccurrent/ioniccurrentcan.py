@@ -32,13 +32,15 @@
 """
 
 
-from utilities import utilities as utilities
 from ioniccurrent import IonicCurrent
+from ioniccurrentfactory import registerIonicCurrent
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentCANDestexhe(IonicCurrent):
     """
     The :class:`IonicCurrentCANDestexhe`` represents the L-type Calcium current, as defined in (Desthexe 1992), and its string representation.
+    The current is activated by the calcium concentration ``Ca_i`` of the calcium pool of its neuron.
 
     Initialised as:
 
@@ -73,29 +75,23 @@ class IonicCurrentCANDestexhe(IonicCurrent):
         self.beta = params['beta']
         self.cac = params['cac']
         self.tempAdj = "3.0 ** ((" + params['temp'] + " -22) / 10)"
-
-
-        # Store safe string representation of parameters
-        self._beta = utilities.getSafeStringParam(self.beta)
-        self._cac = utilities.getSafeStringParam(self.cac)
-        self._tempAdj = utilities.getSafeStringParam(self.tempAdj)
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         """
 
-        can = \
-            self.name + ''' =  ''' +  self._g + ''' * mCAN ** 2 * (v - ''' + self._E  + ''') : amp
+        can = '''
+            _name = _g * mCAN ** 2 * (v - _E) : amp
             #ds/dt = (alphas * (1 - mCAN)) - (betas * mCAN) : 1
             #alphas = alpha2(Ca_i) * tempAdj : Hz
             #betas = betaCan * tempAdj : Hz
             dmCAN/dt = (mCANInf - mCAN) / mCANTau : 1
-            mCANInf = alpha2 / (alpha2 + ''' + self._beta + ''') : 1
-            mCANTau = 1. / (alpha2 + ''' + self._beta + ''') / ''' + self._tempAdj  + ''' : second
+            mCANInf = alpha2 / (alpha2 + _beta) : 1
+            mCANTau = 1. / (alpha2 + _beta) / _tempAdj : second
         '''
 
         can += self.__alpha2()
@@ -106,7 +102,7 @@ class IonicCurrentCANDestexhe(IonicCurrent):
 
     ## ************************************************************ ##
     def __alpha2(self):
-        res = '''alpha2 = ''' + self._beta + ''' * (Ca_i / ''' + self._cac  + ''') ** 2 : Hz \n'''
+        res = '''alpha2 = _beta * (Ca_i / _cac) ** 2 : Hz \n'''
         return res
     ## ************************************************************ ##
 ## ***************************************************************************************************************** ##
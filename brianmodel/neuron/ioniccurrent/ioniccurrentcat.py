@@ -35,10 +35,13 @@
 
 
 
-from utilities import utilities as utilities
+from utilities import expressions
+from utilities import units
 from ioniccurrent import IonicCurrent
+from ioniccurrentfactory import registerIonicCurrent
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentCaTHuguenard(IonicCurrent):
     """
     The :class:`IonicCurrentCaTHuguenard`` represents the transient, low-voltage-activated Calcium current, as defined in (Huguenard et al.), and its string representation.
@@ -63,6 +66,9 @@ class IonicCurrentCaTHuguenard(IonicCurrent):
             http://jn.physiology.org/content/68/4/1384
     """
 
+    # The current fills the calcium pool of the neuron
+    calcium = True
+
     ## ************************************************************ ##
     def __init__(self, params, area):
         """
@@ -77,59 +83,61 @@ class IonicCurrentCaTHuguenard(IonicCurrent):
         # Initialise attributes
         IonicCurrent.__init__(self, params, area)
         # self.tempK = "(" + params['temp'] + " + 273.15) * kelvin"
-        self.tau = params['tau']
-        self.caInf = params['caInf']
-        self.kUnit = params['kUnit']
-        self.kFaraday = params['kFaraday']
-        self.depth = params['depth']
+
+        # Pump of the calcium pool, unless the neuron defines its own pool
+        self.tau = params.get('tau')
+        self.caInf = params.get('caInf')
+        self.kUnit = params.get('kUnit')
+        self.kFaraday = params.get('kFaraday')
+        self.depth = params.get('depth')
         self.q10 = params.get('q10', '3')   # Q10 of inactivation
         self.tempC = params.get('tempC', '36 * celsius')
-
-        # Store safe string representation of parameters
-        # self._tempK = utilities.getSafeStringParam(self.tempK)
-        self._tau = utilities.getSafeStringParam(self.tau)
-        self._caInf = utilities.getSafeStringParam(self.caInf)
-        self._kUnit = utilities.getSafeStringParam(self.kUnit)
-        self._kFaraday = utilities.getSafeStringParam(self.kFaraday)
-        self._depth = utilities.getSafeStringParam(self.depth)
-        self._tempC = utilities.getSafeStringParam(self.tempC)
-        self._q10 = utilities.getSafeStringParam(self.q10)
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         """
 
-        calciumL = \
-            self.name + ''' = ''' + self._g + ''' * (mCaT ** 2) * hCaT * (v - ''' + self._E  + ''') : amp
+        calciumL = '''
+            _name = _g * (mCaT ** 2) * hCaT * (v - _E) : amp
             dhCaT/dt = (hCaTInf - hCaT) / hCaTTau : 1
             mCaT = 1. / (1 + exp(-(v + (57 * mV)) / (6.2 * mV))) : 1
             hCaTInf = 1. / (1 + exp((v + (81 * mV)) / (4. * mV))) : 1
             hCaTTau = ((30.8 + (211.4 + exp((v + (113.2 * mV)) / (5 * mV))) / (1. + exp((v + (84 * mV)) / (3.2 * mV)))) / (hCaTPhi)) * ms : ms
-            #hCaTPhi = ''' + self._q10 + ''' ** ((''' + self._tempC + ''' - (24 * celsius)) / (10 * celsius)) : 1
-            hCaTPhi = 3.737192819 : 1
+            hCaTPhi = _phi : 1
 
             ECa : volt
         '''
 
-        calciumL += self.__calciumDecay()
-
         return calciumL
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
-    def __calciumDecay(self):
-        res = '''
-            dCa_i/dt = driveChannel + (''' + self._caInf + ''' - Ca_i) /  ''' + self._tau  + ''' : mole * meter**-3
-            #Ca_i : mole * meter**-3
-            driveChannel = (-''' + self._kUnit + ''' * I_Ca / (cm ** 2)) / (2 * ''' + self._kFaraday + ''' * ''' + self._depth + ''') : mole * meter ** -3 * Hz
-        '''
+    def getTemplateBinding(self, placeholder):
+        """
+        Return the expression which replaces a placeholder of the equations template.
+        The temperature factor ``_phi`` is computed from the parameters of the current.
+        """
+        if placeholder == '_phi':
+            return self.__getPhi()
 
-        return res
+        return IonicCurrent.getTemplateBinding(self, placeholder)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __getPhi(self):
+        """
+        Compute the temperature factor of inactivation, from its Q10 and the temperature.
+        The factor is evaluated when the model is built, as Brian has no unit for temperatures in Celsius.
+        """
+        phi = self._q10 + ''' ** ((''' + self._tempC + ''' - (24 * celsius)) / (10 * celsius))'''
+
+        return units.evaluateConstant(expressions.parse(phi)).toExpression()
     ## ************************************************************ ##
 
 
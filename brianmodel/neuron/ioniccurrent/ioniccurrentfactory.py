@@ -28,21 +28,56 @@
 """
 
 
-import ioniccurrenthhtraub as ichhtr
-import ioniccurrenthhwang as ichhwa
-import ioniccurrentm as icm
-import ioniccurrentcal as iccal
-import ioniccurrentcat as iccat
-import ioniccurrentcan as iccan
-import ioniccurrentsynexp as icsynexp
+import importlib
+
+
+# Modules implementing the currents shipped with the library, imported when a model first references them
+_builtinModules = {
+    'IonicCurrentHHTraubLeak': 'ioniccurrenthhtraub',
+    'IonicCurrentHHTraubK': 'ioniccurrenthhtraub',
+    'IonicCurrentHHTraubNa': 'ioniccurrenthhtraub',
+    'IonicCurrentMYamada': 'ioniccurrentm',
+    'IonicCurrentCaLReuveni': 'ioniccurrentcal',
+    'IonicCurrentCaTHuguenard': 'ioniccurrentcat',
+    'IonicCurrentCANDestexhe': 'ioniccurrentcan',
+    'IonicCurrentSynExp': 'ioniccurrentsynexp',
+    'IonicCurrentHHWangLeak': 'ioniccurrenthhwang',
+    'IonicCurrentHHWangK': 'ioniccurrenthhwang',
+    'IonicCurrentHHWangNa': 'ioniccurrenthhwang',
+}
+
+# Entry point group through which third-party packages can provide currents
+ENTRY_POINT_GROUP = 'brianmodel.ioniccurrents'
+
+# Package of this module, used to import the built-in current modules
+_package = __name__.rpartition('.')[0]
+
+
+## ***************************************************************************************************************** ##
+def registerIonicCurrent(cls):
+    """
+    Class decorator registering an :class:`IonicCurrent` subclass with the :class:`IonicCurrentFactory`.
+    The class can then be referenced by its name in the ``class`` entry of the current parameters.
+    """
+    IonicCurrentFactory.register(cls)
+
+    return cls
+## ***************************************************************************************************************** ##
 
 
 ## ***************************************************************************************************************** ##
 class IonicCurrentFactory(object):
     """
     The :class:`IonicCurrentFactory` represents a factory to generate class:`IonicCurrent` objects.
+
+    Current classes are looked up by name in a registry, which classes join with the :func:`registerIonicCurrent` decorator.
+    The modules of the built-in currents are imported on first use, and third-party currents can also be provided through the ``brianmodel.ioniccurrents`` entry point group.
     """
 
+    # Registry of current classes, by class name
+    _registry = {}
+
+
     ## ************************************************************ ##
     def __init__(self):
         """
@@ -52,6 +87,71 @@ class IonicCurrentFactory(object):
     ## ************************************************************ ##
 
 
+    ## ************************************************************ ##
+    @classmethod
+    def register(cls, currentClass, name=None):
+        """
+        Register an :class:`IonicCurrent` class.
+
+        :param currentClass: the current class
+        :type currentClass: class
+        :param name: the name under which the class is registered, defaults to the class name
+        :type name: string
+        """
+        cls._registry[name or currentClass.__name__] = currentClass
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @classmethod
+    def getIonicCurrentClass(cls, currentType):
+        """
+        Return the :class:`IonicCurrent` class registered with the given name, importing the module defining it if needed.
+
+        :param currentType: the name of the current class
+        :type currentType: string
+
+        :return currentClass: the current class
+
+        :raises: TypeError if no current class is registered with the given name
+        """
+        currentType = str(currentType)
+        if currentType in cls._registry:
+            return cls._registry[currentType]
+
+        # Import the built-in module implementing the current, which registers its classes
+        moduleName = _builtinModules.get(currentType)
+        if moduleName is not None:
+            importlib.import_module(_package + '.' + moduleName if _package else moduleName)
+
+        # Look for third-party currents
+        if currentType not in cls._registry:
+            cls._loadEntryPoint(currentType)
+
+        try:
+            return cls._registry[currentType]
+        except KeyError:
+            raise TypeError("Could not create an instance of a IonicCurrent with the supplied currentType: " + str(currentType))
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @classmethod
+    def _loadEntryPoint(cls, currentType):
+        """
+        Register the current class provided by the entry point with the given name, if any.
+        """
+        try:
+            import pkg_resources
+        except ImportError:
+            return
+
+        for entryPoint in pkg_resources.iter_entry_points(ENTRY_POINT_GROUP, currentType):
+            cls.register(entryPoint.load(), currentType)
+            break
+    ## ************************************************************ ##
+
+
     ## ************************************************************ ##
     @staticmethod
     def makeIonicCurrent(parameters, area):
@@ -72,30 +172,7 @@ class IonicCurrentFactory(object):
         currentType = parameters.get('class', [])
 
         # Instantiate current
-        if currentType == 'IonicCurrentHHTraubLeak':
-            current = ichhtr.IonicCurrentHHTraubLeak(parameters, area)
-        elif currentType == 'IonicCurrentHHTraubK':
-            current = ichhtr.IonicCurrentHHTraubK(parameters, area)
-        elif currentType == 'IonicCurrentHHTraubNa':
-            current = ichhtr.IonicCurrentHHTraubNa(parameters, area)
-        elif currentType == 'IonicCurrentMYamada':
-            current = icm.IonicCurrentMYamada(parameters, area)
-        elif currentType == 'IonicCurrentCaLReuveni':
-            current = iccal.IonicCurrentCaLReuveni(parameters, area)
-        elif currentType == 'IonicCurrentCaTHuguenard':
-            current = iccat.IonicCurrentCaTHuguenard(parameters, area)
-        elif currentType == 'IonicCurrentCANDestexhe':
-            current = iccan.IonicCurrentCANDestexhe(parameters, area)
-        elif currentType == 'IonicCurrentSynExp':
-            current = icsynexp.IonicCurrentSynExp(parameters, area)
-        elif currentType == 'IonicCurrentHHWangLeak':
-            current = ichhwa.IonicCurrentHHWangLeak(parameters, area)
-        elif currentType == 'IonicCurrentHHWangK':
-            current = ichhwa.IonicCurrentHHWangK(parameters, area)
-        elif currentType == 'IonicCurrentHHWangNa':
-            current = ichhwa.IonicCurrentHHWangNa(parameters, area)
-        else:
-            raise TypeError("Could not create an instance of a IonicCurrent with the supplied currentType: " + currentType)
+        current = IonicCurrentFactory.getIonicCurrentClass(currentType)(parameters, area)
 
         return current
     ## ************************************************************ ##
@@ -35,11 +35,12 @@
 """
 
 
-from utilities import utilities as utilities
 from ioniccurrent import IonicCurrent
+from ioniccurrentfactory import registerIonicCurrent
 
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentHHTraubLeak(IonicCurrent):
     """
     The :class:`IonicCurrentHHTraubLeak`` represents the Hodgkin-Huxley neuron leak current, as defined in (Traub and Miles), and its string representation.
@@ -74,12 +75,12 @@ class IonicCurrentHHTraubLeak(IonicCurrent):
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         """
 
-        leak = self.name + ''' = ''' + self._g + ''' * (v - ''' + self._E  + ''') : amp \n'''
+        leak = '''_name = _g * (v - _E) : amp \n'''
 
         return leak
     ## ************************************************************ ##
@@ -87,6 +88,7 @@ class IonicCurrentHHTraubLeak(IonicCurrent):
 
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentHHTraubK(IonicCurrent):
     """
     The :class:`IonicCurrentHHTraubK` represents the Hodgkin-Huxley neuron Potassium current, as defined in (Traub and Miles), and its string representation.
@@ -118,23 +120,20 @@ class IonicCurrentHHTraubK(IonicCurrent):
         # Initialise attributes
         IonicCurrent.__init__(self, params, area)
         self.vT = params['vT']
-
-        # Store safe string representation of parameters
-        self._vT = utilities.getSafeStringParam(self.vT)
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         """
 
-        potassium = \
-            self.name + ''' = ''' + self._g + ''' * (n ** 4) * (v - ''' + self._E  + ''') : amp
-            dn/dt = alphan * (1 - n) - betan * n : 1
-            alphan =  - 0.032 * (mV ** -1) * (v  - ''' + self._vT + ''' - 15 * mV) / (exp(- (v - ''' + self._vT + ''' - 15 * mV) / (5 * mV)) - 1.) / ms : Hz
-            betan = 0.5 * exp( - (v - ''' + self._vT + ''' - 10 * mV) / (40 * mV)) / ms : Hz
+        potassium = '''
+            _name = _g * (n ** 4) * (v - _E) : amp
+            ''' + self.getGatingString('n', 'alphan', 'betan') + '''
+            alphan =  - 0.032 * (mV ** -1) * (v  - _vT - 15 * mV) / (exp(- (v - _vT - 15 * mV) / (5 * mV)) - 1.) / ms : Hz
+            betan = 0.5 * exp( - (v - _vT - 10 * mV) / (40 * mV)) / ms : Hz
         '''
 
         return potassium
@@ -143,6 +142,7 @@ class IonicCurrentHHTraubK(IonicCurrent):
 
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentHHTraubNa(IonicCurrent):
     """
     The :class:`IonicCurrentHHTraubNa` represents the Hodgkin-Huxley neuron Sodium current, as defined in (Traub and Miles), and its string representation.
@@ -174,26 +174,23 @@ class IonicCurrentHHTraubNa(IonicCurrent):
         # Initialise attributes
         IonicCurrent.__init__(self, params, area)
         self.vT = params['vT']
-
-        # Store safe string representation of parameters
-        self._vT = utilities.getSafeStringParam(self.vT)
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         """
 
-        sodium = \
-            self.name + ''' = ''' + self._g + ''' * (m ** 3) * h * (v - ''' + self._E  + ''') : amp
-            dm/dt = alpham * (1 - m) - betam * m : 1
-            dh/dt = alphah * (1 - h) - betah * h : 1
-            alpham = - 0.32 * (mV ** -1) * (v - ''' + self._vT + ''' - 13 * mV) / (exp(- (v - ''' + self._vT + ''' - 13 * mV) / (4 * mV)) - 1.) / ms : Hz
-            betam = 0.28 * (mV ** -1) * (v - ''' + self._vT + ''' - 40 * mV) / (exp((v - ''' + self._vT + ''' - 40 * mV) / (5 * mV)) - 1.) / ms : Hz
-            alphah = 0.128 * exp(- (v - ''' + self._vT + ''' - 17 * mV) / (18 * mV)) / ms : Hz
-            betah = 4. / (1 + exp(- (v - ''' + self._vT + ''' - 40 * mV) / (5 * mV))) / ms : Hz
+        sodium = '''
+            _name = _g * (m ** 3) * h * (v - _E) : amp
+            ''' + self.getGatingString('m', 'alpham', 'betam') + '''
+            ''' + self.getGatingString('h', 'alphah', 'betah') + '''
+            alpham = - 0.32 * (mV ** -1) * (v - _vT - 13 * mV) / (exp(- (v - _vT - 13 * mV) / (4 * mV)) - 1.) / ms : Hz
+            betam = 0.28 * (mV ** -1) * (v - _vT - 40 * mV) / (exp((v - _vT - 40 * mV) / (5 * mV)) - 1.) / ms : Hz
+            alphah = 0.128 * exp(- (v - _vT - 17 * mV) / (18 * mV)) / ms : Hz
+            betah = 4. / (1 + exp(- (v - _vT - 40 * mV) / (5 * mV))) / ms : Hz
         '''
 
         return sodium
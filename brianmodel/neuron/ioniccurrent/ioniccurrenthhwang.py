@@ -37,11 +37,12 @@
 """
 
 
-from utilities import utilities as utilities
 from ioniccurrent import IonicCurrent
+from ioniccurrentfactory import registerIonicCurrent
 
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentHHWangLeak(IonicCurrent):
     """
     The :class:`IonicCurrentHHWangLeak`` represents the Hodgkin-Huxley neuron leak current, as defined in (Wang and Buzsaki), and its string representation.
@@ -76,12 +77,12 @@ class IonicCurrentHHWangLeak(IonicCurrent):
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         """
 
-        leak = self.name + ''' = ''' + self._g + ''' * (v - ''' + self._E  + ''') : amp \n'''
+        leak = '''_name = _g * (v - _E) : amp \n'''
 
         return leak
     ## ************************************************************ ##
@@ -89,6 +90,7 @@ class IonicCurrentHHWangLeak(IonicCurrent):
 
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentHHWangK(IonicCurrent):
     """
     The :class:`IonicCurrentHHWangK` represents the Hodgkin-Huxley neuron Potassium current, as defined in (Wang and Buzsaki), and its string representation.
@@ -123,16 +125,16 @@ class IonicCurrentHHWangK(IonicCurrent):
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
 
-        :return potassium: string representation of the Potassium current
+        :return potassium: equations template of the Potassium current
         :type: string
         """
 
-        potassium = \
-            self.name + ''' = ''' + self._g + ''' * (n ** 4) * (v - ''' + self._E  + ''') : amp
+        potassium = '''
+            _name = _g * (n ** 4) * (v - _E) : amp
             dn/dt = (n_inf - n) / tau_n : 1
             n_inf = alphan / (alphan + betan) : 1
             tau_n = 0.2 / (alphan + betan) : ms
@@ -146,6 +148,7 @@ class IonicCurrentHHWangK(IonicCurrent):
 
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentHHWangNa(IonicCurrent):
     """
     The :class:`IonicCurrentHHWangNa` represents the Hodgkin-Huxley neuron Sodium current, as defined in (Wang and Buzsaki), and its string representation.
@@ -180,18 +183,18 @@ class IonicCurrentHHWangNa(IonicCurrent):
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         The m gating variable should be replaced by its steady state value m_inf as in the W-B model.
         Brian doesn't like this as it makes the equations stiff, and gives rise to the mind-numbingly useless "TypeError: General implicit methods are not implemented yet." error message.
 
-        :return sodium: string representation of the Sodium current
+        :return sodium: equations template of the Sodium current
         :type: string
         """
 
-        sodium = \
-            self.name + ''' = ''' + self._g + ''' * (m ** 3) * h * (v - ''' + self._E  + ''') : amp
+        sodium = '''
+            _name = _g * (m ** 3) * h * (v - _E) : amp
             dm/dt = (m_inf - m) / tau_m : 1
             dh/dt = (h_inf - h) / tau_h : 1
             m_inf = alpham / (alpham + betam)  : 1
@@ -35,11 +35,12 @@
 """
 
 
-from utilities import utilities as utilities
 from ioniccurrent import IonicCurrent
+from ioniccurrentfactory import registerIonicCurrent
 
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentMYamada(IonicCurrent):
     """
     The :class:`IonicCurrentMYamada`` represents the M current, as defined in (Yamada et al.), and its string representation.
@@ -75,26 +76,23 @@ class IonicCurrentMYamada(IonicCurrent):
         # Initialise attributes
         IonicCurrent.__init__(self, params, area)
         self.tau = params['tau']
-
-        # Store safe string representation of parameters
-        self._tau = utilities.getSafeStringParam(self.tau)
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         """
 
-        m = \
-            self.name + ''' = ''' + self._g + ''' * p * (v - ''' + self._E  + ''') : amp
+        m = '''
+            _name = _g * p * (v - _E) : amp
             # dp/dt = alphap * (1 - p) - betap * p : 1
-            # alphap = (1. / ''' + self._tau  + ''') * (3.3 * exp((v + 35 * mV) / (20. * mV)) + exp(-(v + 35 * mV) / (20. * mV)) / exp((-35 * mV - v) / (10 * mV)) + 1.) : Hz
-            # betap = (1. / ''' + self._tau  + ''') * (3.3 * exp((v + 35 * mV) / (20. * mV)) + exp(-(v + 35 * mV) / (20. * mV))) * (1 - 1 / (exp((-35 * mV - v) / (10 * mV)) + 1.)): Hz
+            # alphap = (1. / _tau) * (3.3 * exp((v + 35 * mV) / (20. * mV)) + exp(-(v + 35 * mV) / (20. * mV)) / exp((-35 * mV - v) / (10 * mV)) + 1.) : Hz
+            # betap = (1. / _tau) * (3.3 * exp((v + 35 * mV) / (20. * mV)) + exp(-(v + 35 * mV) / (20. * mV))) * (1 - 1 / (exp((-35 * mV - v) / (10 * mV)) + 1.)): Hz
             dp/dt = (pInf - p) / pTau : 1
             pInf = 1. / (1 + exp(- (v + (35 * mV)) / (10 * mV))) : 1
-            pTau = ''' + self._tau + ''' / (3.3 * exp((v + (35 * mV)) / (20 * mV)) + exp(- (v + (35 * mV)) / (20 * mV))) : ms
+            pTau = _tau / (3.3 * exp((v + (35 * mV)) / (20 * mV)) + exp(- (v + (35 * mV)) / (20 * mV))) : ms
         '''
 
         return m
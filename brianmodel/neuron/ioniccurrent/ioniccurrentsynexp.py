@@ -32,15 +32,22 @@
 """
 
 
-from utilities import utilities as utilities
+from utilities import expressions
 from ioniccurrent import IonicCurrent
+from ioniccurrentfactory import registerIonicCurrent
 
 
 ## ***************************************************************************************************************** ##
+@registerIonicCurrent
 class IonicCurrentSynExp(IonicCurrent):
     """
     The :class:`IonicCurrentSynExp`` represents a synaptic current based on exponential synapses.
 
+    By default the conductance ``g`` is integrated as ``dg/dt = -g / tau``. With the ``eventDriven`` parameter, it is
+    instead computed from its exact solution, ``g = gHat * exp(-(t - gLast) / tau)``: the parameters gHat and gLast
+    hold the conductance and the time of the last synaptic event, and are only updated when an event arrives, by the
+    code given by :meth:`getSynapseCode`.
+
     Initialised as:
 
         IonicCurrentSynExp(area, parameters)
@@ -57,6 +64,9 @@ class IonicCurrentSynExp(IonicCurrent):
     References:
     """
 
+    # Attributes which are not model parameters, and have no safe string representation
+    _plainAttributes = IonicCurrent._plainAttributes + ('eventDriven', )
+
     ## ************************************************************ ##
     def __init__(self, params, area):
         """
@@ -71,24 +81,96 @@ class IonicCurrentSynExp(IonicCurrent):
         # Initialise attributes
         IonicCurrent.__init__(self, params, area)
         self.tau = params['tau']
-
-        # Initialise attributes
-        IonicCurrent.__init__(self, params, area)
-        self._tau = utilities.getSafeStringParam(self.tau)
+        self.eventDriven = params.get('eventDriven', False)
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
-    def getIonicCurrentString(self):
+    def getEquationsTemplate(self):
         """
-        Generate the string representation of the ionic current.
+        Generate the equations template of the ionic current.
         """
 
-        ISyn = \
-            self.name + ''' = + ''' + self.g + ''' * (v - ''' + self._E  + ''') : amp
-            d''' + self.g + '''/dt = -''' + self.g  + ''' * (1. / ''' + self._tau + ''') : siemens
-        '''
+        if self.eventDriven:
+            ISyn = '''
+                _name = + _gSyn * (v - _E) : amp
+                _gSyn = _gHat * exp(-(t - _gLast) / _tau) : siemens
+                _gHat : siemens
+                _gLast : second
+            '''
+        else:
+            ISyn = '''
+                _name = + _gSyn * (v - _E) : amp
+                d_gSyn/dt = -_gSyn * (1. / _tau) : siemens
+            '''
 
         return ISyn
     ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getMergeKey(self):
+        """
+        Return the key under which the current can be merged: synaptic currents with the same reversal potential and time
+        constant are merged, their conductances being summed into a single variable.
+        """
+        return (type(self).__name__, bool(self.eventDriven), expressions.parse(self._E), expressions.parse(self._tau))
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getMergeAliases(self, target):
+        """
+        Return the names of the current and of its conductance, mapped to those of the current it is merged into.
+        """
+        res = {self.name: target.name, self.g: target.g}
+        if self.eventDriven:
+            res.update({self.g + 'Hat': target.g + 'Hat', self.g + 'Last': target.g + 'Last'})
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getSynapseCode(self, target, weight='w'):
+        """
+        Return the code applying a synaptic event to the conductance of the current.
+        The code increments the conductance by the weight of the event; in event-driven mode, it first brings gHat up to
+        date with the decay since the last event.
+
+        :param target: the name of the conductance receiving the event
+        :type target: string
+        :param weight: the expression of the weight, in siemens
+        :type weight: string
+
+        :returns: the statements of the code, one per line, or None if the target is not the conductance of the current
+        :rtype: string
+        """
+        if target != self.g:
+            return None
+
+        if self.eventDriven:
+            gHat, gLast = self.g + 'Hat', self.g + 'Last'
+            return gHat + ' = ' + gHat + ' * exp(-(t - ' + gLast + ') / ' + self._tau + ') + ' + weight + '\n' + gLast + ' = t'
+
+        return self.g + ' += ' + weight
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getTemplateBinding(self, placeholder):
+        """
+        Return the expression which replaces a placeholder of the equations template.
+        The conductance ``_gSyn`` is the name of the synaptic conductance variable, not scaled by the cell area, and
+        ``_gHat`` and ``_gLast`` are named after it.
+        """
+        if placeholder == '_gSyn':
+            return expressions.Name(self.g)
+        if placeholder == '_gHat':
+            return expressions.Name(self.g + 'Hat')
+        if placeholder == '_gLast':
+            return expressions.Name(self.g + 'Last')
+
+        return IonicCurrent.getTemplateBinding(self, placeholder)
+    ## ************************************************************ ##
 ## ***************************************************************************************************************** ##
@@ -0,0 +1,275 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    lookuptables
+    ~~~~~~~~~~~~~
+    This module contains the voltage lookup tables, which replace the rate functions of gating variables by a linear
+    interpolation between values precomputed over a range of membrane potentials.
+    It requires NumPy.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+from utilities import equations as eqs
+from utilities import expressions
+from utilities import numeric
+from utilities import units
+
+import collections
+
+import numpy
+
+
+
+# Default range and resolution of the tables
+DEFAULT_SETTINGS = {
+    'vMin': '-100 * mV',
+    'vMax': '50 * mV',
+    'resolution': '0.1 * mV',
+}
+
+# Number of points per interval at which interpolation errors are measured
+_errorSamples = 4
+
+
+## ***************************************************************************************************************** ##
+class VoltageTable(object):
+    """
+    The :class:`VoltageTable` holds the values of a function of the membrane potential, sampled at regular intervals.
+    Calling the table interpolates linearly between samples. Beyond the ends of the table the function is held constant.
+    All values are expressed in SI units.
+
+    Initialised as:
+
+        VoltageTable(name, equation, vMin, vMax, resolution, variable)
+
+    with arguments:
+
+        ``name``
+        The name of the table function (string)
+
+        ``equation``
+        The tabulated subexpression, with the subexpressions it references inlined (:class:`Equation`)
+
+        ``vMin``, ``vMax``
+        The range of the table, in volt (float)
+
+        ``resolution``
+        The spacing of the samples, in volt (float)
+
+        ``variable``
+        The name of the membrane potential (string)
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, name, equation, vMin, vMax, resolution, variable='v'):
+        """
+        Default constructor.
+
+        :raises: ValueError if the range or the resolution is invalid
+        """
+        if vMax <= vMin or resolution <= 0:
+            raise ValueError('Invalid range of voltage table ' + name)
+
+        self.name = name
+        self.equation = equation
+        self.variable = variable
+        self.vMin = vMin
+        self.resolution = resolution
+        self.size = int(round((vMax - vMin) / resolution)) + 1
+        self.vMax = vMin + (self.size - 1) * resolution
+
+        self.voltages = vMin + resolution * numpy.arange(self.size)
+        self.values = self.evaluate(self.voltages)
+        self.slopes = numpy.append(numpy.diff(self.values), 0.) / resolution
+
+        # Measure the interpolation error within each interval
+        fine = vMin + resolution * numpy.arange((self.size - 1) * _errorSamples + 1) / float(_errorSamples)
+        errors = numpy.abs(self(fine) - self.evaluate(fine))
+        worst = numpy.argmax(errors)
+        self.maxError = errors[worst]
+        self.maxErrorVoltage = fine[worst]
+        scale = numpy.max(numpy.abs(self.values))
+        self.maxRelativeError = self.maxError / scale if scale > 0 else 0.
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def evaluate(self, v):
+        """
+        Evaluate the tabulated function exactly.
+        The function is evaluated as the mean of its values slightly on either side of each potential, so that removable
+        singularities, such as 0 / 0 in the rate functions of Hodgkin-Huxley currents, do not spoil the nearby samples.
+
+        :param v: the membrane potentials, in volt
+        :type v: array
+
+        :rtype: array
+        """
+        epsilon = 1e-3 * self.resolution
+        below = numeric.evaluate(self.equation.expression, {self.variable: v - epsilon})
+        above = numeric.evaluate(self.equation.expression, {self.variable: v + epsilon})
+
+        return numpy.array(0.5 * (below + above), dtype=float) * numpy.ones(len(v))
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __call__(self, v):
+        """
+        Interpolate the function linearly.
+
+        :param v: the membrane potentials, in volt
+        :type v: float or array
+
+        :rtype: float or array
+        """
+        return numpy.interp(v, self.voltages, self.values)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def derivative(self, v):
+        """
+        Return the derivative of the interpolated function.
+
+        :param v: the membrane potentials, in volt
+        :type v: float or array
+
+        :rtype: float or array
+        """
+        v = numpy.asarray(v, dtype=float)
+        index = numpy.clip(((v - self.vMin) / self.resolution).astype(int), 0, self.size - 2)
+
+        return numpy.where((v >= self.vMin) & (v <= self.vMax), self.slopes[index], 0.)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __repr__(self):
+        return '<VoltageTable ' + self.name + ': ' + str(self.size) + ' points>'
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+
+## ***************************************************************************************************************** ##
+def getSettings(settings):
+    """
+    Return the range and resolution of the tables, in volt.
+
+    :param settings: the settings given in the parameter file, True for the defaults
+    :type settings: dict or bool
+
+    :returns: vMin, vMax and resolution
+    :rtype: tuple of floats
+    """
+    res = dict(DEFAULT_SETTINGS)
+    if isinstance(settings, dict):
+        res.update(settings)
+
+    return tuple(float(numeric.evaluate(str(res[key]))) for key in ('vMin', 'vMax', 'resolution'))
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def tabulate(equations, vMin, vMax, resolution, variable='v'):
+    """
+    Replace the functions of the membrane potential in a model by lookup tables.
+
+    A subexpression is tabulated when it only depends on the membrane potential, possibly through other subexpressions,
+    and calls at least one function such as exp. Only the outermost such subexpressions are tabulated, i.e. those
+    referenced by the rest of the model: for currents written with x_inf and tau_x, the pair is tabulated, and the rate
+    functions they are computed from are removed from the model. Each table is named after its subexpression, as in
+    ``alphan = alphanTable(v)``.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+    :param vMin: the lower end of the tables, in volt
+    :type vMin: float
+    :param vMax: the upper end of the tables, in volt
+    :type vMax: float
+    :param resolution: the spacing of table samples, in volt
+    :type resolution: float
+    :param variable: the name of the membrane potential
+    :type variable: string
+
+    :returns: the tabulated model, and its tables by name
+    :rtype: tuple of :class:`Equations` and :class:`collections.OrderedDict`
+
+    :raises: ValueError if the name of a table clashes with a name of the model
+    """
+    subexpressions = set(equations.getNames(eqs.SUBEXPRESSION))
+
+    # Subexpressions which only depend on the membrane potential
+    candidates = set()
+    for name in subexpressions:
+        dependencies = set(dep for dep in equations.getDependencies(name) if not units.isUnit(dep) and dep not in subexpressions)
+        if dependencies == set([variable]):
+            inlined = equations.inline(equations[name].expression)
+            if expressions.getFunctionNames(inlined):
+                candidates.add(name)
+
+    # Keep the candidates referenced by the rest of the model
+    roots = set()
+    for eq in equations:
+        if eq.name not in candidates:
+            roots.update(eq.getNames() & candidates)
+
+    res = eqs.Equations()
+    tables = collections.OrderedDict()
+    for eq in equations:
+        if eq.name in candidates and eq.name not in roots:
+            continue
+        if eq.name in roots:
+            tableName = eq.name + 'Table'
+            if tableName in equations or tableName in equations.getExternalNames():
+                raise ValueError('The name of voltage table ' + tableName + ' is already used by the model')
+            tables[tableName] = VoltageTable(tableName, eq.copy(equations.inline(eq.expression)), vMin, vMax, resolution, variable)
+            eq = eq.copy(expressions.Call(tableName, [expressions.Name(variable)]))
+        res.append(eq)
+
+    return res, tables
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getReport(tables):
+    """
+    Report the largest interpolation error of each table.
+
+    :param tables: the tables, by name
+    :type tables: dict
+
+    :returns: one line per table, with its size, its largest absolute error in SI units and the potential where it occurs,
+        and its largest error relative to the largest tabulated value
+    :rtype: string
+    """
+    lines = []
+    for name in sorted(tables):
+        table = tables[name]
+        lines.append('%-20s %6d points  max error %.3e at %.2f mV  relative %.2e' % (name, table.size, table.maxError,
+                     table.maxErrorVoltage * 1e3, table.maxRelativeError))
+
+    return '\n'.join(lines)
+## ***************************************************************************************************************** ##
@@ -30,32 +30,127 @@
 
 
 from utilities import utilities as utilities
+from utilities import includecache
+from utilities import equations
+from utilities import expressions
+from utilities import optimiser
+from utilities import linearity
+from utilities import reduction
+from utilities import units
+import ioniccurrent.ioniccurrent as ic
+import calciumpool
 import ioniccurrent.ioniccurrentfactory as icf
 
-import yaml
+import collections
+import hashlib
+
+
+## ***************************************************************************************************************** ##
+class CurrentList(list):
+    """
+    The :class:`CurrentList` is the list of :class:`IonicCurrent`'s of a :class:`Neuron`.
+    It notifies its neuron whenever currents are added, removed or replaced, so that cached equations are invalidated.
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, neuron, currents=()):
+        """
+        Default constructor.
+
+        :param neuron: the neuron owning the currents
+        :type neuron: :class:`Neuron`
+        :param currents: the initial currents
+        :type currents: iterable of :class:`IonicCurrent`
+        """
+        list.__init__(self, currents)
+        self._neuron = neuron
+        self._changed()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _changed(self):
+        """
+        Attach the currents to the owning neuron and invalidate its cached equations.
+        """
+        gating = getattr(self._neuron, 'gating', ic.GATING_RATES)
+        for curr in self:
+            curr._owner = self._neuron
+            if curr.gating != gating:
+                curr.gating = gating
+        self._neuron.invalidate()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _notifying(name):
+        """
+        Wrap a list method which modifies the list in place, so that it notifies the owning neuron.
+        """
+        method = getattr(list, name)
+
+        def wrapper(self, *args, **kwargs):
+            res = method(self, *args, **kwargs)
+            self._changed()
+            return res
+        wrapper.__name__ = name
+        wrapper.__doc__ = method.__doc__
+
+        return wrapper
+
+    for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'sort', 'reverse', '__setitem__', '__delitem__', '__iadd__', '__setslice__', '__delslice__'):
+        if hasattr(list, _name):
+            locals()[_name] = _notifying(_name)
+    del _name, _notifying
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
 
 ## ***************************************************************************************************************** ##
 class Neuron(object):
     """
     The :class:`Neuron` represents a biological neuron with a set of properties, and a list of :class:`IonicCurrent`'s flowing through its membrane.
+
+    The string representation of the neuron is cached, and invalidated whenever one of its parameters, its list of currents, or a parameter of one of its currents changes.
     """
 
     ## ************************************************************ ##
-    def __init__(self, parameters):
+    def __init__(self, parameters, includeCache=None, baseDir=None, library=None):
         """
         Default constructor.
 
-        :param area: the area of the soma of the neural cell
-        :type area: float
-        :param conductance: the conductance of the neural cell
-        :type conductance: float
+        :param parameters: the neuron parameters, keyed by neuron name
+        :type parameters: dict
+        :param includeCache: the cache of parsed include files, shared across neurons
+        :type includeCache: :class:`IncludeCache`
+        :param baseDir: the directory against which relative include paths are resolved
+        :type baseDir: string
+        :param library: the library of current definitions referenced by the ``library`` keyword of the currents
+        :type library: :class:`CurrentLibrary`
+
+        :raises: ValueError if the neuron references the library of currents, and none is given
         """
 
+        # Initialise cache of generated strings
+        self._cache = {}
+
         # Initialise attributes
         self.parameters = parameters.values()[0]
         self.name = parameters.keys()[0]
         self.area = self.parameters['area']
         self.conductance = self.parameters['conductance']
+        self.vClamp = self.parameters.get('vClamp', False)
+        self.voltageTables = self.parameters.get('voltageTables', None)
+        self.gating = self.parameters.get('gating', ic.GATING_RATES)
+        self.foldConstants = self.parameters.get('foldConstants', False)
+        self.pruneZeroCurrents = self.parameters.get('pruneZeroCurrents', False)
+        self.commonSubexpressions = self.parameters.get('commonSubexpressions', False)
+        self.mergeSynapses = self.parameters.get('mergeSynapses', False)
+        self.adiabatic = self.parameters.get('adiabatic', None)
+
+        # Calcium pool shared by the calcium currents, by default built from their pump parameters
+        calcium = self.parameters.get('calcium', None)
+        self.calciumPool = calciumpool.CalciumPool(calcium) if calcium else None
 
         # Initialise list of defined currents - FG: fixes bug due to having an empty list of defined currents when including all the needed ones
         if 'defined' not in self.parameters['currents']: # Keyword 'defined' doesn't exists
@@ -64,61 +159,625 @@ class Neuron(object):
             self.parameters['currents']['defined'] = []
 
         # Check for parameters specified as include files
+        if includeCache is None:
+            includeCache = includecache.IncludeCache()
         for f in self.parameters['currents'].get('included', []):
-            try:
-                with open(f) as curr:
-                    # Load included currents from file
-                    includes = yaml.load(curr)
-
-                    # Add them the list of defined currents
-                    self.parameters['currents'].get('defined', []).extend(includes)
-            except IOError:
-                raise IOError('Cannot load current parameter file named ' + f)
+            # Load included currents from file
+            includes = includeCache.load(f, baseDir)
+
+            # Add them the list of defined currents
+            self.parameters['currents'].get('defined', []).extend(includes or [])
         # Remove list of includesd currents from dict of currents
         self.parameters['currents'].pop('included', [])
 
+        # Load the currents referenced in the library of currents
+        references = self.parameters['currents'].pop('library', None) or []
+        if references and library is None:
+            raise ValueError('Neuron ' + self.name + ' references library currents, but no library of currents was given')
+        for reference in references:
+            self.parameters['currents']['defined'].append(library.load(reference))
+
         # Initialise ionic current factory
         self.factory = icf.IonicCurrentFactory()
 
         # Build current list
-        self.currents = []
+        currents = []
         for currentParams in self.parameters['currents'].get('defined', []):
             tmpCurrent = self.factory.makeIonicCurrent(currentParams, self.area)
-            self.currents.append(tmpCurrent)
+            currents.append(tmpCurrent)
+        self.currents = currents
+
+        # Parameters which differ between neurons are replaced by per-neuron parameters of the equations
+        self.heterogeneous = self.parameters.get('heterogeneous', None)
+        self._distributions = self._makeDistributions(baseDir)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __setattr__(self, name, value):
+        """
+        Set an attribute, keeping the safe string representation of parameters in sync and invalidating cached equations.
+        """
+        # Keep track of changes to the list of currents
+        if name == 'currents' and not isinstance(value, CurrentList):
+            value = CurrentList(self, value)
+
+        if name == 'calciumPool' and value is not None:
+            value._owner = self
+
+        if name == 'gating' and value not in ic.GATING_FORMS:
+            raise ValueError('Unknown gating form ' + str(value) + ' for neuron ' + str(getattr(self, 'name', '')) + ', expected one of: ' + ', '.join(ic.GATING_FORMS))
+
+        object.__setattr__(self, name, value)
+
+        if name.startswith('_'):
+            return
 
         # Store safe string representation of parameters
-        self._area = utilities.getSafeStringParam(self.area)
-        self._conductance = utilities.getSafeStringParam(utilities.getSafeStringParam(self.conductance) + ' * '  + self._area)
+        if name in ('area', 'conductance') and hasattr(self, 'area') and hasattr(self, 'conductance'):
+            self._area = utilities.getSafeStringParam(self.area)
+            self._conductance = utilities.getSafeStringParam(utilities.getSafeStringParam(self.conductance) + ' * '  + self._area)
+
+        # Current conductances are scaled by the cell area
+        if name == 'area':
+            for curr in getattr(self, 'currents', []):
+                curr.area = value
+
+        # All gating variables of the neuron are written in the same form
+        if name == 'gating':
+            for curr in getattr(self, 'currents', []):
+                curr.gating = value
+
+        self.invalidate()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def invalidate(self):
+        """
+        Drop the cached string representation of the neuron.
+        """
+        self._cache.clear()
     ## ************************************************************ ##
 
 
     ## ************************************************************ ##
+    @utilities.memoise
     def getNeuronString(self):
         """
         Generate the string representation of the neural cell model.
+        Constant parameter expressions are folded into literals in SI units when ``foldConstants`` is enabled.
+        Currents of zero conductance are removed from the membrane equation, with the variables only they need, when ``pruneZeroCurrents`` is enabled.
+        When the neuron uses voltage lookup tables, the tabulated functions are called as ``<name>Table(v)``, see :meth:`getVoltageTables`.
         """
+        return self.getEquations().render()
+    ## ************************************************************ ##
 
-        res = ""
 
-        # Neuron model equation
-        dvdt = '''dv/dt = ('''
+    ## ************************************************************ ##
+    def getEquations(self):
+        """
+        Return the equations of the neural cell model, of which :meth:`getNeuronString` is the Brian-compatible rendering.
 
-        # Add current equations
+        :rtype: :class:`Equations`
+        """
+        return self._getEquations()[0]
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def getCanonicalString(self):
+        """
+        Generate the canonical form of the equations of the neuron, see :func:`optimiser.normaliseEquations`: the equations
+        sorted by name, with their constants folded and the operands of their sums and products sorted. Neurons whose
+        currents are defined or included in a different order have the same canonical form.
+
+        :rtype: string
+        """
+        return optimiser.normaliseEquations(self.getEquations()).render()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def fingerprint(self):
+        """
+        Return a stable hash of the canonical form of the equations of the neuron, see :meth:`getCanonicalString`, which
+        identifies the code generated for the neuron across runs and machines. The name of the neuron is not part of the
+        hash, so that neuron types with the same equations share their compiled code.
+
+        :returns: the hexadecimal digest of the neuron
+        :rtype: string
+        """
+        return hashlib.sha1(self.getCanonicalString().encode('utf-8')).hexdigest()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def getAliases(self):
+        """
+        Return the names of the merged currents and state variables, mapped to the names which replace them.
+        Currents are merged when the neuron parameters enable it, with the ``mergeSynapses`` keyword: synaptic currents
+        with the same reversal potential and time constant then share a single conductance, e.g. ``{'I_SynE2': 'I_SynE',
+        'ge2': 'ge'}``, and synapses targeting ge2 must be connected to ge instead.
+
+        :rtype: dict of strings
+        """
+        res = {}
+        if not self.mergeSynapses:
+            return res
+
+        targets = {}
+        for curr in self.currents:
+            key = curr.getMergeKey()
+            if key is None:
+                continue
+            target = targets.setdefault(key, curr)
+            if target is not curr:
+                res.update(curr.getMergeAliases(target))
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getSynapseCode(self, target, weight='w'):
+        """
+        Return the code applying a synaptic event to a variable of the neuron, such as the ``pre`` code of Brian synapses.
+        Names of merged variables are resolved with :meth:`getAliases`.
+
+        :param target: the name of the variable receiving the event, such as the conductance ge
+        :type target: string
+        :param weight: the expression of the weight of the event
+        :type weight: string
+
+        :returns: the code, as statements one per line
+        :rtype: string
+
+        :raises: KeyError if no current of the neuron receives events on the variable
+        """
+        target = self.getAliases().get(target, target)
         for curr in self.currents:
-            dvdt += ''' - ''' + curr.name # Add current name to dvdt equation
-            res += curr.getIonicCurrentString() # Add current equation to neuron model
+            res = curr.getSynapseCode(target, weight)
+            if res is not None:
+                return res
 
-        dvdt += ''' + I_stim) / ''' + self._conductance + ''' : volt \n''' # Append conductance division
+        raise KeyError('Neuron ' + self.name + ' has no synaptic variable ' + target)
+    ## ************************************************************ ##
 
-        # Check Voltage clamp
-        if self.parameters.has_key('vClamp') and self.parameters['vClamp']:
-            dvdt = '''v : volt \n'''
 
-        # Stimulus current
-        istim = '''I_stim : amp'''
+    ## ************************************************************ ##
+    def getCalciumPool(self):
+        """
+        Return the calcium pool of the neuron: the pool given by the ``calcium`` keyword, or otherwise the pool defined by
+        the pump parameters of its calcium currents.
+
+        :rtype: :class:`CalciumPool`
+
+        :raises: ValueError if the calcium currents define different pumps
+        """
+        if self.calciumPool is not None:
+            return self.calciumPool
 
-        # Build final neuron model equation
-        res = dvdt + res + istim
+        return calciumpool.fromCurrents([curr for curr in self.currents if curr.calcium])
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getVoltageTables(self):
+        """
+        Return the voltage lookup tables called by the equations of the neuron, which must be added to the namespace of the simulation.
+        Tables are only built when the neuron parameters enable them, with the ``voltageTables`` keyword.
+
+        :returns: the tables, by function name
+        :rtype: dict of :class:`VoltageTable`
+        """
+        if not self.voltageTables:
+            return {}
+
+        return dict(self._getEquations()[1])
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getHeterogeneousParameters(self):
+        """
+        Return the distributions of the parameters which differ between the neurons of this type, by the name of the
+        per-neuron parameter replacing them in the equations.
+        Parameters are declared heterogeneous with the ``heterogeneous`` keyword, which maps the path of each parameter,
+        ``area``, ``conductance``, ``calcium.<name>`` or ``<current>.<name>`` such as ``I_Na.g``, to its distribution,
+        see :class:`ParameterDistribution`. The parameter ``g`` of the current ``I_Na`` is then replaced by ``g_I_Na``.
+
+        :rtype: :class:`collections.OrderedDict` of :class:`ParameterDistribution`
+        """
+        return collections.OrderedDict(self._distributions)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def sampleParameters(self, n, seed=None):
+        """
+        Draw the values of the heterogeneous parameters of n neurons of this type, to initialise the per-neuron parameters
+        of their group, see :meth:`getHeterogeneousParameters`.
+
+        :param n: the number of neurons
+        :type n: int
+        :param seed: the seed of the random number generator, for reproducible values
+        :type seed: int
+
+        :returns: the values of each parameter, as arrays of length n in SI units
+        :rtype: :class:`collections.OrderedDict` of arrays
+        """
+        # Sampling requires NumPy, which is only imported when it is used
+        import numpy
+
+        random = numpy.random.RandomState(seed)
+
+        return collections.OrderedDict((name, distribution.sample(n, random)) for name, distribution in self._distributions.iteritems())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def setParameter(self, path, value):
+        """
+        Set a parameter of the neuron, given by its path in the parameter file: ``area`` and ``conductance`` for the
+        parameters of the neuron itself, ``calcium.<name>`` for those of its calcium pool, and ``<current>.<name>``, such
+        as ``I_CAN.g``, for those of its currents.
+
+        :param path: the path of the parameter
+        :type path: string
+        :param value: the value of the parameter, with units, such as ``1e-4 * siemens * cm ** -2``
+        :type value: string
+
+        :raises: ValueError if the neuron has no such parameter
+        """
+        owners, attribute = self._getParameterOwners(path)
+        for owner in owners:
+            setattr(owner, attribute, value)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getOptimisationReport(self):
+        """
+        Report the effect of the passes applied to the equations of the neuron.
+        With ``pruneZeroCurrents``, the report lists the variables removed from the model ('removedVariables').
+        With ``commonSubexpressions``, the report gives the number of operations saved per evaluation of the equations ('savedOperations').
+
+        :rtype: dict
+        """
+        return dict(self._getEquations()[2])
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def getIntegrators(self):
+        """
+        Return the update rule suited to each state variable of the neuron, from the linearity of its equation: 'exact'
+        for linear equations with constant coefficients, such as exponential synapses, 'exponential_euler' for
+        conditionally linear ones, such as gating variables, and 'euler' for nonlinear ones.
+        The reference engine applies these rules with the ``auto`` integration method.
+
+        :returns: the update rule of each state variable, in order
+        :rtype: :class:`collections.OrderedDict` of strings
+        """
+        return linearity.getUpdateRules(self.getEquations(), self._getFunctionDerivatives())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def getIntegrationMethod(self):
+        """
+        Return the cheapest integration method of Brian which is exact or stable for all the state variables of the neuron,
+        as Brian applies a single method to a group: 'exact' if all its equations are linear with constant coefficients,
+        'exponential_euler' if they are at least conditionally linear, and 'euler' otherwise.
+
+        :rtype: string
+        """
+        return linearity.getIntegrationMethod(self.getEquations(), self._getFunctionDerivatives())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def getJacobian(self):
+        """
+        Return the Jacobian of the differential equations of the neuron, derived symbolically, as Brian subexpressions:
+        the entry J[x, y] = d(dx/dt)/dy is named ``J_x_y``, and entries which are always zero are left out.
+        The subexpressions shared by several entries come first. The derivatives of the voltage lookup tables are called
+        as ``<table>Derivative``, and are given by the ``derivative`` attribute of the tables.
+        Implicit and Rosenbrock integrators use the Jacobian, such as the ``rosenbrock`` method of the reference engine.
+
+        :rtype: :class:`Equations`
+        """
+        res = self.getEquations()
+        entries, auxiliaries = res.getJacobian(None, self._getFunctionDerivatives())
+
+        jacobian = list(auxiliaries.values())
+        for (name, variable), expression in entries.iteritems():
+            try:
+                dims = units.divideDimensions(units.getUnitDimensions('(' + res[name].unit + ') / second'),
+                                              units.getUnitDimensions(res[variable].unit))
+                unit = units.getUnitString(dims)
+            except ValueError:
+                unit = '1'
+            jacobian.append(equations.Equation(equations.SUBEXPRESSION, 'J_' + name + '_' + variable, expression, unit))
+
+        return equations.Equations(jacobian)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def getAdiabaticVariables(self):
+        """
+        Return the fast state variables of the neuron which are replaced by their steady state, such as ``m = m_inf``,
+        when the neuron parameters enable adiabatic reduction with the ``adiabatic`` keyword: either the list of the
+        variables, or the settings of :meth:`getFastVariables`, i.e. the time constant ``tau`` below which variables are
+        fast, and optionally the range of potentials ``vMin``, ``vMax`` and ``resolution``, and the ``namespace``.
+
+        :rtype: list of strings
+
+        :raises: ValueError if the membrane potential is to be replaced
+        """
+        if not self.adiabatic:
+            return []
+        if not isinstance(self.adiabatic, dict):
+            res = list(self.adiabatic)
+            if 'v' in res:
+                raise ValueError('The membrane potential of neuron ' + self.name + ' cannot be replaced by its steady state')
+            return res
+
+        settings = dict(self.adiabatic)
+        kwargs = dict((key, self._getSetting(settings[key])) for key in ('tau', 'vMin', 'vMax', 'resolution') if key in settings)
+
+        return self.getFastVariables(namespace=settings.get('namespace'), **kwargs)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getFastVariables(self, tau, namespace=None, vMin=-100e-3, vMax=50e-3, resolution=0.5e-3):
+        """
+        Return the state variables of the neuron whose time constant is at most tau over the whole range of membrane
+        potentials, as computed by the stiffness analysis of the reference engine, see :func:`stiffness.getTimeConstants`.
+        These are the candidates for adiabatic reduction, such as the sodium activation m of Hodgkin-Huxley models.
+
+        :param tau: the largest time constant of a fast variable, in second
+        :type tau: float
+        :param namespace: the values of the external names referenced by the equations, in SI units
+        :type namespace: dict
+        :param vMin: the lower end of the range of potentials, in volt
+        :type vMin: float
+        :param vMax: the upper end of the range of potentials, in volt
+        :type vMax: float
+        :param resolution: the spacing of the potentials, in volt
+        :type resolution: float
+
+        :returns: the fast state variables, in order
+        :rtype: list of strings
+        """
+        # The analysis requires NumPy, which is only imported when it is used
+        from engine import stiffness
+
+        potentials, timeConstants = stiffness.getTimeConstants(self._buildEquations(), namespace, vMin, vMax, resolution)
+
+        return [name for name, values in timeConstants.iteritems() if name != 'v' and (values <= tau).all()]
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getReductionError(self, namespace=None, **kwargs):
+        """
+        Compare the responses of the neuron with adiabatic reduction to those of the full neuron, to a standard stimulus
+        of current steps, see :func:`comparison.compareModels` for the report and the keyword arguments.
+
+        :param namespace: the values of the external names referenced by the equations, in SI units
+        :type namespace: dict
+
+        :returns: the report
+        :rtype: dict
+        """
+        # The comparison requires NumPy, which is only imported when it is used
+        from engine import comparison
+
+        reference, tables = self._getFullEquations()[:2]
+        namespace = dict(namespace or {})
+        namespace.update(tables)
+
+        return comparison.compareModels(self, reference, namespace, **kwargs)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @staticmethod
+    def _getSetting(value):
+        """
+        Return the value in SI units of a setting given in the parameter file, as a number or a string with units such
+        as ``0.1 * ms``.
+        """
+        if isinstance(value, (int, float)):
+            return float(value)
+
+        return units.evaluateConstant(expressions.parse(str(value))).value
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _getFunctionDerivatives(self):
+        """
+        Return the names of the derivatives of the voltage lookup tables, by table name.
+        """
+        return dict((name, name + 'Derivative') for name in self.getVoltageTables())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def _getEquations(self):
+        """
+        Build the equations of the neuron, and apply the passes enabled by its parameters.
+
+        :returns: the equations, the lookup tables by name, and the report of the passes
+        :rtype: tuple
+        """
+        return self._applyPasses(self.getAdiabaticVariables())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @utilities.memoise
+    def _getFullEquations(self):
+        """
+        Build the equations of the neuron without adiabatic reduction, and apply the other passes enabled by its parameters.
+
+        :returns: the equations, the lookup tables by name, and the report of the passes
+        :rtype: tuple
+        """
+        return self._applyPasses(())
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _applyPasses(self, adiabaticVariables):
+        """
+        Build the equations of the neuron, replace the given state variables by their steady state, and apply the passes
+        enabled by its parameters.
+
+        :returns: the equations, the lookup tables by name, and the report of the passes
+        :rtype: tuple
+        """
+        res = self._buildEquations()
+        tables = {}
+        report = {}
+
+        if adiabaticVariables:
+            res, report['adiabaticRemovedVariables'] = reduction.reduceAdiabatic(res, adiabaticVariables)
+            report['adiabaticVariables'] = list(adiabaticVariables)
+
+        if self.foldConstants:
+            res = optimiser.foldConstants(res)
+
+        if self.pruneZeroCurrents:
+            # Currents are kept, even at zero, so that they can still be recorded
+            roots = ['v'] + [curr.name for curr in self.currents]
+            res, report['removedVariables'] = optimiser.eliminateDeadCode(res, roots)
+
+        if self.voltageTables:
+            # Tables require NumPy, which is only imported when they are enabled
+            import lookuptables
+
+            vMin, vMax, resolution = lookuptables.getSettings(self.voltageTables)
+            res, tables = lookuptables.tabulate(res, vMin, vMax, resolution)
+
+        if self.commonSubexpressions:
+            res, report['savedOperations'] = optimiser.eliminateCommonSubexpressions(res)
+
+        return res, tables, report
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _makeDistributions(self, baseDir):
+        """
+        Build the distributions of the heterogeneous parameters of the neuron, and replace each parameter by the name of the
+        per-neuron parameter holding its values.
+
+        :raises: ValueError if the neuron has no such parameter, or a distribution is invalid
+        """
+        res = collections.OrderedDict()
+        if not self.heterogeneous:
+            return res
+
+        # Distributions require NumPy, which is only imported when they are used
+        import heterogeneity
+
+        for path in sorted(self.heterogeneous):
+            owners, attribute = self._getParameterOwners(path)
+            name = heterogeneity.getParameterName(path)
+            res[name] = heterogeneity.ParameterDistribution(name, self.heterogeneous[path], getattr(owners[0], attribute), baseDir)
+            for owner in owners:
+                setattr(owner, attribute, name)
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _getParameterOwners(self, path):
+        """
+        Return the objects holding a parameter of the neuron, given by its path in the parameter file, and the attribute
+        holding it. The parameters of a calcium pool defined by the pump parameters of the calcium currents are held by
+        each of these currents.
+
+        :raises: ValueError if the neuron has no such parameter
+        """
+        if path in ('area', 'conductance'):
+            return [self], path
+
+        owner, attribute = path.split('.', 1) if '.' in path else (None, path)
+        if owner == 'calcium' and attribute in calciumpool.PARAMETERS:
+            if self.calciumPool is not None:
+                return [self.calciumPool], attribute
+            owners = [curr for curr in self.currents if curr.calcium and hasattr(curr, '_' + attribute)]
+            if owners:
+                return owners, attribute
+        else:
+            for curr in self.currents:
+                if curr.name == owner and attribute not in curr._plainAttributes + ('area', ) and hasattr(curr, '_' + attribute):
+                    return [curr], attribute
+
+        raise ValueError('Neuron ' + self.name + ' has no parameter ' + path)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _buildEquations(self):
+        """
+        Build the equations of the neural cell model from the equations of its currents.
+        """
+        res = equations.Equations()
+
+        # Merged currents are replaced by their target
+        aliases = self.getAliases()
+        currents = [curr for curr in self.currents if curr.name not in aliases]
+
+        # Neuron model equation, or clamped membrane potential
+        if self.vClamp:
+            res.append(equations.Equation(equations.PARAMETER, 'v', None, 'volt'))
+        else:
+            total = None
+            for curr in currents:
+                term = expressions.Name(curr.name)
+                total = expressions.UnaryOp('-', term) if total is None else expressions.BinOp('-', total, term)
+            stimulus = expressions.Name('I_stim')
+            total = stimulus if total is None else expressions.BinOp('+', total, stimulus)
+            dvdt = expressions.BinOp('/', total, expressions.parse(self._conductance)) # Append conductance division
+            res.append(equations.Equation(equations.DIFFERENTIAL, 'v', dvdt, 'volt'))
+
+        # Add current equations
+        for curr in currents:
+            for eq in curr.getEquations():
+                res.append(eq)
+
+        # Calcium pool, driven by all the calcium currents
+        calciumCurrents = [curr for curr in currents if curr.calcium]
+        if calciumCurrents:
+            pool = self.getCalciumPool()
+            if pool is None:
+                raise ValueError('Neuron ' + self.name + ' has calcium currents but no calcium pool, define it with the calcium keyword')
+            for eq in pool.getEquations([curr.name for curr in calciumCurrents]):
+                res.append(eq)
+
+        # Parameters which differ between neurons
+        for name, distribution in self._distributions.iteritems():
+            res.append(equations.Equation(equations.PARAMETER, name, None, distribution.unit))
+
+        # Stimulus current
+        res.append(equations.Equation(equations.PARAMETER, 'I_stim', None, 'amp'))
 
         return res
     ## ************************************************************ ##
@@ -0,0 +1,318 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+"""
+    sweep
+    ~~~~~~~~~~~~~
+    This module contains parameter sweeps, which build the model of a parameter file for many values of some of its
+    parameters, and run a job on each model over a pool of processes.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+
+import brianmodel as bm
+from utilities import includecache
+from utilities import expressions
+from utilities import units
+from utilities import utilities
+
+import collections
+import copy
+import itertools
+import multiprocessing
+import random
+import yaml
+
+
+# Ways of choosing the points of a sweep: every combination of the values of the parameters, random points, and points
+# of a Latin hypercube, which covers the range of each parameter evenly
+MODES = ('grid', 'random', 'lhs')
+
+# Job and sweep of the worker processes
+_worker = {}
+
+
+## ***************************************************************************************************************** ##
+def getModelString(model, point):
+    """
+    Default job of a sweep: generate the string representation of the model equations for each neuron type, see
+    :meth:`BrianModel.getModelString`.
+
+    :param model: the model of the point
+    :type model: :class:`BrianModel`
+    :param point: the values of the swept parameters, by path
+    :type point: :class:`collections.OrderedDict` of strings
+
+    :rtype: dict of strings
+    """
+    return model.getModelString()
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class _Axis(object):
+    """
+    The values of a swept parameter: either a list of values, or a range between ``low`` and ``high``, with a number of
+    values ``num`` for grids, on a linear or a logarithmic ``scale``.
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, path, values):
+        """
+        Default constructor.
+
+        :raises: ValueError if the range is invalid
+        """
+        self.path = path
+
+        if isinstance(values, dict):
+            self.values = None
+            low, high = [units.evaluateConstant(expressions.parse(str(values[key]))) for key in ('low', 'high')]
+            if low.dims != high.dims:
+                raise ValueError('The bounds of parameter ' + path + ' have different units')
+            self.low, self.high, self.dims = low.value, high.value, low.dims
+            self.num = values.get('num')
+            self.log = values.get('scale', 'linear') == 'log'
+            if self.log and not self.low * self.high > 0:
+                raise ValueError('The bounds of parameter ' + path + ' must have the same sign on a logarithmic scale')
+        else:
+            self.values = [str(value) for value in values]
+            if not self.values:
+                raise ValueError('Parameter ' + path + ' has no values')
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getValue(self, fraction):
+        """
+        Return the value at a fraction of the axis, between 0 and 1.
+
+        :rtype: string
+        """
+        if self.values is not None:
+            return self.values[min(int(fraction * len(self.values)), len(self.values) - 1)]
+
+        if self.log:
+            value = self.low * (self.high / self.low) ** fraction
+        else:
+            value = self.low + fraction * (self.high - self.low)
+        unit = units.getUnitString(self.dims)
+
+        return repr(value) if unit == '1' else repr(value) + ' * ' + utilities.getSafeStringParam(unit)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getGrid(self):
+        """
+        Return the values of the axis on a grid.
+
+        :rtype: list of strings
+
+        :raises: ValueError if a range does not give its number of values
+        """
+        if self.values is not None:
+            return list(self.values)
+        if not self.num:
+            raise ValueError('The range of parameter ' + self.path + ' needs a number of values num in a grid')
+
+        return [self.getValue(index / float(self.num - 1) if self.num > 1 else 0.) for index in xrange(self.num)]
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class Sweep(object):
+    """
+    The :class:`Sweep` builds the model of a parameter file for many values of some of its parameters, and runs a job on
+    each model, such as generating its equations or simulating it, over a pool of processes.
+
+    Initialised as:
+
+        Sweep(fileName, parameters, mode, n, seed)
+
+    with arguments:
+
+        ``fileName``
+        The name of the base parameter file (string)
+
+        ``parameters``
+        The values of the swept parameters, by path: ``<neuron>.area``, ``<neuron>.conductance``,
+        ``<neuron>.calcium.<name>`` or ``<neuron>.<current>.<name>``, such as ``pyramidalCAN.I_CAN.g``. Values are given
+        either as a list, such as ``["0 * msiemens * cm ** -2", "0.1 * msiemens * cm ** -2"]``, or as a range, such as
+        ``{'low': "0 * msiemens * cm ** -2", 'high': "0.1 * msiemens * cm ** -2", 'num': 11, 'scale': 'linear'}``, where
+        ``num`` is the number of values in a grid and ``scale`` is 'linear' or 'log' (dict)
+
+        ``mode``
+        The points of the sweep, one of :data:`MODES`: every combination of the values of the parameters ('grid'), or n
+        points drawn uniformly ('random'), or from a Latin hypercube ('lhs') (string)
+
+        ``n``
+        The number of points of random and Latin hypercube sweeps (int)
+
+        ``seed``
+        The seed of the random number generator (int)
+
+    The base parameter file and its included files are parsed once, and the model of each point is built from a copy of
+    the parsed parameters.
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, fileName, parameters, mode='grid', n=None, seed=None):
+        """
+        Default constructor.
+
+        :raises: ValueError if the mode is unknown, or the parameters are invalid
+        """
+        if mode not in MODES:
+            raise ValueError('Unknown sweep mode ' + str(mode) + ', expected one of: ' + ', '.join(MODES))
+        if mode != 'grid' and not n:
+            raise ValueError('A ' + mode + ' sweep needs a number of points n')
+
+        self.fileName = fileName
+        self.mode = mode
+        paths = list(parameters) if isinstance(parameters, collections.OrderedDict) else sorted(parameters)
+        self.axes = [_Axis(path, parameters[path]) for path in paths]
+        self.includeCache = includecache.IncludeCache()
+        self.library = None
+
+        # Parse the base parameter file
+        with open(fileName) as f:
+            self.parameters = yaml.safe_load(f)
+
+        self.points = self._makePoints(n, random.Random(seed))
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __len__(self):
+        return len(self.points)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _makePoints(self, n, generator):
+        """
+        Return the points of the sweep, as the values of the swept parameters by path.
+        """
+        paths = [axis.path for axis in self.axes]
+
+        if self.mode == 'grid':
+            values = itertools.product(*[axis.getGrid() for axis in self.axes])
+        elif self.mode == 'random':
+            values = [[axis.getValue(generator.random()) for axis in self.axes] for index in xrange(n)]
+        else:
+            # Each parameter takes one value in each of n equal intervals of its range, in random order
+            columns = []
+            for axis in self.axes:
+                strata = range(n)
+                generator.shuffle(strata)
+                columns.append([axis.getValue((stratum + generator.random()) / n) for stratum in strata])
+            values = zip(*columns)
+
+        return [collections.OrderedDict(zip(paths, point)) for point in values]
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getModel(self, point):
+        """
+        Build the model of a point of the sweep.
+
+        :param point: the values of the swept parameters, by path
+        :type point: dict of strings
+
+        :rtype: :class:`BrianModel`
+
+        :raises: ValueError if a path does not name a parameter of the model
+        """
+        model = bm.BrianModel(self.fileName, self.includeCache, library=self.library)
+        model.setParameters(copy.deepcopy(self.parameters))
+        self.library = model.library
+
+        neurons = dict((neuron.name, neuron) for neuron in model.neurons)
+        for path, value in point.iteritems():
+            name, parameter = path.split('.', 1) if '.' in path else (path, '')
+            if name not in neurons:
+                raise ValueError('Model ' + self.fileName + ' has no neuron ' + name + ' for parameter ' + path)
+            neurons[name].setParameter(parameter, value)
+
+        return model
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def run(self, job=getModelString, processes=None, chunkSize=None):
+        """
+        Run a job on the model of every point of the sweep, over a pool of processes.
+        Points are sent to the processes in chunks, and the results are returned in the order of the points.
+        The job is called with the model and the point, and must be a function defined at the top level of a module, so
+        that it can be sent to the processes. Its result must be picklable.
+
+        :param job: the job, defaults to generating the model equations, see :func:`getModelString`
+        :type job: callable
+        :param processes: the number of processes, defaults to the number of CPUs; with a single process, jobs are run
+            in the current process
+        :type processes: int
+        :param chunkSize: the number of points sent to a process at once, defaults to a quarter of the points of each process
+        :type chunkSize: int
+
+        :returns: the results of the job, in the order of :attr:`points`
+        :rtype: list
+        """
+        if processes == 1 or len(self.points) <= 1:
+            return [job(self.getModel(point), point) for point in self.points]
+
+        # Included files are parsed and the library of currents indexed before the processes start, which receive them with the sweep
+        self.getModel(self.points[0])
+
+        processes = processes or multiprocessing.cpu_count()
+        if chunkSize is None:
+            chunkSize = max(1, len(self.points) // (4 * processes))
+
+        pool = multiprocessing.Pool(processes, _initialiseWorker, (self, job))
+        try:
+            return list(pool.imap(_runJob, self.points, chunkSize))
+        finally:
+            pool.terminate()
+            pool.join()
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _initialiseWorker(sweep, job):
+    """
+    Store the sweep and the job of a worker process.
+    """
+    _worker['sweep'] = sweep
+    _worker['job'] = job
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _runJob(point):
+    """
+    Run the job of a worker process on a point of the sweep.
+    """
+    return _worker['job'](_worker['sweep'].getModel(point), point)
+## ***************************************************************************************************************** ##
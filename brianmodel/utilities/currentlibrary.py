@@ -0,0 +1,325 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    currentlibrary
+    ~~~~~~~~~~~~~
+    This module contains an index of the current definitions of a directory of YAML files, such as includes/, so that
+    currents can be found by name or class without opening every file, and loaded only when a neuron references them.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import diskcache
+import includecache
+
+import hashlib
+import os
+
+import yaml
+
+
+
+# Suffixes of the files scanned for current definitions
+SUFFIXES = ('.yml', '.yaml')
+
+# Keys of a reference to a current which select its definition, rather than override its parameters
+_selectors = ('file', )
+
+
+
+## ***************************************************************************************************************** ##
+class CurrentLibrary(object):
+    """
+    The :class:`CurrentLibrary` indexes the current definitions of the YAML files of a directory and its subdirectories,
+    by current name and by class. Files holding a list of currents, as included files do, are indexed; parameter files
+    of neurons are skipped.
+
+    The index is built when it is first used, and stored in an on-disk cache. It is then refreshed incrementally: only
+    the files whose modification time or size changed are parsed again. Definitions are parsed when they are loaded,
+    through the cache of included files.
+
+    Initialised as:
+
+        CurrentLibrary(directory, includeCache, indexCache)
+
+    with arguments:
+
+        ``directory``
+        The directory holding the current files (string)
+
+        ``includeCache``
+        The cache of parsed files through which definitions are loaded, which may be shared with models
+        (:class:`IncludeCache`)
+
+        ``indexCache``
+        The on-disk cache storing the index (:class:`DiskCache`). Defaults to the cache in ~/.cache/brianmodel
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, directory, includeCache=None, indexCache=None):
+        """
+        Default constructor.
+        """
+        self.directory = os.path.realpath(os.path.expanduser(directory))
+        self.includeCache = includeCache if includeCache is not None else includecache.IncludeCache()
+        self.indexCache = indexCache if indexCache is not None else diskcache.DiskCache()
+
+        # Entries of the index by file, and current definitions by name and by class, built on first use
+        self._files = None
+        self._byName = {}
+        self._byClass = {}
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getIndexKey(self):
+        """
+        Return the key of the index of the directory in the on-disk cache.
+
+        :rtype: string
+        """
+        return 'library-' + hashlib.sha1(self.directory.encode('utf-8')).hexdigest()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def refresh(self):
+        """
+        Bring the index up to date with the directory: parse the files which are new or whose modification time or size
+        changed, and drop the files which were removed. The index is stored when it changes.
+
+        :returns: the number of files parsed
+        :rtype: int
+        """
+        if self._files is None:
+            stored = self.indexCache.get(self.getIndexKey())
+            self._files = stored['files'] if stored and stored.get('directory') == self.directory else {}
+
+        files = {}
+        parsed = 0
+        for root, dirs, fileNames in os.walk(self.directory):
+            dirs.sort()
+            for fileName in sorted(fileNames):
+                if not fileName.endswith(SUFFIXES):
+                    continue
+                path = os.path.join(root, fileName)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                relPath = os.path.relpath(path, self.directory)
+                entry = self._files.get(relPath)
+                if entry is None or entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size:
+                    entry = self._scanFile(path)
+                    entry['mtime'] = stat.st_mtime
+                    entry['size'] = stat.st_size
+                    parsed += 1
+                files[relPath] = entry
+
+        changed = parsed > 0 or len(files) != len(self._files)
+        self._files = files
+        self._buildLookup()
+
+        if changed:
+            try:
+                self.indexCache.put(self.getIndexKey(), {'directory': self.directory, 'files': files})
+            except (IOError, OSError):
+                # The index is rebuilt by the next process if it cannot be stored
+                pass
+
+        return parsed
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def find(self, name=None, className=None, fileName=None):
+        """
+        Return the current definitions of the library with the given name, class and file.
+        Definitions are looked up in the index by name or by class, without opening any file.
+
+        :param name: the name of the current, such as I_Na
+        :type name: string
+        :param className: the class of the current, such as IonicCurrentHHTraubNa
+        :type className: string
+        :param fileName: the path of the file holding the definition, relative to the directory of the library
+        :type fileName: string
+
+        :returns: the class, name, file and position in the file of each definition
+        :rtype: list of tuples
+        """
+        if self._files is None:
+            self.refresh()
+
+        if name is not None:
+            res = self._byName.get(name, [])
+        elif className is not None:
+            res = self._byClass.get(className, [])
+        else:
+            res = [definition for definitions in self._byName.itervalues() for definition in definitions]
+
+        return sorted(definition for definition in res if (className is None or definition[0] == className) and
+                      (fileName is None or definition[2] == os.path.normpath(fileName)))
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getPath(self, reference):
+        """
+        Return the path of the file holding a current definition.
+
+        :param reference: the name of the current, or a dict with its ``name`` and optionally its ``class`` or ``file``
+        :type reference: string or dict
+
+        :rtype: string
+
+        :raises: ValueError if the library has no such current, or several
+        """
+        return os.path.join(self.directory, self._resolve(reference)[2])
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def load(self, reference):
+        """
+        Load the parameters of a current definition, as they would be included from its file. The other entries of a
+        dict reference, such as ``g``, override the parameters of the definition.
+
+        :param reference: the name of the current, or a dict with its ``name`` and optionally its ``class`` or ``file``
+        :type reference: string or dict
+
+        :returns: a copy of the current parameters
+        :rtype: dict
+
+        :raises: ValueError if the library has no such current, or several
+        """
+        definition = self._resolve(reference)
+        path = os.path.join(self.directory, definition[2])
+
+        # Files edited since the index was built are indexed again
+        try:
+            stat = os.stat(path)
+            entry = self._files[definition[2]]
+            stale = entry['mtime'] != stat.st_mtime or entry['size'] != stat.st_size
+        except OSError:
+            stale = True
+        if stale:
+            self.refresh()
+            definition = self._resolve(reference, False)
+            path = os.path.join(self.directory, definition[2])
+
+        res = self.includeCache.load(path)[definition[3]]
+        if isinstance(reference, dict):
+            res.update((key, value) for key, value in reference.iteritems() if key not in _selectors)
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getErrors(self):
+        """
+        Return the files of the library which could not be indexed, such as files which cannot be parsed, or current
+        definitions without a class or a name.
+
+        :returns: the error of each file, by path relative to the directory of the library
+        :rtype: dict of strings
+        """
+        if self._files is None:
+            self.refresh()
+
+        return dict((relPath, entry['error']) for relPath, entry in self._files.iteritems() if entry.get('error'))
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _resolve(self, reference, refresh=True):
+        """
+        Return the definition of the library a reference designates. Currents missing from the index are looked up again
+        after refreshing it, as they may have been added since it was built.
+
+        :raises: ValueError if the library has no such current, or several
+        """
+        if not isinstance(reference, dict):
+            reference = {'name': reference}
+        if 'name' not in reference:
+            raise ValueError('Current library reference without a name: ' + str(reference))
+
+        res = self.find(reference['name'], reference.get('class'), reference.get('file'))
+        if not res and refresh and self._files is not None:
+            self.refresh()
+            return self._resolve(reference, False)
+        if not res:
+            raise ValueError('Current library ' + self.directory + ' has no current ' + str(reference['name']))
+        if len(res) > 1:
+            raise ValueError('Current library ' + self.directory + ' has several currents ' + str(reference['name']) +
+                             ', select one by class or file: ' + ', '.join(definition[0] + ' in ' + definition[2] for definition in res))
+
+        return res[0]
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _buildLookup(self):
+        """
+        Build the lookup of current definitions by name and by class from the entries of the index.
+        """
+        self._byName = {}
+        self._byClass = {}
+        for relPath, entry in self._files.iteritems():
+            for className, name, position in entry['currents']:
+                definition = (className, name, relPath, position)
+                self._byName.setdefault(name, []).append(definition)
+                self._byClass.setdefault(className, []).append(definition)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @staticmethod
+    def _scanFile(path):
+        """
+        Parse a file of the library, and return its entry in the index: the class, name and position of each of its
+        current definitions, and the error which prevented indexing some of them.
+        """
+        try:
+            with open(path) as f:
+                contents = yaml.safe_load(f)
+        except (IOError, yaml.YAMLError) as e:
+            return {'currents': [], 'error': str(e)}
+
+        # Parameter files of neurons and empty files hold no current definition
+        if contents is None or isinstance(contents, dict) and 'neurons' in contents:
+            return {'currents': [], 'error': None}
+        if not isinstance(contents, list):
+            return {'currents': [], 'error': 'Not a list of currents'}
+
+        currents = []
+        invalid = []
+        for position, params in enumerate(contents):
+            if isinstance(params, dict) and params.get('class') and params.get('name'):
+                currents.append([str(params['class']), str(params['name']), position])
+            else:
+                invalid.append(str(position))
+
+        return {'currents': currents, 'error': 'Current definitions without class or name at positions ' + ', '.join(invalid) if invalid else None}
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
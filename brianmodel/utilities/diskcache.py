@@ -0,0 +1,220 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    diskcache
+    ~~~~~~~~~~~~~
+    This module contains a persistent, size-capped, least-recently-used cache stored in a directory on disk.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import errno
+import json
+import os
+import tempfile
+
+
+
+## ***************************************************************************************************************** ##
+def getDefaultCacheDir():
+    """
+    Return the default cache directory of the brianmodel package, honouring $XDG_CACHE_HOME.
+
+    :returns: the default cache directory
+    :rtype: string
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+    return os.path.join(base, 'brianmodel')
+## ***************************************************************************************************************** ##
+
+
+
+## ***************************************************************************************************************** ##
+class DiskCache(object):
+    """
+    The :class:`DiskCache` stores one file per entry in a directory.
+    Reading an entry refreshes its modification time, and the least recently used entries are evicted whenever the total size of the cache exceeds its cap.
+
+    Initialised as:
+
+        DiskCache(directory, maxSize)
+
+    with arguments:
+
+        ``directory``
+        The directory holding the cache entries (string). Defaults to ~/.cache/brianmodel
+
+        ``maxSize``
+        The maximum total size of the cache, in bytes (int)
+    """
+
+    # Suffix of the entry files
+    suffix = '.json'
+
+
+    ## ************************************************************ ##
+    def __init__(self, directory=None, maxSize=64 * 1024 ** 2):
+        """
+        Default constructor.
+
+        :param directory: the directory holding the cache entries
+        :type directory: string
+        :param maxSize: the maximum total size of the cache in bytes
+        :type maxSize: int
+        """
+        if directory is None:
+            directory = getDefaultCacheDir()
+        self.directory = os.path.expanduser(directory)
+        self.maxSize = maxSize
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getPath(self, key):
+        """
+        Return the path of the file holding the entry with the given key.
+
+        :param key: the entry key
+        :type key: string
+        """
+        return os.path.join(self.directory, key + self.suffix)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def get(self, key):
+        """
+        Return the entry stored with the given key.
+
+        :param key: the entry key
+        :type key: string
+
+        :returns: the stored value, or None on a cache miss
+        """
+        path = self.getPath(key)
+        try:
+            with open(path, 'rb') as f:
+                value = self.deserialise(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+        # Mark the entry as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return value
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def put(self, key, value):
+        """
+        Store the given value, then evict old entries if the cache is over its size cap.
+
+        :param key: the entry key
+        :type key: string
+        :param value: the value to store
+        """
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        # Write to a temporary file first so that concurrent readers never see partial entries
+        fd, tmpPath = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self.serialise(value, f)
+            os.rename(tmpPath, self.getPath(key))
+        except Exception:
+            os.remove(tmpPath)
+            raise
+
+        self.evict()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache fits its size cap.
+        """
+        entries = []
+        total = 0
+        for fileName in os.listdir(self.directory):
+            if not fileName.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, fileName)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def clear(self):
+        """
+        Remove all the entries of the cache.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for fileName in os.listdir(self.directory):
+            if fileName.endswith(self.suffix):
+                os.remove(os.path.join(self.directory, fileName))
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def serialise(self, value, f):
+        """
+        Write a value to an open file.
+        """
+        f.write(json.dumps(value, sort_keys=True).encode('utf-8'))
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def deserialise(self, f):
+        """
+        Read a value from an open file.
+        """
+        return json.loads(f.read().decode('utf-8'))
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
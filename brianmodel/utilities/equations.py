@@ -0,0 +1,513 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    equations
+    ~~~~~~~~~~~~~
+    This module contains a structured representation of Brian model equations.
+    A model is a list of differential equations (``dx/dt = f : unit``), subexpressions (``y = g : unit``) and parameters (``z : unit``).
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import collections
+import re
+
+import expressions
+import units
+
+
+
+# Kinds of equations
+DIFFERENTIAL = 'differential'
+SUBEXPRESSION = 'subexpression'
+PARAMETER = 'parameter'
+
+# Patterns of the equation lines
+_differentialPattern = re.compile(r'^d(?P<name>[A-Za-z_]\w*)\s*/\s*dt\s*=(?P<expression>.+?):(?P<unit>[^:]+)$')
+_subexpressionPattern = re.compile(r'^(?P<name>[A-Za-z_]\w*)\s*=(?P<expression>.+?):(?P<unit>[^:]+)$')
+_parameterPattern = re.compile(r'^(?P<name>[A-Za-z_]\w*)\s*:(?P<unit>[^:]+)$')
+
+# Names which are always defined by the simulator
+_simulatorNames = ('t', 'dt', 'i', 'N')
+
+try:
+    _stringTypes = basestring
+except NameError:
+    _stringTypes = str
+
+
+
+## ***************************************************************************************************************** ##
+class Equation(object):
+    """
+    The :class:`Equation` represents a single line of a model: a differential equation, a subexpression or a parameter.
+
+    Initialised as:
+
+        Equation(kind, name, expression, unit)
+
+    with arguments:
+
+        ``kind``
+        One of DIFFERENTIAL, SUBEXPRESSION or PARAMETER (string)
+
+        ``name``
+        The name of the variable (string)
+
+        ``expression``
+        The right-hand side of the equation, None for parameters (:class:`Expression` or string)
+
+        ``unit``
+        The unit of the variable (string)
+
+    Equations are not modified once built, passes create modified copies with :meth:`copy`, so that equations can be
+    shared between models and their rendering is cached.
+    """
+
+    __slots__ = ('kind', 'name', 'expression', 'unit', '_rendered')
+
+
+    ## ************************************************************ ##
+    def __init__(self, kind, name, expression, unit):
+        """
+        Default constructor.
+        """
+        if isinstance(expression, _stringTypes):
+            expression = expressions.parse(expression)
+
+        self.kind = kind
+        self.name = name
+        self.expression = expression
+        self.unit = unit.strip()
+        self._rendered = None
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def render(self):
+        """
+        Render the equation as a Brian-compatible string.
+
+        :rtype: string
+        """
+        if self._rendered is None:
+            if self.kind == DIFFERENTIAL:
+                self._rendered = 'd' + self.name + '/dt = ' + expressions.render(self.expression) + ' : ' + self.unit
+            elif self.kind == SUBEXPRESSION:
+                self._rendered = self.name + ' = ' + expressions.render(self.expression) + ' : ' + self.unit
+            else:
+                self._rendered = self.name + ' : ' + self.unit
+
+        return self._rendered
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getNames(self):
+        """
+        Return the names referenced by the right-hand side of the equation.
+
+        :rtype: set of strings
+        """
+        if self.expression is None:
+            return set()
+
+        return expressions.getNames(self.expression)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def copy(self, expression=None):
+        """
+        Return a copy of the equation, optionally with a different right-hand side.
+        """
+        return Equation(self.kind, self.name, self.expression if expression is None else expression, self.unit)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __repr__(self):
+        return '<Equation ' + self.render() + '>'
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class Equations(object):
+    """
+    The :class:`Equations` represents the ordered list of equations of a model, indexed by variable name.
+
+    Initialised as:
+
+        Equations(equations)
+
+    with arguments:
+
+        ``equations``
+        The equations of the model (iterable of :class:`Equation`)
+    """
+
+    ## ************************************************************ ##
+    def __init__(self, equations=()):
+        """
+        Default constructor.
+
+        :raises: ValueError if a variable is defined more than once
+        """
+        self._equations = []
+        self._byName = {}
+        self._dependencies = {}
+        for eq in equations:
+            self.append(eq)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def append(self, equation):
+        """
+        Add an equation to the model.
+
+        :raises: ValueError if the variable is already defined
+        """
+        if equation.name in self._byName:
+            raise ValueError('Variable ' + equation.name + ' is defined more than once')
+
+        self._equations.append(equation)
+        self._byName[equation.name] = equation
+        self._dependencies.clear()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __iter__(self):
+        return iter(self._equations)
+
+    def __len__(self):
+        return len(self._equations)
+
+    def __contains__(self, name):
+        return name in self._byName
+
+    def __getitem__(self, name):
+        return self._byName[name]
+
+    def get(self, name, default=None):
+        return self._byName.get(name, default)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getNames(self, kind=None):
+        """
+        Return the names of the variables defined by the model, in order.
+
+        :param kind: only return variables of this kind
+        :type kind: string
+
+        :rtype: list of strings
+        """
+        return [eq.name for eq in self._equations if kind is None or eq.kind == kind]
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getExternalNames(self):
+        """
+        Return the names referenced by the model which are neither defined by it, nor units, nor provided by the simulator.
+        These must be supplied by the namespace of the simulation.
+
+        :rtype: set of strings
+        """
+        res = set()
+        for eq in self._equations:
+            res.update(eq.getNames())
+
+        return set(name for name in res if name not in self._byName and not units.isUnit(name) and name not in _simulatorNames)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getFunctionNames(self):
+        """
+        Return the names of the functions called by the model.
+
+        :rtype: set of strings
+        """
+        res = set()
+        for eq in self._equations:
+            if eq.expression is not None:
+                expressions.getFunctionNames(eq.expression, res)
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getSortedSubexpressions(self, names=None):
+        """
+        Return subexpressions in an order in which each one is defined after the subexpressions it references.
+
+        :param names: only return these subexpressions, and those they depend on
+        :type names: iterable of strings
+
+        :rtype: list of :class:`Equation`
+
+        :raises: ValueError if subexpressions reference each other cyclically
+        """
+        if names is None:
+            names = self.getNames(SUBEXPRESSION)
+
+        res = []
+        state = {}
+
+        def visit(name):
+            eq = self._byName.get(name)
+            if eq is None or eq.kind != SUBEXPRESSION or state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError('Subexpression ' + name + ' depends on itself')
+            state[name] = 1
+            for dep in sorted(eq.getNames()):
+                visit(dep)
+            state[name] = 2
+            res.append(eq)
+
+        for name in names:
+            visit(name)
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getDependencies(self, name):
+        """
+        Return all the names an equation depends on, directly or through subexpressions.
+
+        :param name: the name of the variable
+        :type name: string
+
+        :rtype: set of strings
+        """
+        if name in self._dependencies:
+            return self._dependencies[name]
+
+        res = set()
+        stack = list(self._byName[name].getNames())
+        while stack:
+            dep = stack.pop()
+            if dep in res:
+                continue
+            res.add(dep)
+            eq = self._byName.get(dep)
+            if eq is not None and eq.kind == SUBEXPRESSION:
+                stack.extend(eq.getNames())
+        self._dependencies[name] = res
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getReachableNames(self, roots):
+        """
+        Return the variables needed to compute the given ones, following the references of subexpressions and of
+        differential equations: a state variable is needed if a needed equation references it.
+
+        :param roots: the names of the variables to compute
+        :type roots: iterable of strings
+
+        :returns: the needed variables defined by the model, including the roots it defines
+        :rtype: set of strings
+        """
+        res = set()
+        stack = [name for name in roots if name in self._byName]
+        while stack:
+            name = stack.pop()
+            if name in res:
+                continue
+            res.add(name)
+            stack.extend(dep for dep in self._byName[name].getNames() if dep in self._byName)
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def inline(self, node, names=None):
+        """
+        Replace the subexpressions referenced by an expression by their definitions, recursively.
+
+        :param node: the expression
+        :type node: :class:`Expression`
+        :param names: only inline these subexpressions, defaults to all
+        :type names: set of strings
+
+        :rtype: :class:`Expression`
+        """
+        replacements = {}
+        for eq in self.getSortedSubexpressions():
+            if names is None or eq.name in names:
+                replacements[eq.name] = expressions.substitute(eq.expression, replacements)
+
+        return expressions.substitute(node, replacements)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def differentiate(self, node, variable, auxiliaries, functionDerivatives=None):
+        """
+        Differentiate an expression with respect to a variable, applying the chain rule through subexpressions.
+        The derivatives of the subexpressions which depend on the variable are named ``_d_<name>_d_<variable>``,
+        and their definitions are added to ``auxiliaries`` in an order suitable for evaluation.
+
+        :param node: the expression
+        :type node: :class:`Expression`
+        :param variable: the variable of differentiation
+        :type variable: string
+        :param auxiliaries: the auxiliary subexpressions, by name, shared between calls
+        :type auxiliaries: :class:`collections.OrderedDict`
+        :param functionDerivatives: the names of the derivatives of functions provided by the namespace, by function name
+        :type functionDerivatives: dict
+
+        :returns: the derivative
+        :rtype: :class:`Expression`
+        """
+        def getNameDerivative(name):
+            if name == variable:
+                return expressions.Number(1)
+
+            eq = self._byName.get(name)
+            if eq is None or eq.kind != SUBEXPRESSION or variable not in self.getDependencies(name):
+                return None
+
+            auxName = '_d_' + name + '_d_' + variable
+            if auxName not in auxiliaries:
+                derivative = expressions.differentiate(eq.expression, getNameDerivative, functionDerivatives)
+                if isinstance(derivative, (expressions.Number, expressions.Name)):
+                    return derivative
+                auxiliaries[auxName] = Equation(SUBEXPRESSION, auxName, derivative, self._getDerivativeUnit(eq.unit, variable))
+
+            return expressions.Name(auxName)
+
+        return expressions.differentiate(node, getNameDerivative, functionDerivatives)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getJacobian(self, variables=None, functionDerivatives=None):
+        """
+        Derive the Jacobian of the differential equations of the model symbolically, J[x, y] = d(dx/dt)/dy.
+        The derivatives of the subexpressions shared by several entries are given as auxiliary subexpressions, see :meth:`differentiate`.
+
+        :param variables: the state variables, in order, defaults to all the state variables of the model
+        :type variables: list of strings
+        :param functionDerivatives: the names of the derivatives of functions provided by the namespace, by function name
+        :type functionDerivatives: dict
+
+        :returns: the entries of the Jacobian which are not zero, by (x, y) pair, and the auxiliary subexpressions, by name,
+            in evaluation order
+        :rtype: tuple of :class:`collections.OrderedDict`
+        """
+        if variables is None:
+            variables = self.getNames(DIFFERENTIAL)
+
+        entries = collections.OrderedDict()
+        auxiliaries = collections.OrderedDict()
+        for name in variables:
+            expression = self._byName[name].expression
+            for variable in variables:
+                derivative = self.differentiate(expression, variable, auxiliaries, functionDerivatives)
+                if not (isinstance(derivative, expressions.Number) and derivative.value == 0):
+                    entries[(name, variable)] = derivative
+
+        return entries, auxiliaries
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _getDerivativeUnit(self, unit, variable):
+        """
+        Return the unit of the derivative of a quantity of the given unit with respect to a variable, or '1' if a unit cannot be parsed.
+        """
+        try:
+            dims = units.divideDimensions(units.getUnitDimensions(unit), units.getUnitDimensions(self._byName[variable].unit))
+        except (KeyError, ValueError):
+            return '1'
+
+        return units.getUnitString(dims)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def render(self):
+        """
+        Render the model as a Brian-compatible string, one equation per line.
+
+        :rtype: string
+        """
+        return '\n'.join(eq.render() for eq in self._equations) + '\n'
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+
+## ***************************************************************************************************************** ##
+def parseEquations(string):
+    """
+    Parse a Brian model string into its equations.
+    Comments and empty lines are ignored.
+
+    :param string: the model string
+    :type string: string
+
+    :rtype: :class:`Equations`
+
+    :raises: ValueError if a line cannot be parsed
+    """
+    res = Equations()
+
+    for line in string.split('\n'):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+
+        match = _differentialPattern.match(line)
+        if match:
+            res.append(Equation(DIFFERENTIAL, match.group('name'), match.group('expression'), match.group('unit')))
+            continue
+
+        match = _subexpressionPattern.match(line)
+        if match:
+            res.append(Equation(SUBEXPRESSION, match.group('name'), match.group('expression'), match.group('unit')))
+            continue
+
+        match = _parameterPattern.match(line)
+        if match:
+            res.append(Equation(PARAMETER, match.group('name'), None, match.group('unit')))
+            continue
+
+        raise ValueError('Cannot parse equation: ' + line)
+
+    return res
+## ***************************************************************************************************************** ##
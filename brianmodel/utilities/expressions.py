@@ -0,0 +1,695 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    expressions
+    ~~~~~~~~~~~~~
+    This module contains a light-weight symbolic representation of the mathematical expressions used in Brian equations.
+    Expressions are immutable trees of :class:`Number`, :class:`Name`, :class:`UnaryOp`, :class:`BinOp` and :class:`Call` nodes,
+    which can be parsed from and rendered to strings, simplified, and differentiated.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import ast
+import math
+
+
+
+# Binary operators, by Python AST node class name
+_binaryOperators = {
+    'Add': '+',
+    'Sub': '-',
+    'Mult': '*',
+    'Div': '/',
+    'Pow': '**',
+    'Mod': '%',
+}
+
+# Comparison operators, by Python AST node class name
+_comparisonOperators = {
+    'Lt': '<',
+    'LtE': '<=',
+    'Gt': '>',
+    'GtE': '>=',
+    'Eq': '==',
+    'NotEq': '!=',
+}
+
+# Operator precedences, used to render expressions with a minimal number of brackets
+_precedence = {
+    '<': 1, '<=': 1, '>': 1, '>=': 1, '==': 1, '!=': 1,
+    '+': 2, '-': 2,
+    '*': 3, '/': 3, '%': 3,
+    'unary': 4,
+    '**': 5,
+    'atom': 6,
+}
+
+# Mathematical functions available in equations
+FUNCTIONS = ('exp', 'log', 'log10', 'sqrt', 'sin', 'cos', 'tan', 'sinh', 'cosh', 'tanh', 'arcsin', 'arccos', 'arctan', 'abs', 'clip', 'int', 'sign', 'floor', 'ceil')
+
+
+
+## ***************************************************************************************************************** ##
+class Expression(object):
+    """
+    The :class:`Expression` is the base class of the nodes of an expression tree.
+    Nodes are immutable, and compare equal when they are structurally identical.
+    """
+
+    __slots__ = ('_hash', )
+
+
+    ## ************************************************************ ##
+    def _key(self):
+        """
+        Return a tuple identifying the structure of the node.
+        """
+        raise NotImplementedError()
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __eq__(self, other):
+        return type(self) is type(other) and self._key() == other._key()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash((type(self).__name__, self._key()))
+            return self._hash
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def __str__(self):
+        return render(self)
+
+    def __repr__(self):
+        return '<' + type(self).__name__ + ' ' + render(self) + '>'
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def getChildren(self):
+        """
+        Return the child nodes of the node.
+        """
+        return ()
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class Number(Expression):
+    """
+    A numerical constant.
+    """
+
+    __slots__ = ('value', )
+
+    def __init__(self, value):
+        self.value = value
+
+    def _key(self):
+        return (self.value, )
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class Name(Expression):
+    """
+    A reference to a variable, a parameter, or a unit.
+    """
+
+    __slots__ = ('name', )
+
+    def __init__(self, name):
+        self.name = name
+
+    def _key(self):
+        return (self.name, )
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class UnaryOp(Expression):
+    """
+    A unary operation (``-x`` or ``+x``).
+    """
+
+    __slots__ = ('op', 'operand')
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+    def _key(self):
+        return (self.op, self.operand)
+
+    def getChildren(self):
+        return (self.operand, )
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class BinOp(Expression):
+    """
+    A binary operation (arithmetic or comparison).
+    """
+
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def _key(self):
+        return (self.op, self.left, self.right)
+
+    def getChildren(self):
+        return (self.left, self.right)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+class Call(Expression):
+    """
+    A function call.
+    """
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = tuple(args)
+
+    def _key(self):
+        return (self.func, self.args)
+
+    def getChildren(self):
+        return self.args
+## ***************************************************************************************************************** ##
+
+
+
+## ***************************************************************************************************************** ##
+def parse(string):
+    """
+    Parse an expression string into an expression tree.
+
+    :param string: the expression
+    :type string: string
+
+    :returns: the root node of the expression tree
+    :rtype: :class:`Expression`
+
+    :raises: ValueError if the expression is not valid
+    """
+    try:
+        tree = ast.parse(string.strip(), mode='eval')
+    except SyntaxError:
+        raise ValueError('Cannot parse expression: ' + string)
+
+    return _fromAst(tree.body, string)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _fromAst(node, string):
+    """
+    Convert a Python AST node into an expression tree.
+    """
+    nodeType = type(node).__name__
+
+    if nodeType in ('Num', 'Constant'):
+        value = node.n if nodeType == 'Num' else node.value
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError('Unsupported constant ' + repr(value) + ' in expression: ' + string)
+        return Number(value)
+    elif nodeType == 'Name':
+        return Name(node.id)
+    elif nodeType == 'UnaryOp':
+        op = {'USub': '-', 'UAdd': '+'}.get(type(node.op).__name__)
+        if op is None:
+            raise ValueError('Unsupported unary operator in expression: ' + string)
+        return UnaryOp(op, _fromAst(node.operand, string))
+    elif nodeType == 'BinOp':
+        op = _binaryOperators.get(type(node.op).__name__)
+        if op is None:
+            raise ValueError('Unsupported binary operator in expression: ' + string)
+        return BinOp(op, _fromAst(node.left, string), _fromAst(node.right, string))
+    elif nodeType == 'Compare' and len(node.ops) == 1:
+        op = _comparisonOperators.get(type(node.ops[0]).__name__)
+        if op is None:
+            raise ValueError('Unsupported comparison in expression: ' + string)
+        return BinOp(op, _fromAst(node.left, string), _fromAst(node.comparators[0], string))
+    elif nodeType == 'Call' and type(node.func).__name__ == 'Name' and not node.keywords:
+        return Call(node.func.id, [_fromAst(arg, string) for arg in node.args])
+
+    raise ValueError('Unsupported syntax in expression: ' + string)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _formatNumber(value):
+    """
+    Render a number so that it is parsed back to the same value and type.
+    """
+    if isinstance(value, float):
+        res = repr(value)
+        if res in ('inf', '-inf', 'nan'):
+            raise ValueError('Cannot render non-finite number ' + res)
+        return res
+
+    return str(value)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getPrecedence(node):
+    """
+    Return the precedence of the operator at the root of the given node.
+    """
+    if isinstance(node, BinOp):
+        return _precedence[node.op]
+    elif isinstance(node, UnaryOp):
+        return _precedence['unary']
+    elif isinstance(node, Number) and node.value < 0:
+        return _precedence['unary']
+
+    return _precedence['atom']
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def render(node):
+    """
+    Render an expression tree as a Brian-compatible string, with a minimal number of brackets.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+
+    :rtype: string
+    """
+    if isinstance(node, Number):
+        return _formatNumber(node.value)
+    elif isinstance(node, Name):
+        return node.name
+    elif isinstance(node, Call):
+        return node.func + '(' + ', '.join(render(arg) for arg in node.args) + ')'
+    elif isinstance(node, UnaryOp):
+        operand = render(node.operand)
+        if _getPrecedence(node.operand) <= _precedence['unary']:
+            operand = '(' + operand + ')'
+        return node.op + operand
+
+    # Binary operators
+    precedence = _precedence[node.op]
+    left = render(node.left)
+    right = render(node.right)
+    if node.op == '**':
+        # Right-associative, and binds tighter than a unary operator on its left
+        if _getPrecedence(node.left) <= precedence:
+            left = '(' + left + ')'
+        if _getPrecedence(node.right) < _precedence['unary']:
+            right = '(' + right + ')'
+    else:
+        if _getPrecedence(node.left) < precedence:
+            left = '(' + left + ')'
+        if _getPrecedence(node.right) <= precedence:
+            right = '(' + right + ')'
+
+    return left + ' ' + node.op + ' ' + right
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getNames(node, res=None):
+    """
+    Return the names referenced by an expression, excluding function names.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+
+    :rtype: set of strings
+    """
+    if res is None:
+        res = set()
+
+    if isinstance(node, Name):
+        res.add(node.name)
+    for child in node.getChildren():
+        getNames(child, res)
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getFunctionNames(node, res=None):
+    """
+    Return the names of the functions called by an expression.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+
+    :rtype: set of strings
+    """
+    if res is None:
+        res = set()
+
+    if isinstance(node, Call):
+        res.add(node.func)
+    for child in node.getChildren():
+        getFunctionNames(child, res)
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def transform(node, function):
+    """
+    Rebuild an expression tree bottom-up, applying the given function to every rebuilt node.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+    :param function: function mapping a node to its replacement
+    :type function: callable
+
+    :rtype: :class:`Expression`
+    """
+    if isinstance(node, UnaryOp):
+        node = UnaryOp(node.op, transform(node.operand, function))
+    elif isinstance(node, BinOp):
+        node = BinOp(node.op, transform(node.left, function), transform(node.right, function))
+    elif isinstance(node, Call):
+        node = Call(node.func, [transform(arg, function) for arg in node.args])
+
+    return function(node)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def substitute(node, replacements):
+    """
+    Replace names in an expression.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+    :param replacements: the replacement expressions, by name
+    :type replacements: dict
+
+    :rtype: :class:`Expression`
+    """
+    def replace(n):
+        if isinstance(n, Name) and n.name in replacements:
+            return replacements[n.name]
+        return n
+
+    return transform(node, replace)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def countOperations(node):
+    """
+    Count the arithmetic operations and function calls in an expression.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+
+    :rtype: int
+    """
+    res = 0 if isinstance(node, (Number, Name)) else 1
+    for child in node.getChildren():
+        res += countOperations(child)
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+
+## ***************************************************************************************************************** ##
+def _isNumber(node, value=None):
+    """
+    Check whether a node is a number, optionally with the given value.
+    """
+    return isinstance(node, Number) and (value is None or node.value == value)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _foldNumbers(op, a, b):
+    """
+    Apply an arithmetic operator to two numbers, or return None if the result should not be folded.
+    """
+    try:
+        if op == '+':
+            return a + b
+        elif op == '-':
+            return a - b
+        elif op == '*':
+            return a * b
+        elif op == '/':
+            # Integer divisions are only folded when exact, so that the result doesn't depend on the Python version
+            if isinstance(a, int) and isinstance(b, int) and a % b != 0:
+                return None
+            return a / b if not (isinstance(a, int) and isinstance(b, int)) else a // b
+        elif op == '**':
+            res = a ** b
+            return res if isinstance(res, (int, float)) else None
+    except (ZeroDivisionError, OverflowError, ValueError):
+        return None
+
+    return None
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _simplifyNode(node):
+    """
+    Simplify a node whose children are already simplified.
+    """
+    if isinstance(node, UnaryOp):
+        operand = node.operand
+        if node.op == '+':
+            return operand
+        if isinstance(operand, Number):
+            return Number(-operand.value)
+        if isinstance(operand, UnaryOp) and operand.op == '-':
+            return operand.operand
+        return node
+
+    if isinstance(node, Call):
+        if node.func == 'exp' and _isNumber(node.args[0], 0):
+            return Number(1)
+        return node
+
+    if not isinstance(node, BinOp):
+        return node
+
+    op, left, right = node.op, node.left, node.right
+
+    if isinstance(left, Number) and isinstance(right, Number):
+        value = _foldNumbers(op, left.value, right.value)
+        if value is not None and not (isinstance(value, float) and (math.isinf(value) or math.isnan(value))):
+            return Number(value)
+
+    if op == '+':
+        if _isNumber(left, 0):
+            return right
+        if _isNumber(right, 0):
+            return left
+        if isinstance(right, UnaryOp) and right.op == '-':
+            return BinOp('-', left, right.operand)
+        if _isNumber(right) and right.value < 0:
+            return BinOp('-', left, Number(-right.value))
+    elif op == '-':
+        if _isNumber(right, 0):
+            return left
+        if _isNumber(left, 0):
+            return _simplifyNode(UnaryOp('-', right))
+        if isinstance(right, UnaryOp) and right.op == '-':
+            return BinOp('+', left, right.operand)
+        if _isNumber(right) and right.value < 0:
+            return BinOp('+', left, Number(-right.value))
+    elif op == '*':
+        if _isNumber(left, 0) or _isNumber(right, 0):
+            return Number(0)
+        if _isNumber(left, 1):
+            return right
+        if _isNumber(right, 1):
+            return left
+        if _isNumber(left, -1):
+            return _simplifyNode(UnaryOp('-', right))
+        if _isNumber(right, -1):
+            return _simplifyNode(UnaryOp('-', left))
+        if isinstance(left, UnaryOp) and left.op == '-':
+            return _simplifyNode(UnaryOp('-', _simplifyNode(BinOp('*', left.operand, right))))
+        if isinstance(right, UnaryOp) and right.op == '-':
+            return _simplifyNode(UnaryOp('-', _simplifyNode(BinOp('*', left, right.operand))))
+    elif op == '/':
+        if _isNumber(left, 0) and not _isNumber(right, 0):
+            return Number(0)
+        if _isNumber(right, 1):
+            return left
+        if isinstance(left, UnaryOp) and left.op == '-':
+            return _simplifyNode(UnaryOp('-', _simplifyNode(BinOp('/', left.operand, right))))
+    elif op == '**':
+        if _isNumber(right, 0):
+            return Number(1)
+        if _isNumber(right, 1):
+            return left
+
+    return node
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def simplify(node):
+    """
+    Apply algebraic identities (x + 0, x * 1, x * 0, --x...) and fold purely numerical operations.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+
+    :rtype: :class:`Expression`
+    """
+    return transform(node, _simplifyNode)
+## ***************************************************************************************************************** ##
+
+
+
+## ***************************************************************************************************************** ##
+def differentiate(node, getNameDerivative, functionDerivatives=None):
+    """
+    Differentiate an expression symbolically.
+    The derivative of every referenced name is provided by a callback, so that the caller controls the variable of
+    differentiation and how derivatives of intermediate variables are represented.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+    :param getNameDerivative: callback returning the derivative of a name as an :class:`Expression`, or None if the name is constant
+    :type getNameDerivative: callable
+    :param functionDerivatives: the names of the derivatives of additional single-argument functions, by function name
+    :type functionDerivatives: dict
+
+    :returns: the simplified derivative
+    :rtype: :class:`Expression`
+
+    :raises: ValueError if the expression contains functions which cannot be differentiated
+    """
+    zero = Number(0)
+
+    def d(n):
+        if isinstance(n, Number):
+            return zero
+        elif isinstance(n, Name):
+            res = getNameDerivative(n.name)
+            return zero if res is None else res
+        elif isinstance(n, UnaryOp):
+            du = d(n.operand)
+            return _simplifyNode(UnaryOp(n.op, du))
+        elif isinstance(n, Call):
+            return _differentiateCall(n, d, functionDerivatives or {})
+
+        op, u, v = n.op, n.left, n.right
+        if op in _comparisonOperators.values():
+            return zero
+
+        du, dv = d(u), d(v)
+        if op in ('+', '-'):
+            return _simplifyNode(BinOp(op, du, dv))
+        elif op == '*':
+            return _simplifyNode(BinOp('+', _simplifyNode(BinOp('*', du, v)), _simplifyNode(BinOp('*', u, dv))))
+        elif op == '/':
+            if _isNumber(dv, 0):
+                return _simplifyNode(BinOp('/', du, v))
+            numerator = _simplifyNode(BinOp('-', _simplifyNode(BinOp('*', du, v)), _simplifyNode(BinOp('*', u, dv))))
+            return _simplifyNode(BinOp('/', numerator, BinOp('**', v, Number(2))))
+        elif op == '**':
+            res = zero
+            if not _isNumber(du, 0):
+                # d(u ** v) = v * u ** (v - 1) * du
+                exponent = _simplifyNode(BinOp('-', v, Number(1)))
+                res = _simplifyNode(BinOp('*', _simplifyNode(BinOp('*', v, _simplifyNode(BinOp('**', u, exponent)))), du))
+            if not _isNumber(dv, 0):
+                # d(u ** v) = u ** v * log(u) * dv
+                term = _simplifyNode(BinOp('*', _simplifyNode(BinOp('*', n, Call('log', [u]))), dv))
+                res = _simplifyNode(BinOp('+', res, term))
+            return res
+        elif op == '%':
+            return du
+
+        raise ValueError('Cannot differentiate operator ' + op)
+
+    return d(node)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _differentiateCall(node, d, functionDerivatives):
+    """
+    Differentiate a function call, given the differentiation function for its arguments.
+    """
+    func = node.func
+    if func in ('int', 'sign', 'floor', 'ceil'):
+        return Number(0)
+    if len(node.args) != 1:
+        raise ValueError('Cannot differentiate function ' + func)
+
+    u = node.args[0]
+    du = d(u)
+    if _isNumber(du, 0):
+        return du
+
+    if func == 'exp':
+        outer = node
+    elif func == 'log':
+        outer = BinOp('/', Number(1), u)
+    elif func == 'log10':
+        outer = BinOp('/', Number(1), BinOp('*', u, Number(math.log(10))))
+    elif func == 'sqrt':
+        outer = BinOp('/', Number(1), BinOp('*', Number(2), node))
+    elif func == 'sin':
+        outer = Call('cos', [u])
+    elif func == 'cos':
+        outer = UnaryOp('-', Call('sin', [u]))
+    elif func == 'tanh':
+        outer = BinOp('-', Number(1), BinOp('**', node, Number(2)))
+    elif func == 'abs':
+        outer = Call('sign', [u])
+    elif func in functionDerivatives:
+        outer = Call(functionDerivatives[func], [u])
+    else:
+        raise ValueError('Cannot differentiate function ' + func)
+
+    return _simplifyNode(BinOp('*', outer, du))
+## ***************************************************************************************************************** ##
@@ -0,0 +1,121 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    includecache
+    ~~~~~~~~~~~~~
+    This module contains a cache of parsed YAML include files, shared by all the neurons of a model.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import copy
+import os
+
+import yaml
+
+
+
+## ***************************************************************************************************************** ##
+class IncludeCache(object):
+    """
+    The :class:`IncludeCache` parses each included parameter file only once, and hands out deep copies of its contents.
+    Entries are keyed on the resolved path of the file, and are re-parsed whenever its modification time or size change.
+    """
+
+    ## ************************************************************ ##
+    def __init__(self):
+        """
+        Default constructor.
+        """
+        self._entries = {}
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    @staticmethod
+    def resolvePath(fileName, baseDir=None):
+        """
+        Resolve the path of an included file.
+        Relative paths are looked up in the directory of the referencing file first, then in the current working directory.
+
+        :param fileName: the name of the included file
+        :type fileName: string
+        :param baseDir: the directory of the referencing file
+        :type baseDir: string
+
+        :returns: the absolute path of the included file
+        :rtype: string
+        """
+        fileName = os.path.expanduser(fileName)
+
+        if baseDir is not None and not os.path.isabs(fileName):
+            candidate = os.path.join(baseDir, fileName)
+            if os.path.isfile(candidate):
+                return os.path.realpath(candidate)
+
+        return os.path.realpath(fileName)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def load(self, fileName, baseDir=None):
+        """
+        Return the parsed contents of an included file.
+
+        :param fileName: the name of the included file
+        :type fileName: string
+        :param baseDir: the directory of the referencing file
+        :type baseDir: string
+
+        :returns: a deep copy of the parsed file contents
+        :rtype: list
+
+        :raises: IOError if the file cannot be read
+        """
+        path = self.resolvePath(fileName, baseDir)
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise IOError('Cannot load current parameter file named ' + fileName)
+        key = (path, stat.st_mtime, stat.st_size)
+
+        # Parse the file if it is not cached, or if it changed on disk
+        entry = self._entries.get(path)
+        if entry is None or entry[0] != key:
+            with open(path) as f:
+                entry = (key, yaml.safe_load(f))
+            self._entries[path] = entry
+
+        return copy.deepcopy(entry[1])
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def clear(self):
+        """
+        Drop all cached entries.
+        """
+        self._entries.clear()
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
@@ -0,0 +1,162 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    linearity
+    ~~~~~~~~~~~~~
+    This module contains the classification of the differential equations of a model by their linearity, and the
+    integration method which suits each class.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import collections
+
+import equations as eqs
+import expressions
+
+
+
+# Classes of differential equations dx/dt = f
+LINEAR = 'linear'                               # f = A * x + B, where A and B are constant over time
+CONDITIONALLY_LINEAR = 'conditionally linear'   # f = A * x + B, where A and B depend on other state variables or on time
+NONLINEAR = 'nonlinear'
+
+# Update rule of each class: the exact solution, the exponential Euler method, which is exact when the other variables
+# are frozen over the time step, and the forward Euler method
+UPDATES = {
+    LINEAR: 'exact',
+    CONDITIONALLY_LINEAR: 'exponential_euler',
+    NONLINEAR: 'euler',
+}
+
+# Classes from the most to the least specific
+_ORDER = (LINEAR, CONDITIONALLY_LINEAR, NONLINEAR)
+
+
+
+## ***************************************************************************************************************** ##
+def getLinearForm(equations, name, functionDerivatives=None):
+    """
+    Write the differential equation of a variable x as dx/dt = A * x + B, where A and B do not depend on x.
+    Subexpressions are inlined, so that A and B only reference state variables, parameters, external names and units.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+    :param name: the name of the state variable
+    :type name: string
+    :param functionDerivatives: the names of the derivatives of functions provided by the namespace, by function name
+    :type functionDerivatives: dict
+
+    :returns: the expressions of A and B, or None if the equation is not linear in x
+    :rtype: tuple of :class:`Expression`
+    """
+    expression = equations.inline(equations[name].expression)
+
+    def getNameDerivative(n):
+        return expressions.Number(1) if n == name else None
+
+    try:
+        a = expressions.differentiate(expression, getNameDerivative, functionDerivatives)
+    except ValueError:
+        # Functions of x without a known derivative
+        return None
+    if name in expressions.getNames(a):
+        return None
+
+    b = expressions.simplify(expressions.substitute(expression, {name: expressions.Number(0)}))
+
+    return a, b
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def classifyEquations(equations, functionDerivatives=None):
+    """
+    Classify the differential equations of a model as linear with constant coefficients, conditionally linear, or nonlinear.
+    Parameters and external names are constant over time; an equation whose coefficients A and B depend on state
+    variables or on time is conditionally linear, as in the gating variables of Hodgkin-Huxley currents.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+    :param functionDerivatives: the names of the derivatives of functions provided by the namespace, by function name
+    :type functionDerivatives: dict
+
+    :returns: the class of each state variable, in order
+    :rtype: :class:`collections.OrderedDict` of strings
+    """
+    states = equations.getNames(eqs.DIFFERENTIAL)
+    variable = set(states)
+    variable.add('t')
+
+    res = collections.OrderedDict()
+    for name in states:
+        form = getLinearForm(equations, name, functionDerivatives)
+        if form is None:
+            res[name] = NONLINEAR
+        elif any(variable.intersection(expressions.getNames(node)) for node in form):
+            res[name] = CONDITIONALLY_LINEAR
+        else:
+            res[name] = LINEAR
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getUpdateRules(equations, functionDerivatives=None):
+    """
+    Return the cheapest update rule which is exact or stable for each differential equation of a model: 'exact' for
+    linear equations, 'exponential_euler' for conditionally linear ones, and 'euler' for the others.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+    :param functionDerivatives: the names of the derivatives of functions provided by the namespace, by function name
+    :type functionDerivatives: dict
+
+    :returns: the update rule of each state variable, in order
+    :rtype: :class:`collections.OrderedDict` of strings
+    """
+    classes = classifyEquations(equations, functionDerivatives)
+
+    return collections.OrderedDict((name, UPDATES[cls]) for name, cls in classes.iteritems())
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getIntegrationMethod(equations, functionDerivatives=None):
+    """
+    Return the integration method of a simulator applying a single method to all the equations of a model, such as a
+    Brian group: the update rule of the least specific class among its differential equations.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+    :param functionDerivatives: the names of the derivatives of functions provided by the namespace, by function name
+    :type functionDerivatives: dict
+
+    :returns: 'exact', 'exponential_euler' or 'euler'
+    :rtype: string
+    """
+    classes = classifyEquations(equations, functionDerivatives).values()
+
+    return UPDATES[max([LINEAR] + classes, key=_ORDER.index)]
+## ***************************************************************************************************************** ##
@@ -0,0 +1,115 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    numeric
+    ~~~~~~~~~~~~~
+    This module contains the numerical evaluation of expressions with NumPy, in SI units.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import expressions
+import units
+
+import __future__
+
+import numpy
+
+
+
+# Flags of the compilation of generated code, in which the division of integers is true division, as in Brian
+COMPILER_FLAGS = __future__.division.compiler_flag
+
+
+## ***************************************************************************************************************** ##
+def _int(x):
+    return numpy.trunc(x).astype(int)
+
+# Implementations of the functions available in equations
+FUNCTIONS = {
+    'exp': numpy.exp,
+    'log': numpy.log,
+    'log10': numpy.log10,
+    'sqrt': numpy.sqrt,
+    'sin': numpy.sin,
+    'cos': numpy.cos,
+    'tan': numpy.tan,
+    'sinh': numpy.sinh,
+    'cosh': numpy.cosh,
+    'tanh': numpy.tanh,
+    'arcsin': numpy.arcsin,
+    'arccos': numpy.arccos,
+    'arctan': numpy.arctan,
+    'abs': numpy.abs,
+    'clip': numpy.clip,
+    'int': _int,
+    'sign': numpy.sign,
+    'floor': numpy.floor,
+    'ceil': numpy.ceil,
+}
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def toSI(node):
+    """
+    Replace the units of an expression by their values in SI units, and fold the resulting numerical operations.
+
+    :param node: the expression
+    :type node: :class:`Expression`
+
+    :rtype: :class:`Expression`
+    """
+    def replace(n):
+        if isinstance(n, expressions.Name) and units.isUnit(n.name):
+            return expressions.Number(units.getScale(n.name))
+        return n
+
+    return expressions.simplify(expressions.transform(node, replace))
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def evaluate(node, values=None):
+    """
+    Evaluate an expression in SI units.
+
+    :param node: the expression
+    :type node: :class:`Expression` or string
+    :param values: the values of the names referenced by the expression, in SI units
+    :type values: dict of floats or arrays
+
+    :returns: the value of the expression
+    :rtype: float or array
+
+    :raises: NameError if the expression references a name without a value
+    """
+    if not isinstance(node, expressions.Expression):
+        node = expressions.parse(node)
+
+    scope = dict(FUNCTIONS)
+    scope.update(values or {})
+    code = compile(expressions.render(toSI(node)), '<brianmodel expression>', 'eval', COMPILER_FLAGS)
+    with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        return eval(code, scope)
+## ***************************************************************************************************************** ##
@@ -0,0 +1,590 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    optimiser
+    ~~~~~~~~~~~~~
+    This module contains the passes which rewrite the equations of a neuron into equivalent equations that are cheaper to evaluate.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import equations as eqs
+import expressions
+import units
+
+
+
+## ***************************************************************************************************************** ##
+def getVariableDimensions(equations):
+    """
+    Return the dimensions of the variables of a model, and of the variables provided by the simulator.
+    Variables whose unit annotation cannot be parsed are left out.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+
+    :rtype: dict of tuples
+    """
+    dims = {'t': units.TIME, 'dt': units.TIME, 'i': units.DIMENSIONLESS, 'N': units.DIMENSIONLESS}
+    for eq in equations:
+        try:
+            dims[eq.name] = units.getUnitDimensions(eq.unit)
+        except ValueError:
+            pass
+
+    return dims
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getOperationCount(equations):
+    """
+    Count the operations needed to evaluate every equation of a model once.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+
+    :rtype: int
+    """
+    return sum(expressions.countOperations(eq.expression) for eq in equations if eq.expression is not None)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getConstant(node):
+    """
+    Return the value of an expression made of numbers and units only, or None if it references a variable or cannot be evaluated.
+    """
+    try:
+        return units.evaluateConstant(node)
+    except ValueError:
+        return None
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getLiteral(node, value):
+    """
+    Return the SI literal replacing a constant expression, or the expression itself if the literal is not simpler.
+    """
+    try:
+        literal = value.toExpression()
+    except ValueError:
+        return node
+
+    return literal if expressions.countOperations(literal) < expressions.countOperations(node) else node
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getFactors(node, res, inverted=False):
+    """
+    Flatten a chain of multiplications and divisions into a list of (factor, inverted) pairs.
+    Negations are flattened into a factor -1.
+    """
+    if isinstance(node, expressions.BinOp) and node.op in ('*', '/'):
+        _getFactors(node.left, res, inverted)
+        _getFactors(node.right, res, inverted if node.op == '*' else not inverted)
+    elif isinstance(node, expressions.UnaryOp) and node.op == '-':
+        res.append((expressions.Number(-1), False))
+        _getFactors(node.operand, res, inverted)
+    else:
+        res.append((node, inverted))
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getTerms(node, res, negated=False):
+    """
+    Flatten a chain of additions and subtractions into a list of (term, negated) pairs.
+    """
+    if isinstance(node, expressions.BinOp) and node.op in ('+', '-'):
+        _getTerms(node.left, res, negated)
+        _getTerms(node.right, res, negated if node.op == '+' else not negated)
+    elif isinstance(node, expressions.UnaryOp) and node.op == '-':
+        _getTerms(node.operand, res, not negated)
+    else:
+        res.append((node, negated))
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _foldProduct(node):
+    """
+    Gather the constant factors of a chain of multiplications and divisions into a single literal, in front of the chain.
+    """
+    factors = _getFactors(node, [])
+    coefficient = units.Quantity(1)
+    variables = []
+    constants = 0
+    for factor, inverted in factors:
+        value = _getConstant(factor)
+        if value is None:
+            variables.append((factor, inverted))
+        else:
+            coefficient = coefficient / value if inverted else coefficient * value
+            constants += 1
+    if constants < 2 or not variables:
+        return node
+
+    # A coefficient of -1 is written as a negation
+    negative = coefficient.value == -1 and coefficient.dims == units.DIMENSIONLESS
+    if negative:
+        coefficient = -coefficient
+
+    res = None
+    if coefficient.value != 1 or coefficient.dims != units.DIMENSIONLESS:
+        res = coefficient.toExpression()
+    for factor, inverted in variables:
+        if not inverted:
+            res = factor if res is None else expressions.BinOp('*', res, factor)
+    for factor, inverted in variables:
+        if inverted:
+            res = expressions.BinOp('/', expressions.Number(1) if res is None else res, factor)
+
+    return expressions.UnaryOp('-', res) if negative else res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _foldSum(node):
+    """
+    Gather the constant terms of a chain of additions and subtractions into a single literal, at the end of the chain.
+    """
+    terms = _getTerms(node, [])
+    constant = units.Quantity(0)
+    variables = []
+    constants = 0
+    for term, negated in terms:
+        value = _getConstant(term)
+        if value is None:
+            variables.append((term, negated))
+        else:
+            constant = constant - value if negated else constant + value
+            constants += 1
+    if constants < 2 or not variables:
+        return node
+
+    res = None
+    for term, negated in variables:
+        if res is None:
+            res = expressions.UnaryOp('-', term) if negated else term
+        else:
+            res = expressions.BinOp('-' if negated else '+', res, term)
+    if constant.value > 0:
+        res = expressions.BinOp('+', res, constant.toExpression())
+    elif constant.value < 0:
+        res = expressions.BinOp('-', res, (-constant).toExpression())
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def foldExpression(node, isRoot=True):
+    """
+    Fold the constant parts of an expression, see :func:`foldConstants`.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+
+    :rtype: :class:`Expression`
+    """
+    value = _getConstant(node)
+    if value is not None:
+        return _getLiteral(node, value) if isRoot else node
+
+    # Fold the children, keeping the chains of operators of this node whole
+    if isinstance(node, expressions.UnaryOp):
+        node = expressions.UnaryOp(node.op, foldExpression(node.operand, True))
+    elif isinstance(node, expressions.Call):
+        node = expressions.Call(node.func, [foldExpression(arg, True) for arg in node.args])
+    elif isinstance(node, expressions.BinOp):
+        node = expressions.BinOp(node.op, foldExpression(node.left, _isChainRoot(node, node.left)),
+                                 foldExpression(node.right, _isChainRoot(node, node.right)))
+
+    if isRoot:
+        if isinstance(node, expressions.BinOp) and node.op in ('*', '/'):
+            node = _foldProduct(node)
+        elif isinstance(node, expressions.BinOp) and node.op in ('+', '-'):
+            node = _foldSum(node)
+
+    return node
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _isChainRoot(parent, child):
+    """
+    Check whether a child of a binary operator starts a new chain of operators, rather than continuing the chain of its parent.
+    """
+    if not isinstance(child, expressions.BinOp):
+        return True
+    for chain in (('*', '/'), ('+', '-')):
+        if parent.op in chain and child.op in chain:
+            return False
+
+    return True
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def foldConstants(equations):
+    """
+    Evaluate the parts of the equations which only involve numbers and units, such as the conductance of a current
+    scaled by the cell area, temperature factors, or the constants of calcium pumps, and replace them by literals in SI units.
+
+    Constant subexpressions are replaced by a single literal, such as ``2.9e-08 * siemens``. The constant factors of
+    products and the constant terms of sums are gathered, so that ``-0.032 * (mV ** -1) * (v - (-55 * mV) - 15 * mV) / ms``
+    becomes ``-32000000.0 * volt ** -1 * second ** -1 * (v + 0.04 * volt)``. Gathering constants may change results by rounding errors.
+    Subexpressions whose value is constant, such as temperature factors, are substituted into the equations which reference them.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+
+    :returns: the equivalent model
+    :rtype: :class:`Equations`
+    """
+    # Find the subexpressions of constant value, in dependency order
+    constants = {}
+    for eq in equations.getSortedSubexpressions():
+        value = _getConstant(expressions.substitute(eq.expression, constants))
+        if value is not None:
+            try:
+                constants[eq.name] = value.toExpression()
+            except ValueError:
+                pass
+
+    res = eqs.Equations()
+    for eq in equations:
+        if eq.expression is not None:
+            eq = eq.copy(foldExpression(expressions.substitute(eq.expression, constants)))
+        res.append(eq)
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _isZero(node):
+    """
+    Check whether an expression is always zero: a constant of value zero, or a product with such a constant factor.
+    """
+    value = _getConstant(node)
+    if value is not None:
+        return value.value == 0
+    if not (isinstance(node, expressions.BinOp) and node.op in ('*', '/')):
+        return False
+
+    res = False
+    for factor, inverted in _getFactors(node, []):
+        value = _getConstant(factor)
+        if value is not None and value.value == 0:
+            if inverted:
+                return False
+            res = True
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def eliminateDeadCode(equations, roots):
+    """
+    Remove the currents whose conductance is zero, and the variables which are only needed to compute them.
+
+    Subexpressions which are always zero, such as ``I_CAN = 0 * siemens * mCAN ** 2 * (v - E)``, are dropped from the
+    sums which reference them, such as the membrane equation, and are defined as a zero literal of their unit, e.g.
+    ``I_CAN = 0.0 * amp``. Subexpressions which become zero as a result are treated in the same way. The state variables
+    and subexpressions which were needed to compute the roots, but no longer are, are then removed from the model:
+    here the gating variable mCAN, its rate functions, and the calcium concentration if nothing else depends on it.
+    Variables which were not needed by the roots in the first place, and parameters, are kept.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+    :param roots: the variables which must be computed, such as the membrane potential and the currents
+    :type roots: iterable of strings
+
+    :returns: the equivalent model, and the names of the removed variables in model order
+    :rtype: tuple of :class:`Equations` and list of strings
+    """
+    roots = list(roots)
+
+    # Find the subexpressions which are always zero, in dependency order
+    zeros = {}
+    for eq in equations.getSortedSubexpressions():
+        if _isZero(expressions.simplify(expressions.substitute(eq.expression, zeros))):
+            zeros[eq.name] = expressions.Number(0)
+    if not zeros:
+        return equations, []
+
+    rewritten = eqs.Equations()
+    for eq in equations:
+        if eq.name in zeros:
+            try:
+                eq = eq.copy(units.Quantity(0, units.getUnitDimensions(eq.unit)).toExpression())
+            except ValueError:
+                pass
+        elif eq.expression is not None and not eq.getNames().isdisjoint(zeros):
+            eq = eq.copy(expressions.simplify(expressions.substitute(eq.expression, zeros)))
+        rewritten.append(eq)
+
+    # Remove the variables which are no longer needed by the roots
+    removed = equations.getReachableNames(roots) - rewritten.getReachableNames(roots)
+    res = eqs.Equations(eq for eq in rewritten if eq.kind == eqs.PARAMETER or eq.name not in removed)
+
+    return res, [eq.name for eq in equations if eq.name not in res]
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _countSubtrees(node, counts):
+    """
+    Count the occurrences of every subtree of an expression which references a variable.
+    Subtrees made of numbers and units only are left out, as they are constants.
+
+    :returns: whether the expression references a variable
+    """
+    variable = isinstance(node, expressions.Name) and not units.isUnit(node.name)
+    for child in node.getChildren():
+        variable = _countSubtrees(child, counts) or variable
+
+    if variable and not isinstance(node, expressions.Name):
+        counts[node] = counts.get(node, 0) + 1
+
+    return variable
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _getSubtrees(node, res=None):
+    """
+    Return the set of all subtrees of an expression.
+    """
+    if res is None:
+        res = set()
+
+    res.add(node)
+    for child in node.getChildren():
+        _getSubtrees(child, res)
+
+    return res
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def eliminateCommonSubexpressions(equations, prefix='cse'):
+    """
+    Hoist the subexpressions which are evaluated several times, within or across equations, into shared named subexpressions.
+
+    Repeated subtrees are hoisted greedily, the one saving the most operations first. A subtree which is already the
+    definition of a subexpression is replaced by the name of that subexpression. Other subtrees are defined as new
+    subexpressions ``<prefix>1``, ``<prefix>2``..., whose units are inferred from the units of the variables they reference,
+    and which are inserted before their first use. Subtrees whose dimensions cannot be inferred are left in place.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+    :param prefix: the prefix of the names of hoisted subexpressions
+    :type prefix: string
+
+    :returns: the equivalent model, and the number of operations saved per evaluation of the model
+    :rtype: tuple of :class:`Equations` and int
+    """
+    dims = getVariableDimensions(equations)
+    externals = equations.getExternalNames()
+    names = set(equations.getNames()) | externals
+    hoisted = set()
+    lines = list(equations)
+    before = getOperationCount(equations)
+    index = 0
+    rejected = set()
+
+    while True:
+        # Count the occurrences of every subtree
+        counts = {}
+        for eq in lines:
+            if eq.expression is not None:
+                _countSubtrees(eq.expression, counts)
+
+        candidates = [(-(count - 1) * expressions.countOperations(node), expressions.render(node), node)
+                      for node, count in counts.iteritems() if count > 1 and node not in rejected]
+        if not candidates:
+            break
+        node = min(candidates)[2]
+
+        # Reuse the subexpression already defined as this subtree, if any
+        definition = None
+        for eq in lines:
+            if eq.kind == eqs.SUBEXPRESSION and eq.expression == node:
+                definition = eq
+                break
+
+        if definition is None:
+            try:
+                nodeDims = units.getExpressionDimensions(node, dims.get)
+            except ValueError:
+                rejected.add(node)
+                continue
+
+            index += 1
+            while prefix + str(index) in names:
+                index += 1
+            definition = eqs.Equation(eqs.SUBEXPRESSION, prefix + str(index), node, units.getUnitString(nodeDims))
+            names.add(definition.name)
+            hoisted.add(definition.name)
+            dims[definition.name] = nodeDims
+
+            position = min(i for i, eq in enumerate(lines) if eq.expression is not None and node in _getSubtrees(eq.expression))
+            lines.insert(position, definition)
+
+        # Replace the occurrences of the subtree
+        reference = expressions.Name(definition.name)
+        replace = lambda n: reference if n == node else n
+        lines = [eq if eq is definition or eq.expression is None else eq.copy(expressions.transform(eq.expression, replace))
+                 for eq in lines]
+
+    # Number the hoisted subexpressions in order of appearance
+    renames = {}
+    index = 0
+    for eq in lines:
+        if eq.name in hoisted:
+            index += 1
+            while prefix + str(index) in equations or prefix + str(index) in externals:
+                index += 1
+            renames[eq.name] = prefix + str(index)
+    replacements = dict((old, expressions.Name(new)) for old, new in renames.iteritems())
+    res = eqs.Equations(eqs.Equation(eq.kind, renames.get(eq.name, eq.name), eq.expression and expressions.substitute(eq.expression, replacements), eq.unit)
+                        for eq in lines)
+
+    return res, before - getOperationCount(res)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def _sortTerms(items):
+    """
+    Sort the (node, flag) pairs of a flattened chain by their flag, then by the rendering of their node, so that negated
+    terms and divisors come last.
+    """
+    return sorted(items, key=lambda item: (item[1], expressions.render(item[0])))
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def normaliseExpression(node):
+    """
+    Rewrite an expression into a canonical form, in which the terms of sums and the factors of products are sorted, and
+    negations are gathered in front of them. Expressions which only differ by the order of their operands, such as the sums
+    of currents of neurons whose currents are defined in a different order, have the same canonical form.
+    Unary plus signs are dropped. The canonical form is mathematically equivalent to the expression, but may round differently.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+
+    :rtype: :class:`Expression`
+    """
+    if isinstance(node, expressions.BinOp) and node.op in ('+', '-') or isinstance(node, expressions.UnaryOp) and node.op == '-':
+        terms = []
+        for term, negated in _getTerms(node, []):
+            term = normaliseExpression(term)
+            if isinstance(term, expressions.UnaryOp) and term.op == '-':
+                term, negated = term.operand, not negated
+            terms.append((term, negated))
+        terms = _sortTerms(terms)
+        if len(terms) == 1:
+            term, negated = terms[0]
+            return expressions.UnaryOp('-', term) if negated else term
+
+        res = None
+        for term, negated in terms:
+            if res is None:
+                res = expressions.UnaryOp('-', term) if negated else term
+            else:
+                res = expressions.BinOp('-' if negated else '+', res, term)
+        return res
+
+    if isinstance(node, expressions.BinOp) and node.op in ('*', '/'):
+        negative = False
+        factors = []
+        for factor, inverted in _getFactors(node, []):
+            factor = normaliseExpression(factor)
+            if isinstance(factor, expressions.UnaryOp) and factor.op == '-':
+                factor, negative = factor.operand, not negative
+            if factor == expressions.Number(-1):
+                negative = not negative
+            else:
+                factors.append((factor, inverted))
+        factors = _sortTerms(factors)
+
+        res = None
+        for factor, inverted in factors:
+            if not inverted:
+                res = factor if res is None else expressions.BinOp('*', res, factor)
+        for factor, inverted in factors:
+            if inverted:
+                res = expressions.BinOp('/', expressions.Number(1) if res is None else res, factor)
+        if res is None:
+            res = expressions.Number(1)
+        return expressions.UnaryOp('-', res) if negative else res
+
+    if isinstance(node, expressions.UnaryOp) and node.op == '+':
+        return normaliseExpression(node.operand)
+    if isinstance(node, expressions.UnaryOp):
+        return expressions.UnaryOp(node.op, normaliseExpression(node.operand))
+    if isinstance(node, expressions.BinOp):
+        return expressions.BinOp(node.op, normaliseExpression(node.left), normaliseExpression(node.right))
+    if isinstance(node, expressions.Call):
+        return expressions.Call(node.func, [normaliseExpression(arg) for arg in node.args])
+
+    return node
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def normaliseEquations(equations):
+    """
+    Rewrite a model into a canonical form: constants are folded, expressions are normalised with
+    :func:`normaliseExpression`, unit annotations are written in SI units, and the equations are sorted by name.
+    Models which only differ by the order of their equations or of the operands of their sums and products, or by the way
+    their constants and units are written, have the same canonical form, which is meant to be hashed rather than simulated.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+
+    :returns: the canonical model
+    :rtype: :class:`Equations`
+    """
+    res = []
+    for eq in foldConstants(equations):
+        try:
+            unit = units.getUnitString(units.getUnitDimensions(eq.unit))
+        except ValueError:
+            unit = ' '.join(eq.unit.split())
+        res.append(eqs.Equation(eq.kind, eq.name, eq.expression and normaliseExpression(eq.expression), unit))
+
+    return eqs.Equations(sorted(res, key=lambda eq: eq.name))
+## ***************************************************************************************************************** ##
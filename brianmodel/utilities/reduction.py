@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    reduction
+    ~~~~~~~~~~~~~
+    This module contains the adiabatic reduction of a model, which replaces fast state variables by their steady state,
+    as with the sodium activation m = m_inf of the Wang-Buzsaki model.
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import equations as eqs
+import expressions
+
+
+
+## ***************************************************************************************************************** ##
+def _negate(node):
+    """
+    Return the opposite of an expression, without double negations such as -(-a - b).
+    """
+    if isinstance(node, expressions.Number):
+        return expressions.Number(-node.value)
+    if isinstance(node, expressions.UnaryOp) and node.op == '-':
+        return node.operand
+    if isinstance(node, expressions.BinOp) and isinstance(node.left, expressions.UnaryOp) and node.left.op == '-':
+        if node.op == '-':
+            return expressions.BinOp('+', node.left.operand, node.right)
+        if node.op in ('*', '/'):
+            return expressions.BinOp(node.op, node.left.operand, node.right)
+    if isinstance(node, expressions.BinOp) and node.op in ('*', '/') and isinstance(node.left, expressions.Number):
+        return expressions.BinOp(node.op, expressions.Number(-node.left.value), node.right)
+
+    return expressions.UnaryOp('-', node)
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getSteadyState(equations, name, functionDerivatives=None):
+    """
+    Return the steady state of a state variable x, at which its differential equation dx/dt = A * x + B vanishes, x = B / -A,
+    the other variables being frozen.
+    Only the subexpressions which depend on x are inlined, so that the steady state of a gating variable written with
+    rate functions is ``alpham / (alpham + betam)``, and that of a gating variable written ``dm/dt = (m_inf - m) / tau_m``
+    is ``m_inf``.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+    :param name: the name of the state variable
+    :type name: string
+    :param functionDerivatives: the names of the derivatives of functions provided by the namespace, by function name
+    :type functionDerivatives: dict
+
+    :returns: the steady state, or None if the equation is not linear in x
+    :rtype: :class:`Expression`
+    """
+    dependent = set(eq.name for eq in equations.getSortedSubexpressions() if name in equations.getDependencies(eq.name))
+    expression = equations.inline(equations[name].expression, dependent)
+
+    def getNameDerivative(n):
+        return expressions.Number(1) if n == name else None
+
+    try:
+        a = expressions.simplify(expressions.differentiate(expression, getNameDerivative, functionDerivatives))
+    except ValueError:
+        # Functions of x without a known derivative
+        return None
+    if name in expressions.getNames(a) or (isinstance(a, expressions.Number) and a.value == 0):
+        return None
+    b = expressions.simplify(expressions.substitute(expression, {name: expressions.Number(0)}))
+
+    # With A = -1 / tau, the steady state is B * tau, which is x_inf for B = x_inf / tau
+    rate = _negate(a)
+    if isinstance(rate, expressions.BinOp) and rate.op == '/' and isinstance(rate.left, expressions.Number) and rate.left.value == 1:
+        if isinstance(b, expressions.BinOp) and b.op == '/' and b.right == rate.right:
+            return b.left
+        return expressions.BinOp('*', b, rate.right)
+
+    return expressions.simplify(expressions.BinOp('/', b, rate))
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def reduceAdiabatic(equations, names, functionDerivatives=None):
+    """
+    Replace the differential equations of fast state variables by their steady state, see :func:`getSteadyState`.
+    The state variables become subexpressions of the same unit, so that the rest of the model is unchanged, and the
+    subexpressions which were only needed by their differential equations, such as the time constants of gating
+    variables, are removed. Adiabatic reduction is exact in the limit of infinitely fast variables, and otherwise an
+    approximation, whose error must be checked against the full model.
+
+    :param equations: the model
+    :type equations: :class:`Equations`
+    :param names: the names of the state variables to replace
+    :type names: iterable of strings
+    :param functionDerivatives: the names of the derivatives of functions provided by the namespace, by function name
+    :type functionDerivatives: dict
+
+    :returns: the reduced model, and the names of the removed subexpressions in model order
+    :rtype: tuple of :class:`Equations` and list of strings
+
+    :raises: ValueError if a name is not a state variable, if its equation is not linear in it, or if steady states depend
+        on each other cyclically
+    """
+    names = list(names)
+    steadyStates = {}
+    for name in names:
+        if name not in equations or equations[name].kind != eqs.DIFFERENTIAL:
+            raise ValueError('Cannot reduce ' + name + ', which is not a state variable of the model')
+        steadyStates[name] = getSteadyState(equations, name, functionDerivatives)
+        if steadyStates[name] is None:
+            raise ValueError('Cannot reduce ' + name + ', whose equation is not linear in it')
+
+    rewritten = eqs.Equations()
+    for eq in equations:
+        if eq.name in steadyStates:
+            eq = eqs.Equation(eqs.SUBEXPRESSION, eq.name, steadyStates[eq.name], eq.unit)
+        rewritten.append(eq)
+    rewritten.getSortedSubexpressions()
+
+    # Remove the subexpressions which were only needed by the replaced equations
+    candidates = set(name for name in equations.getReachableNames(names) if equations[name].kind == eqs.SUBEXPRESSION)
+    kept = rewritten.getReachableNames(eq.name for eq in rewritten if eq.name not in candidates)
+    res = eqs.Equations(eq for eq in rewritten if eq.name not in candidates or eq.name in kept)
+
+    return res, [eq.name for eq in equations if eq.name not in res]
+## ***************************************************************************************************************** ##
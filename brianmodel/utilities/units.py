@@ -0,0 +1,474 @@
+#!/usr/bin/python
+# coding: utf-8
+
+# #################################################################################
+# Copyright (C) 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+# Authors: Francesco Giovannini
+# email: francesco.giovannini@inria.fr
+# website: http://neurosys.loria.fr/
+# Permission is granted to copy, distribute, and/or modify this program
+# under the terms of the GNU General Public License, version 3 or any
+# later version published by the Free Software Foundation.
+#
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU General
+# Public License for more details
+# #################################################################################
+
+
+
+"""
+    units
+    ~~~~~~~~~~~~~
+    This module contains the physical units used in Brian equations, with their scale and dimensions in the SI system.
+    Dimensions are tuples of exponents of the base units (metre, kilogram, second, amp, kelvin, mole, candela).
+
+    :copyright 2014 Francesco Giovannini, Neurosys - INRIA CR Nancy - Grand Est
+    :licence GPLv3, see LICENCE for more details
+"""
+
+import expressions
+
+import math
+import operator
+
+
+
+# Dimensions of the base SI units
+DIMENSIONLESS = (0, 0, 0, 0, 0, 0, 0)
+LENGTH = (1, 0, 0, 0, 0, 0, 0)
+MASS = (0, 1, 0, 0, 0, 0, 0)
+TIME = (0, 0, 1, 0, 0, 0, 0)
+CURRENT = (0, 0, 0, 1, 0, 0, 0)
+TEMPERATURE = (0, 0, 0, 0, 1, 0, 0)
+SUBSTANCE = (0, 0, 0, 0, 0, 1, 0)
+LUMINOSITY = (0, 0, 0, 0, 0, 0, 1)
+
+# Names of the base SI units, in the order of the dimension tuples
+BASE_UNITS = ('metre', 'kilogram', 'second', 'amp', 'kelvin', 'mole', 'candela')
+
+
+
+## ***************************************************************************************************************** ##
+def multiplyDimensions(a, b):
+    """
+    Return the dimensions of the product of two quantities.
+    """
+    return tuple(x + y for x, y in zip(a, b))
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def divideDimensions(a, b):
+    """
+    Return the dimensions of the quotient of two quantities.
+    """
+    return tuple(x - y for x, y in zip(a, b))
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def powerDimensions(a, exponent):
+    """
+    Return the dimensions of a quantity raised to the given power.
+    """
+    res = []
+    for x in a:
+        y = x * exponent
+        res.append(int(round(y)) if abs(y - round(y)) < 1e-12 else y)
+
+    return tuple(res)
+## ***************************************************************************************************************** ##
+
+
+
+# Derived units, as (scale, dimensions)
+_derived = {
+    'metre': (1., LENGTH),
+    'meter': (1., LENGTH),
+    'gram': (1e-3, MASS),
+    'gramme': (1e-3, MASS),
+    'second': (1., TIME),
+    'amp': (1., CURRENT),
+    'ampere': (1., CURRENT),
+    'kelvin': (1., TEMPERATURE),
+    'mole': (1., SUBSTANCE),
+    'mol': (1., SUBSTANCE),
+    'candela': (1., LUMINOSITY),
+    'hertz': (1., (0, 0, -1, 0, 0, 0, 0)),
+    'newton': (1., (1, 1, -2, 0, 0, 0, 0)),
+    'joule': (1., (2, 1, -2, 0, 0, 0, 0)),
+    'watt': (1., (2, 1, -3, 0, 0, 0, 0)),
+    'coulomb': (1., (0, 0, 1, 1, 0, 0, 0)),
+    'volt': (1., (2, 1, -3, -1, 0, 0, 0)),
+    'farad': (1., (-2, -1, 4, 2, 0, 0, 0)),
+    'ohm': (1., (2, 1, -3, -2, 0, 0, 0)),
+    'siemens': (1., (-2, -1, 3, 2, 0, 0, 0)),
+    'molar': (1e3, (-3, 0, 0, 0, 0, 1, 0)),
+    'litre': (1e-3, (3, 0, 0, 0, 0, 0, 0)),
+    'liter': (1e-3, (3, 0, 0, 0, 0, 0, 0)),
+}
+
+# SI prefixes
+_prefixes = {
+    'y': 1e-24, 'z': 1e-21, 'a': 1e-18, 'f': 1e-15, 'p': 1e-12, 'n': 1e-9, 'u': 1e-6, 'm': 1e-3, 'c': 1e-2, 'd': 1e-1,
+    'da': 1e1, 'h': 1e2, 'k': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12,
+}
+
+# Abbreviated unit names, as (prefix scale, unit name)
+_abbreviations = {
+    'm': 'metre', 'g': 'gram', 's': 'second', 'A': 'amp', 'K': 'kelvin', 'Hz': 'hertz', 'N': 'newton', 'J': 'joule',
+    'W': 'watt', 'C': 'coulomb', 'V': 'volt', 'F': 'farad', 'S': 'siemens', 'M': 'molar', 'l': 'litre', 'L': 'litre',
+}
+
+
+## ***************************************************************************************************************** ##
+def _buildUnitTable():
+    """
+    Build the table of all unit names, including prefixed and abbreviated names.
+    """
+    table = {}
+
+    for name, (scale, dims) in _derived.items():
+        table[name] = (scale, dims)
+        for prefix, factor in _prefixes.items():
+            table[prefix + name] = (scale * factor, dims)
+
+    for abbreviation, name in _abbreviations.items():
+        scale, dims = _derived[name]
+        for prefix, factor in _prefixes.items():
+            # Abbreviations of prefixed units only (mV, ms, nS...), as the bare single letters are too ambiguous
+            table.setdefault(prefix + abbreviation, (scale * factor, dims))
+    table['Hz'] = _derived['hertz']
+    table['kg'] = (1., MASS)
+    table['kilogram'] = (1., MASS)
+
+    # Temperatures in equations are only ever used as differences
+    table['celsius'] = (1., TEMPERATURE)
+
+    return table
+## ***************************************************************************************************************** ##
+
+# Table of unit names, as (scale, dimensions)
+UNITS = _buildUnitTable()
+
+
+
+## ***************************************************************************************************************** ##
+def isUnit(name):
+    """
+    Check whether the given name is a unit name.
+
+    :param name: the name
+    :type name: string
+
+    :rtype: bool
+    """
+    return name in UNITS
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getScale(name):
+    """
+    Return the value of the given unit in SI units.
+
+    :param name: the unit name
+    :type name: string
+
+    :rtype: float
+    """
+    return UNITS[name][0]
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getDimensions(name):
+    """
+    Return the dimensions of the given unit.
+
+    :param name: the unit name
+    :type name: string
+
+    :rtype: tuple of int
+    """
+    return UNITS[name][1]
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getExpressionDimensions(node, getNameDimensions=None):
+    """
+    Infer the dimensions of an expression.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+    :param getNameDimensions: callback returning the dimensions of a name which is not a unit, or None if they are unknown
+    :type getNameDimensions: callable
+
+    :rtype: tuple of int
+
+    :raises: ValueError if the dimensions cannot be inferred, or if the expression adds quantities of different dimensions
+    """
+    if isinstance(node, expressions.Number):
+        return DIMENSIONLESS
+    elif isinstance(node, expressions.Name):
+        if isUnit(node.name):
+            return getDimensions(node.name)
+        res = getNameDimensions(node.name) if getNameDimensions is not None else None
+        if res is None:
+            raise ValueError('Unknown dimensions of ' + node.name)
+        return res
+    elif isinstance(node, expressions.UnaryOp):
+        return getExpressionDimensions(node.operand, getNameDimensions)
+    elif isinstance(node, expressions.Call):
+        args = [getExpressionDimensions(arg, getNameDimensions) for arg in node.args]
+        if node.func == 'sqrt':
+            return powerDimensions(args[0], 0.5)
+        if node.func in ('abs', 'clip', 'floor', 'ceil'):
+            return args[0]
+        return DIMENSIONLESS
+
+    left = getExpressionDimensions(node.left, getNameDimensions)
+    if node.op == '**':
+        exponent = expressions.simplify(node.right)
+        if left == DIMENSIONLESS:
+            return DIMENSIONLESS
+        if not isinstance(exponent, expressions.Number):
+            raise ValueError('Non-constant exponent of a dimensioned quantity: ' + expressions.render(node))
+        return powerDimensions(left, exponent.value)
+
+    right = getExpressionDimensions(node.right, getNameDimensions)
+    if node.op == '*':
+        return multiplyDimensions(left, right)
+    elif node.op == '/':
+        return divideDimensions(left, right)
+    elif node.op in ('+', '-', '%'):
+        if left != right:
+            # Plain numbers are taken to have the dimensions of the other operand, as in 1 - n
+            if isinstance(node.left, expressions.Number):
+                return right
+            if isinstance(node.right, expressions.Number):
+                return left
+            raise ValueError('Inconsistent dimensions in ' + expressions.render(node))
+        return left
+
+    # Comparisons
+    return DIMENSIONLESS
+## ***************************************************************************************************************** ##
+
+
+## ***************************************************************************************************************** ##
+def getUnitDimensions(unit):
+    """
+    Return the dimensions of a unit annotation, such as ``mole * meter ** -3 * Hz`` or ``1``.
+
+    :param unit: the unit annotation
+    :type unit: string
+
+    :rtype: tuple of int
+
+    :raises: ValueError if the annotation contains names which are not units
+    """
+    return getExpressionDimensions(expressions.parse(unit))
+## ***************************************************************************************************************** ##
+
+
+# Units used to name dimensions, tried in order
+_namedUnits = ('volt', 'amp', 'siemens', 'second', 'hertz', 'farad', 'coulomb', 'ohm', 'metre', 'mole', 'kelvin')
+
+
+## ***************************************************************************************************************** ##
+def getUnitString(dims):
+    """
+    Return a unit annotation for the given dimensions, such as ``volt``, ``amp * volt ** -1`` or ``1``.
+    Dimensions which involve mass are expressed in volts, and the remaining ones in base units.
+
+    :param dims: the dimensions
+    :type dims: tuple of int
+
+    :rtype: string
+    """
+    dims = tuple(dims)
+    if dims == DIMENSIONLESS:
+        return '1'
+
+    for name in _namedUnits:
+        if _derived[name][1] == dims:
+            return 'Hz' if name == 'hertz' else name
+
+    factors = []
+
+    # The mass exponent is carried by volts, which leaves base units other than the kilogram
+    volts = dims[1]
+    if volts:
+        dims = divideDimensions(dims, powerDimensions(_derived['volt'][1], volts))
+        factors.append(('volt', volts))
+    for name, exponent in zip(BASE_UNITS, dims):
+        if exponent:
+            factors.append((name, exponent))
+
+    return ' * '.join(name if exponent == 1 else name + ' ** ' + repr(exponent) for name, exponent in factors)
+## ***************************************************************************************************************** ##
+
+
+
+## ***************************************************************************************************************** ##
+class Quantity(object):
+    """
+    The :class:`Quantity` is a physical quantity: a value in SI units, and its dimensions.
+    Quantities support the arithmetic operators, and check that added quantities have the same dimensions.
+
+    Initialised as:
+
+        Quantity(value, dims)
+
+    with arguments:
+
+        ``value``
+        The value, in SI units (float)
+
+        ``dims``
+        The dimensions (tuple of int)
+    """
+
+    __slots__ = ('value', 'dims')
+
+
+    ## ************************************************************ ##
+    def __init__(self, value, dims=DIMENSIONLESS):
+        """
+        Default constructor.
+        """
+        self.value = value
+        self.dims = tuple(dims)
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def _add(self, other, op):
+        # Zero is compatible with any dimensions
+        if self.dims != other.dims and self.value != 0 and other.value != 0:
+            raise ValueError('Cannot add quantities of dimensions ' + getUnitString(self.dims) + ' and ' + getUnitString(other.dims))
+        return Quantity(op(self.value, other.value), self.dims if self.value != 0 else other.dims)
+
+    def __add__(self, other):
+        return self._add(other, operator.add)
+
+    def __sub__(self, other):
+        return self._add(other, operator.sub)
+
+    def __mul__(self, other):
+        return Quantity(self.value * other.value, multiplyDimensions(self.dims, other.dims))
+
+    def __truediv__(self, other):
+        return Quantity(float(self.value) / other.value, divideDimensions(self.dims, other.dims))
+
+    __div__ = __truediv__
+
+    def __pow__(self, other):
+        if other.dims != DIMENSIONLESS:
+            raise ValueError('Cannot raise a quantity to a dimensioned power')
+        return Quantity(self.value ** other.value, powerDimensions(self.dims, other.value))
+
+    def __mod__(self, other):
+        return self._add(other, operator.mod)
+
+    def __neg__(self):
+        return Quantity(-self.value, self.dims)
+
+    def __repr__(self):
+        return '<Quantity ' + self.render() + '>'
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def toExpression(self):
+        """
+        Return the quantity as a literal followed by its unit, such as ``2.9e-08 * siemens``.
+        Values are rounded to 15 significant digits, to hide rounding errors of the computation.
+
+        :rtype: :class:`Expression`
+
+        :raises: ValueError if the value is not finite
+        """
+        if math.isinf(self.value) or math.isnan(self.value):
+            raise ValueError('Non-finite quantity')
+
+        res = expressions.Number(float('%.15g' % self.value))
+        if self.dims != DIMENSIONLESS:
+            for factor in getUnitString(self.dims).split(' * '):
+                res = expressions.BinOp('*', res, expressions.parse(factor))
+
+        return res
+    ## ************************************************************ ##
+
+
+    ## ************************************************************ ##
+    def render(self):
+        """
+        Render the quantity as a Brian-compatible string.
+
+        :rtype: string
+        """
+        return expressions.render(self.toExpression())
+    ## ************************************************************ ##
+## ***************************************************************************************************************** ##
+
+
+# Functions of constant quantities, which take and return dimensionless values
+_constantFunctions = {
+    'exp': math.exp, 'log': math.log, 'log10': math.log10, 'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'sinh': math.sinh, 'cosh': math.cosh, 'tanh': math.tanh, 'arcsin': math.asin, 'arccos': math.acos, 'arctan': math.atan,
+    'floor': math.floor, 'ceil': math.ceil, 'int': lambda x: float(int(x)),
+    'sign': lambda x: float((x > 0) - (x < 0)),
+}
+
+# Arithmetic operators on quantities, by symbol
+_operators = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv, '**': operator.pow, '%': operator.mod}
+_comparisons = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge, '==': operator.eq, '!=': operator.ne}
+
+
+## ***************************************************************************************************************** ##
+def evaluateConstant(node):
+    """
+    Evaluate an expression made of numbers and units only, such as ``(1e-4 * siemens * cm ** -2) * (29e3 * umetre ** 2)``.
+    Divisions are true divisions, as in Brian.
+
+    :param node: the root node of the expression tree
+    :type node: :class:`Expression`
+
+    :rtype: :class:`Quantity`
+
+    :raises: ValueError if the expression is not constant, or cannot be evaluated
+    """
+    try:
+        if isinstance(node, expressions.Number):
+            return Quantity(node.value)
+        elif isinstance(node, expressions.Name):
+            if not isUnit(node.name):
+                raise ValueError('Not a constant: ' + node.name)
+            return Quantity(getScale(node.name), getDimensions(node.name))
+        elif isinstance(node, expressions.UnaryOp):
+            res = evaluateConstant(node.operand)
+            return -res if node.op == '-' else res
+        elif isinstance(node, expressions.Call):
+            args = [evaluateConstant(arg) for arg in node.args]
+            if node.func == 'sqrt':
+                return args[0] ** Quantity(0.5)
+            elif node.func == 'abs':
+                return Quantity(abs(args[0].value), args[0].dims)
+            elif node.func in _constantFunctions and len(args) == 1 and args[0].dims == DIMENSIONLESS:
+                return Quantity(_constantFunctions[node.func](args[0].value))
+            raise ValueError('Cannot evaluate function ' + node.func)
+
+        left = evaluateConstant(node.left)
+        right = evaluateConstant(node.right)
+        if node.op in _operators:
+            return _operators[node.op](left, right)
+        return Quantity(float(_comparisons[node.op](left.value, right.value)))
+    except (ZeroDivisionError, OverflowError, TypeError) as e:
+        raise ValueError('Cannot evaluate ' + expressions.render(node) + ': ' + str(e))
+## ***************************************************************************************************************** ##
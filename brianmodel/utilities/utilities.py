@@ -28,6 +28,7 @@
     :licence GPLv3, see LICENCE for more details
 """
 
+import functools
 import sys
 
 
@@ -44,6 +45,26 @@ def getSafeStringParam(param):
 ## ***************************************************************************************************************** ##
 
 
+## ***************************************************************************************************************** ##
+def memoise(method):
+    """
+    Cache the result of a method without arguments in the ``_cache`` dict of its instance.
+    The owning class is responsible for clearing ``_cache`` whenever the cached result becomes stale.
+    """
+    key = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        try:
+            return self._cache[key]
+        except KeyError:
+            res = self._cache[key] = method(self)
+            return res
+
+    return wrapper
+## ***************************************************************************************************************** ##
+
+
 ## ***************************************************************************************************************** ##
 def main(argv):
     pass
@@ -41,4 +41,5 @@ setup(name='brianmodel',
       license='GPLv3',
       packages=['brianmodel'],
       install_requires=['pyaml'],
+      extras_require={'engine': ['numpy']},
       zip_safe=False)